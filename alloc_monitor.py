@@ -0,0 +1,190 @@
+"""
+Монитор выделений памяти для долгих сессий: сколько памяти занимают временные объекты каждого шага симуляции,
+сколько блоков памяти остаётся занятым после каждого шага и каждой фазы кадра, сколько живых объектов основных типов
+(поверхности, звуки, векторы, спрайты) существует на начало каждой волны и какие модули удерживают выросшую между
+волнами память (снимки tracemalloc).
+
+CPython не считает сами выделения памяти, а чистый прирост занятых блоков у шага, который создаёт и освобождает
+тысячи объектов, около нуля. Поэтому временная память шага - пик памяти Python (tracemalloc) сверх её уровня на начало
+шага, а бюджет задаётся для неё.
+
+Включается из командной строки:
+    python main.py --alloc-monitor
+    python headless.py --script placements.json --alloc-monitor --alloc-budget 64
+
+С --alloc-budget запуск headless.py завершается с кодом 1, если p95 временной памяти шага превышает бюджет в КиБ.
+"""
+import collections
+import gc
+import sys
+import tracemalloc
+from array import array
+
+import pygame
+import profiler
+from events import WaveStarted
+
+
+class AllocationMonitor:
+    """Счётчики выделений памяти по шагам, фазам и волнам игры game."""
+    # Тип считается утекающим, если число живых объектов росло на стольких волнах подряд
+    GROWTH_WAVES = 3
+
+    def __init__(self, game, budget=None, top=10, frames=1):
+        """
+        :param game: Объект игры.
+        :param budget: Допустимая временная память шага симуляции в КиБ, p95 (None - без ограничения).
+        :param top: Сколько модулей с наибольшим приростом памяти между волнами хранить в отчёте.
+        :param frames: Глубина стека, сохраняемая tracemalloc для каждого выделения.
+        """
+        self.game = game
+        self.budget = budget
+        self.top = top
+        self.frames = frames
+        self.tick_blocks = array('q')  # Чистый прирост занятых блоков за каждый шаг симуляции
+        self.tick_transient = array('q')  # Пик памяти Python сверх уровня на начало шага, байт
+        self.tick_start = 0
+        self.traced_start = 0
+        self.tick_bias = 0  # Прирост блоков от самой пары begin_tick()/end_tick()
+        self.transient_bias = 0  # Пик памяти от самой пары begin_tick()/end_tick()
+        self.waves = []  # Отчёт по каждой волне: живые объекты и прирост памяти по модулям
+        self.snapshot = None
+        self.pending_wave = None  # Началась волна, снимок делается после замера шага
+
+    def start(self):
+        """
+        Запускает tracemalloc, включает замер выделений по фазам профилировщика (оверлей F3 остаётся в прежнем
+        состоянии) и снимки на начале волн.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        profiler = self.game.profiler
+        profiler.set_meter(sys.getallocatedblocks)
+        profiler.hold()
+        self.game.events.subscribe(WaveStarted, self._on_waves_started)
+        for _ in range(3):
+            self.begin_tick()
+            self.end_tick()
+        self.tick_bias = self.tick_blocks[-1]
+        self.transient_bias = self.tick_transient[-1]
+        del self.tick_blocks[:]
+        del self.tick_transient[:]
+        self.snapshot = self._take_snapshot()
+
+    def begin_tick(self):
+        self.traced_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.tick_start = sys.getallocatedblocks()
+
+    def end_tick(self):
+        blocks = sys.getallocatedblocks()
+        peak = tracemalloc.get_traced_memory()[1]
+        self.tick_blocks.append(blocks - self.tick_start - self.tick_bias)
+        self.tick_transient.append(max(peak - self.traced_start - self.transient_bias, 0))
+        if self.pending_wave is not None:
+            self._record_wave(*self.pending_wave)
+            self.pending_wave = None
+
+    @staticmethod
+    def _take_snapshot():
+        # Память tracemalloc, монитора и истории профилировщика к игре не относится
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, sys.modules[__name__], profiler)
+        ])
+
+    @staticmethod
+    def live_counts():
+        """
+        Возвращает количество живых объектов по типам: поверхности, звуки, векторы, прямоугольники и спрайты
+        (по именам классов). Поверхности, звуки и векторы не отслеживаются сборщиком мусора, поэтому
+        считаются по ссылкам из отслеживаемых объектов.
+        """
+        untracked = (pygame.Surface, pygame.mixer.Sound, pygame.math.Vector2, pygame.Rect)
+        counts = collections.Counter()
+        seen = set()
+        for obj in gc.get_objects():
+            if isinstance(obj, pygame.sprite.Sprite):
+                counts[type(obj).__name__] += 1
+            for ref in gc.get_referents(obj):
+                if isinstance(ref, untracked) and id(ref) not in seen:
+                    seen.add(id(ref))
+                    counts[type(ref).__name__] += 1
+        return dict(counts)
+
+    def _on_waves_started(self, events):
+        # Снимок откладывается до end_tick(), чтобы его выделения не попали в прирост шага
+        self.pending_wave = self.game.current_level_index + 1, events[-1].wave
+
+    def _record_wave(self, level, wave):
+        """Снимает живые объекты и прирост памяти по модулям с начала прошлой волны."""
+        # Недостижимые циклы (например, башни освобождённого уровня) иначе попали бы в живые объекты и прирост
+        gc.collect()
+        snapshot = self._take_snapshot()
+        growth = [
+            {'file': stat.traceback[0].filename, 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+            for stat in snapshot.compare_to(self.snapshot, 'filename')[:self.top]
+            if stat.size_diff > 0
+        ]
+        self.snapshot = snapshot
+        self.waves.append({
+            'level': level,
+            'wave': wave,
+            'traced_bytes': tracemalloc.get_traced_memory()[0],
+            'live': self.live_counts(),
+            'growth': growth,
+        })
+        self.game.log.info('alloc_wave', level=level, wave=wave, live=self.waves[-1]['live'])
+
+    def growing_types(self):
+        """Возвращает типы, число живых объектов которых росло на последних GROWTH_WAVES волнах подряд."""
+        if len(self.waves) <= self.GROWTH_WAVES:
+            return {}
+        recent = [wave['live'] for wave in self.waves[-self.GROWTH_WAVES - 1:]]
+        return {
+            name: [counts.get(name, 0) for counts in recent]
+            for name in recent[-1]
+            if all(later.get(name, 0) > earlier.get(name, 0) for earlier, later in zip(recent, recent[1:]))
+        }
+
+    @staticmethod
+    def percentile(values, fraction):
+        if not values:
+            return 0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def transient_kib(self, fraction=0.95):
+        """Возвращает перцентиль fraction временной памяти шага, КиБ."""
+        return self.percentile(self.tick_transient, fraction) / 1024
+
+    def over_budget(self):
+        """True, если p95 временной памяти шага превышает бюджет."""
+        return self.budget is not None and self.transient_kib(0.95) > self.budget
+
+    def report(self):
+        """
+        Возвращает сводку: временная память и чистый прирост блоков за шаг, средний прирост по фазам, живые объекты
+        и утекающие типы.
+        """
+        profiler = self.game.profiler
+        blocks, transient = self.tick_blocks, self.tick_transient
+        return {
+            'ticks': len(blocks),
+            'transient_kib_per_tick': {
+                'mean': sum(transient) / len(transient) / 1024 if transient else 0,
+                'p95': self.transient_kib(0.95),
+                'max': max(transient, default=0) / 1024,
+            },
+            'net_blocks_per_tick': {
+                'mean': sum(blocks) / len(blocks) if blocks else 0,
+                'p95': self.percentile(blocks, 0.95),
+                'max': max(blocks, default=0),
+            },
+            'budget_kib': self.budget,
+            'ticks_over_budget': 0 if self.budget is None else sum(1 for size in transient
+                                                                   if size / 1024 > self.budget),
+            'phases': {name: profiler.alloc_stats(name) for name in profiler.allocs},
+            'traced_bytes': tracemalloc.get_traced_memory(),
+            'waves': self.waves,
+            'growing_types': self.growing_types(),
+        }
@@ -0,0 +1,158 @@
+"""Менеджер ресурсов игры: изображения и звуки загружаются с диска один раз и переиспользуются всеми объектами."""
+import threading
+
+import pygame
+
+
+class RotationAtlas:
+    """Заранее повёрнутые копии спрайта с квантованным шагом угла."""
+    def __init__(self, surface, steps):
+        """
+        :param surface: Исходная поверхность (угол 0).
+        :param steps: Количество шагов на полный оборот.
+        """
+        self.steps = steps
+        self.step_angle = 360 / steps
+        self.frames = [pygame.transform.rotate(surface, i * self.step_angle) for i in range(steps)]
+
+    def index(self, angle):
+        """Возвращает индекс кадра, ближайшего к углу angle в градусах."""
+        return round(angle / self.step_angle) % self.steps
+
+    def angle(self, index):
+        """Возвращает угол кадра с индексом index."""
+        return index * self.step_angle
+
+
+class AssetManager:
+    """Кэш ресурсов, ключом служит путь к файлу. Считает попадания и промахи кэша."""
+    def __init__(self, convert=True):
+        """
+        Создаёт пустые хранилища поверхностей и звуков.
+        :param convert: False, если видеорежим не установлен (headless) и convert()/convert_alpha() недоступны.
+        """
+        self.convert = convert
+        self.images = {}
+        self.sounds = {}
+        self.atlases = {}
+        self.staged = {}  # Путь -> поверхность, декодированная фоновой предзагрузкой, но ещё не преобразованная
+        self.prewarm_thread = None
+        self.prewarmed = 0
+        self.hits = 0
+        self.misses = 0
+
+    def image(self, path, alpha=True):
+        """
+        Возвращает преобразованную поверхность для файла path.
+        :param path: Путь к изображению.
+        :param alpha: True - convert_alpha(), False - convert() (для фона без прозрачности).
+        :return: pygame.Surface, общая для всех вызывающих. Изменять её нельзя, только копию.
+        """
+        key = (path, alpha)
+        surface = self.images.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        return self._load_image(path, alpha)
+
+    def _load_image(self, path, alpha=True):
+        """Загружает изображение (или берёт декодированное фоновым потоком) и кладёт его в кэш."""
+        surface = self.staged.pop(path, None)
+        if surface is None:
+            surface = pygame.image.load(path)
+        if self.convert:
+            surface = surface.convert_alpha() if alpha else surface.convert()
+        self.images[(path, alpha)] = surface
+        return surface
+
+    def prewarm(self, paths, background=False):
+        """
+        Заранее загружает изображения, которые скоро понадобятся.
+        :param paths: Пути к изображениям (с альфа-каналом).
+        :param background: True - файлы читаются и декодируются фоновым потоком, а convert_alpha() выполняется
+                           главным потоком при первом обращении к image(). False - загрузка сразу.
+        """
+        paths = [path for path in paths if (path, True) not in self.images]
+        if not background:
+            for path in paths:
+                self._load_image(path)
+            self.prewarmed += len(paths)
+            return
+        self.wait_prewarm()
+        if paths:
+            self.prewarm_thread = threading.Thread(target=self._stage, args=(paths,), name='asset-prewarm',
+                                                   daemon=True)
+            self.prewarm_thread.start()
+
+    def _stage(self, paths):
+        """Тело фонового потока предзагрузки: только чтение и декодирование файлов, без видеорежима."""
+        for path in paths:
+            if path not in self.staged:
+                self.staged[path] = pygame.image.load(path)
+                self.prewarmed += 1
+
+    def wait_prewarm(self):
+        """Дожидается окончания фоновой предзагрузки."""
+        if self.prewarm_thread is not None:
+            self.prewarm_thread.join()
+            self.prewarm_thread = None
+
+    def sound(self, path):
+        """Возвращает декодированный звук для файла path."""
+        sound = self.sounds.get(path)
+        if sound is not None:
+            self.hits += 1
+            return sound
+        self.misses += 1
+        sound = pygame.mixer.Sound(path)
+        self.sounds[path] = sound
+        return sound
+
+    def rotation_atlas(self, path, steps, base_angle=0):
+        """
+        Возвращает атлас поворотов для изображения path, общий для всех башен этого типа.
+        :param base_angle: Начальный поворот спрайта, если изображение нарисовано не в ту сторону.
+        """
+        key = (path, steps, base_angle)
+        atlas = self.atlases.get(key)
+        if atlas is not None:
+            self.hits += 1
+            return atlas
+        self.misses += 1
+        surface = self.image(path)
+        if base_angle:
+            surface = pygame.transform.rotate(surface, base_angle)
+        atlas = RotationAtlas(surface, steps)
+        self.atlases[key] = atlas
+        return atlas
+
+    def preload(self, settings, sounds=True):
+        """
+        Загружает при старте изображения башен, пуль и фона и звуки. Изображения врагов загружает уровень
+        (LevelBase.asset_paths), следующий уровень - заранее в фоне.
+        :param sounds: False, если микшер не инициализирован и звуки загружать нельзя.
+        """
+        for path in settings.tower_sprites.values():
+            self.image(path)
+        self.image(settings.bullet_sprite)
+        self.image(settings.background_image, alpha=False)
+        self.rotation_atlas(settings.tower_sprites['basic'], settings.rotation_steps)
+        self.rotation_atlas(settings.tower_sprites['sniper'], settings.rotation_steps, base_angle=90)
+        if sounds:
+            for path in settings.sound_ids.values():
+                self.sound(path)
+        # Счётчики после предзагрузки показывают только загрузки во время игры
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Возвращает статистику кэша: число ресурсов, попаданий и промахов."""
+        return {
+            'images': len(self.images),
+            'sounds': len(self.sounds),
+            'atlases': len(self.atlases),
+            'prewarmed': self.prewarmed,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
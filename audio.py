@@ -0,0 +1,109 @@
+"""Звуковой сервис: фиксированный пул каналов микшера, ограничение частоты одинаковых звуков и приоритеты категорий."""
+import pygame
+
+
+class AudioService:
+    """
+    Центральный менеджер звука. Объекты игры не создают и не проигрывают Sound сами, а вызывают play(sound_id).
+    Запросы копятся в течение кадра и обрабатываются один раз в update(), поэтому стоимость работы микшера за кадр
+    ограничена размером пула каналов и не зависит от количества пуль и врагов.
+    """
+    def __init__(self, assets, settings):
+        """Выделяет пул каналов и загружает звуки из таблицы settings.sound_ids."""
+        self.settings = settings
+        self.sounds = {sound_id: assets.sound(path) for sound_id, path in settings.sound_ids.items()}
+        pygame.mixer.set_num_channels(settings.audio_channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(settings.audio_channels)]
+        self.channel_priorities = [0] * len(self.channels)
+        self.pending = {}  # sound_id -> число запросов за текущий кадр
+        self.recent = {}  # sound_id -> времена запуска голосов внутри окна ограничения
+        self.played = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def priority(self, sound_id):
+        """Возвращает приоритет звука по его категории."""
+        category = self.settings.sound_categories.get(sound_id)
+        return self.settings.sound_category_priorities.get(category, 0)
+
+    def play(self, sound_id):
+        """Ставит звук в очередь на проигрывание в конце кадра."""
+        self.pending[sound_id] = self.pending.get(sound_id, 0) + 1
+
+    def play_music(self, path):
+        """Запускает фоновую музыку по кругу."""
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play(-1)
+
+    def update(self, current_time=None):
+        """Проигрывает накопленные за кадр запросы с учётом лимитов и приоритетов."""
+        if not self.pending:
+            return
+        if current_time is None:
+            current_time = pygame.time.get_ticks()
+        for sound_id in sorted(self.pending, key=self.priority, reverse=True):
+            requests = self.pending[sound_id]
+            max_voices, window = self.settings.sound_rate_limits.get(sound_id, self.settings.default_sound_rate_limit)
+            started = [t for t in self.recent.get(sound_id, ()) if current_time - t < window]
+            allowed = max(0, min(requests, max_voices - len(started)))
+            for _ in range(allowed):
+                if not self._start_voice(sound_id):
+                    break
+                started.append(current_time)
+            self.merged += requests - allowed
+            self.recent[sound_id] = started
+        self.pending.clear()
+
+    def _start_voice(self, sound_id):
+        """Запускает звук на свободном канале или вытесняет звук с меньшим приоритетом."""
+        priority = self.priority(sound_id)
+        victim = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                victim = i
+                break
+            if self.channel_priorities[i] < priority and \
+                    (victim is None or self.channel_priorities[i] < self.channel_priorities[victim]):
+                victim = i
+        if victim is None:
+            self.dropped += 1
+            return False
+        self.channels[victim].play(self.sounds[sound_id])
+        self.channel_priorities[victim] = priority
+        self.played += 1
+        return True
+
+    def stats(self):
+        """Возвращает счётчики проигранных, объединённых и отброшенных звуков."""
+        return {'played': self.played, 'merged': self.merged, 'dropped': self.dropped}
+
+
+class NullAudio:
+    """Беззвучный вариант сервиса для запуска игры без pygame.mixer.init()."""
+    def play(self, sound_id):
+        pass
+
+    def play_music(self, path):
+        pass
+
+    def update(self, current_time=None):
+        pass
+
+    def stats(self):
+        return {'played': 0, 'merged': 0, 'dropped': 0}
+
+
+def create_audio(assets, settings, enabled=True, log=None):
+    """
+    Создаёт звуковой сервис. Если звук выключен или микшер не удалось инициализировать, возвращает NullAudio.
+    :param log: Журнал игры (game_log.GameLog) для сообщения о том, что звук выключен.
+    """
+    if not enabled:
+        return NullAudio()
+    try:
+        pygame.mixer.init()
+        return AudioService(assets, settings)
+    except pygame.error as error:
+        if log is not None:
+            log.warning('audio_disabled', error=str(error))
+        return NullAudio()
@@ -0,0 +1,295 @@
+"""
+Набор воспроизводимых сценариев для замера скорости симуляции и отрисовки.
+Каждый сценарий запускается в отдельном процессе с фиктивными видео- и аудиодрайверами SDL, выполняет фиксированное
+число тиков и сообщает перцентили времени обновления и отрисовки тика, чистый прирост занятых блоков памяти за тик,
+память временных объектов тика, сборки мусора и пиковый RSS процесса.
+
+CPython не считает сами выделения памяти: sys.getallocatedblocks() и tracemalloc показывают только занятую
+память, и тик, который создаёт и освобождает тысячи объектов, даёт чистый прирост около нуля. Поэтому после
+замера времени отдельный проход с tracemalloc записывает для каждого тика пик памяти Python сверх её уровня на
+начало тика - объём временных объектов, созданных за тик (пиксели поверхностей SDL в него не входят).
+
+Примеры:
+    python bench.py --output bench_results.json
+    python bench.py --scenario enemies_10k --ticks 300
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json --threshold 0.2
+    python bench.py --recording session.tdr --scenario recording
+    python bench.py --snapshot late_wave.tds --scenario snapshot
+
+Сценарий recording воспроизводит записанную сессию игрока (replay.py) с её зерном и действиями, сценарий snapshot
+начинается с сохранённого состояния игры (snapshot.py, например, поздней волны после F5 в игре).
+
+С --baseline запуск завершается с кодом 1, если p95 времени обновления или отрисовки какого-либо сценария
+выросло больше чем на threshold относительно базового.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+WARMUP_TICKS = 30
+ALLOC_TICKS = 120  # Тиков прохода с tracemalloc
+COMPARED_METRICS = ('update_ms', 'draw_ms')
+
+
+def _new_game():
+    """Создаёт игру, в которой утечка врагов не заканчивает игру (сценарий должен отработать все тики)."""
+    from main import TowerDefenseGame
+    # Журнал в памяти: запись файла в фоновом потоке искажала бы замеры и засоряла журнал игрока
+    game = TowerDefenseGame(file_log=False)
+    game.game_over = lambda: None
+    game.settings.starting_money = 10 ** 9
+    return game
+
+
+def scenario_level1_full_grid():
+    """Уровень 1 с базовыми башнями на всех клетках сетки."""
+    game = _new_game()
+    for position in game.settings.tower_positions:
+        game.level.attempt_place_tower(position, 'basic')
+    return game
+
+
+def scenario_enemies_10k():
+    """10 000 врагов на enemy_path1, равномерно распределённых по пути, без башен."""
+    game = _new_game()
+    level = game.level
+    path = level.compiled_path(game.settings.enemy_path1)
+    image_path = game.settings.enemy_sprites['base']
+    count = 10000
+    for i in range(count):
+        enemy = level.create_enemy(game.settings.enemy_path1, speed=30, health=100, image_path=image_path)
+        # Враги не успевают дойти до конца пути за время сценария
+        enemy.distance = (path.length - 400) * i / count
+        enemy.update(0)
+        level.enemies.add(enemy)
+    return game
+
+
+def scenario_snipers_vs_bosses():
+    """200 снайперских башен против волны из 50 боссов на всех путях."""
+    game = _new_game()
+    level = game.level
+    # На сетке меньше 200 клеток, поэтому башни ставятся напрямую с шагом 48 пикселей
+    from tower import SniperTower
+    positions = [(x, y) for y in range(40, 800, 48) for x in range(40, 1200, 48)]
+    random.Random(1).shuffle(positions)
+    for position in positions[:200]:
+        level.add_tower(SniperTower(position, game))
+    image_path = game.settings.enemy_sprites['boss']
+    for i in range(50):
+        points = level.random_path[i % len(level.random_path)]
+        enemy = level.create_enemy(points, speed=30, health=10 ** 6, image_path=image_path)
+        enemy.distance = 20 * (i // len(level.random_path))
+        enemy.update(0)
+        level.enemies.add(enemy)
+    return game
+
+
+def scenario_recording(path):
+    """Записанная сессия игрока: действия выполняются перед теми же шагами симуляции, что и при записи."""
+    import replay
+    return replay.start_replay(replay.Recording.load(path), headless=False, file_log=False)
+
+
+def scenario_snapshot(path):
+    """Сохранённое состояние игры: уровень, волна, враги, башни, снаряды и таймеры."""
+    import snapshot
+    from main import TowerDefenseGame
+    game = TowerDefenseGame(file_log=False)
+    game.game_over = lambda: None
+    snapshot.load(game, path)
+    return game
+
+
+SCENARIOS = {
+    'level1_full_grid': scenario_level1_full_grid,
+    'enemies_10k': scenario_enemies_10k,
+    'snipers_vs_bosses': scenario_snipers_vs_bosses,
+    'recording': scenario_recording,
+    'snapshot': scenario_snapshot,
+}
+# Сценарии, которым нужен файл из одноимённого параметра командной строки
+FILE_SCENARIOS = ('recording', 'snapshot')
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль fraction (от 0 до 1) отсортированного списка методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(samples):
+    """Возвращает p50/p95/p99, среднее и максимум для списка времён в миллисекундах."""
+    ordered = sorted(samples)
+    return {
+        'p50': percentile(ordered, 0.50),
+        'p95': percentile(ordered, 0.95),
+        'p99': percentile(ordered, 0.99),
+        'mean': sum(ordered) / len(ordered) if ordered else 0.0,
+        'max': ordered[-1] if ordered else 0.0,
+    }
+
+
+def measure_transient(game, ticks):
+    """
+    Выполняет ticks тиков под tracemalloc без замера времени.
+    :return: Список пиков памяти Python сверх уровня на начало тика, КиБ.
+    """
+    tracemalloc.start()
+    transient_kib = []
+    try:
+        for _ in range(ticks):
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            game._simulate_step()
+            game._draw()
+            transient_kib.append((tracemalloc.get_traced_memory()[1] - start) / 1024)
+    finally:
+        tracemalloc.stop()
+    return transient_kib
+
+
+def run_scenario(name, ticks, recording=None, snapshot=None):
+    """
+    Выполняет сценарий name в текущем процессе.
+    :param recording: Файл записи сессии для сценария recording.
+    :param snapshot: Файл снимка состояния для сценария snapshot.
+    :return: Словарь с метриками сценария.
+    """
+    random.seed(0)
+    files = {'recording': recording, 'snapshot': snapshot}
+    game = SCENARIOS[name](files[name]) if name in FILE_SCENARIOS else SCENARIOS[name]()
+    for _ in range(WARMUP_TICKS):
+        game._simulate_step()
+        game._draw()
+
+    update_ms = []
+    draw_ms = []
+    gc_before = gc.get_stats()[0]['collections']
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(ticks):
+        start = time.perf_counter()
+        game._simulate_step()
+        middle = time.perf_counter()
+        game._draw()
+        end = time.perf_counter()
+        update_ms.append((middle - start) * 1000)
+        draw_ms.append((end - middle) * 1000)
+    blocks_after = sys.getallocatedblocks()
+    gc_after = gc.get_stats()[0]['collections']
+    transient_kib = measure_transient(game, min(ticks, ALLOC_TICKS))
+    game.log.close()
+
+    return {
+        'scenario': name,
+        'ticks': ticks,
+        'enemies': len(game.level.enemies),
+        'towers': len(game.level.towers),
+        'update_ms': summarize(update_ms),
+        'draw_ms': summarize(draw_ms),
+        'tick_ms': summarize([u + d for u, d in zip(update_ms, draw_ms)]),
+        # Чистый прирост: выделенные и освобождённые за тик блоки в него не входят
+        'net_blocks_per_tick': (blocks_after - blocks_before) / ticks,
+        'transient_kib_per_tick': summarize(transient_kib),
+        'gc_gen0_collections': gc_after - gc_before,
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_isolated(name, ticks, recording=None, snapshot=None):
+    """Запускает сценарий в отдельном процессе, чтобы пиковый RSS и кэши не зависели от других сценариев."""
+    command = [sys.executable, os.path.abspath(__file__), '--run-one', name, '--ticks', str(ticks)]
+    if recording:
+        command += ['--recording', recording]
+    if snapshot:
+        command += ['--snapshot', snapshot]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """
+    Сравнивает p95 времени обновления и отрисовки с базовым запуском.
+    :return: Список строк с описанием регрессий.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = base[metric]['p95'], result[metric]['p95']
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append(f"{name}: {metric} p95 {old:.3f} -> {new:.3f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tower Defense simulation and render benchmarks")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help="сценарий (можно несколько раз), по умолчанию все")
+    parser.add_argument('--ticks', type=int, default=600, help="количество замеряемых тиков")
+    parser.add_argument('--output', help="файл для результатов в JSON")
+    parser.add_argument('--save-baseline', help="сохранить результаты как базовые в этот файл")
+    parser.add_argument('--baseline', help="файл базовых результатов для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.2, help="допустимый рост p95, доля (0.2 = 20%%)")
+    parser.add_argument('--recording', help="файл записи сессии для сценария recording")
+    parser.add_argument('--snapshot', help="файл снимка состояния игры для сценария snapshot")
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    for name in FILE_SCENARIOS:
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if args.run_one:
+        print(json.dumps(run_scenario(args.run_one, args.ticks, args.recording, args.snapshot)))
+        return 0
+
+    names = args.scenario or [name for name in SCENARIOS if name not in FILE_SCENARIOS or getattr(args, name)]
+    for name in names:
+        if name in FILE_SCENARIOS and not getattr(args, name):
+            parser.error(f"the {name} scenario needs --{name}")
+    results = {}
+    for name in names:
+        result = results[name] = run_isolated(name, args.ticks, args.recording, args.snapshot)
+        print(f"{name:>20}: update p50 {result['update_ms']['p50']:7.3f} p95 {result['update_ms']['p95']:7.3f} "
+              f"p99 {result['update_ms']['p99']:7.3f} ms | draw p50 {result['draw_ms']['p50']:7.3f} "
+              f"p95 {result['draw_ms']['p95']:7.3f} p99 {result['draw_ms']['p99']:7.3f} ms | "
+              f"{result['net_blocks_per_tick']:+.1f} net blocks/tick, transient p95 "
+              f"{result['transient_kib_per_tick']['p95']:.1f} KiB/tick, peak RSS {result['peak_rss_mib']:.0f} MiB")
+
+    report = {'python': sys.version.split()[0], 'ticks': args.ticks, 'scenarios': results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Рабочая директория для относительных путей к ресурсам меняется в main() после разбора путей аргументов
+    sys.exit(main())
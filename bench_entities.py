@@ -0,0 +1,98 @@
+"""
+Сравнение скорости движения врагов: обычный цикл update() по спрайтам против векторизованного EnemyStore.
+Дополнительно измеряется память на одного врага в группе (tracemalloc).
+
+Пример:
+    python bench_entities.py --enemies 10000 --ticks 120
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+import pygame
+
+import entity_store
+from enemy import EnemyBase
+from main import TowerDefenseGame
+from paths import CompiledPath
+
+
+def bench_sprites(game, count, ticks):
+    """Замеряет время шага для группы обычных спрайтов EnemyBase."""
+    settings = game.settings
+    path = CompiledPath(settings.enemy_path1)
+    group = pygame.sprite.Group(
+        EnemyBase(path, speed=60, health=100, image_path=settings.enemy_sprites['base'], game=game)
+        for _ in range(count))
+    dt = game.sim_clock.dt
+    start = time.perf_counter()
+    for _ in range(ticks):
+        group.update(dt)
+    return (time.perf_counter() - start) / ticks
+
+
+def measure_footprint(game, count):
+    """Возвращает количество байт на одного врага EnemyBase, добавленного в группу спрайтов."""
+    settings = game.settings
+    path = CompiledPath(settings.enemy_path1)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    group = pygame.sprite.Group(
+        EnemyBase(path, speed=60, health=100, image_path=settings.enemy_sprites['base'], game=game)
+        for _ in range(count))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    group.empty()
+    return used / count
+
+
+def bench_store(game, count, ticks, sync=True):
+    """Замеряет время шага для EnemyStore (с синхронизацией спрайтов или без неё)."""
+    settings = game.settings
+    path = CompiledPath(settings.enemy_path1)
+    store = entity_store.EnemyStore()
+    group = pygame.sprite.Group(
+        entity_store.StoreEnemy(store, path, speed=60, health=100,
+                                image_path=settings.enemy_sprites['base'], game=game)
+        for _ in range(count))
+    dt = game.sim_clock.dt
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for enemy in store.step(dt):
+            enemy.kill()
+        if sync:
+            store.sync()
+    elapsed = (time.perf_counter() - start) / ticks
+    group.empty()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EnemyStore vs per-sprite update benchmark")
+    parser.add_argument('--enemies', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=120)
+    args = parser.parse_args()
+
+    if not entity_store.available():
+        print("numpy is not installed, EnemyStore is unavailable.")
+        return
+    game = TowerDefenseGame(headless=True)
+    budget_ms = game.sim_clock.step_ms
+    results = {
+        'per-sprite update': bench_sprites(game, args.enemies, args.ticks),
+        'EnemyStore + sync': bench_store(game, args.enemies, args.ticks),
+        'EnemyStore only': bench_store(game, args.enemies, args.ticks, sync=False),
+    }
+    print(f"{args.enemies} enemies, {args.ticks} ticks, budget {budget_ms:.2f} ms/tick")
+    for name, seconds in results.items():
+        print(f"{name:>20}: {seconds * 1000:8.3f} ms/tick")
+    print(f"{'memory per enemy':>20}: {measure_footprint(game, args.enemies):8.0f} bytes")
+
+
+if __name__ == '__main__':
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    main()
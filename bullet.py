@@ -1,31 +1,51 @@
-import pygame
 from pygame.math import Vector2
+from compact_sprite import CompactSprite
 
 
-class Bullet(pygame.sprite.Sprite):
+class Bullet(CompactSprite):
     """
     Класс пули, управляет движением пули, проверкой попаданий в врагов и нанесением урона.
     """
+    __slots__ = ('game', 'pool', 'pooled', 'image', 'rect', 'position', 'target', 'damage', 'velocity')
+
     def __init__(self, start_pos, target_pos, damage, game):
         super().__init__()
         self.game = game
-        self.image = pygame.image.load('assets/bullets/basic_bullet.png').convert_alpha()
+        self.pool = None  # Пул, в который пуля возвращается после kill()
+        self.pooled = False
+        self.image = game.assets.image(game.settings.bullet_sprite)
+        self.position = Vector2()
+        self.target = Vector2()
+        self.reset(start_pos, target_pos, damage)
+
+    def reset(self, start_pos, target_pos, damage):
+        """Переинициализирует пулю на месте, в том числе при повторном использовании из пула."""
         self.rect = self.image.get_rect(center=start_pos)
-        self.position = Vector2(start_pos)
-        self.target = Vector2(target_pos)
-        self.speed = 5
+        self.position.update(start_pos)
+        self.target.update(target_pos)
         self.damage = damage
         self.velocity = self.calculate_velocity()
-        self.shoot_sound = pygame.mixer.Sound('assets/sounds/shoot.wav')
-        self.shoot_sound.play()
+        self.game.audio.play('shoot')
+
+    @property
+    def speed(self):
+        """Скорость пули в пикселях в секунду симуляции, общая для всех пуль."""
+        return self.game.settings.bullet_speed
+
+    def kill(self):
+        """Удаляет пулю из всех групп и возвращает её в пул."""
+        super().kill()
+        if self.pool is not None:
+            self.pool.release(self)
 
     def calculate_velocity(self):
         direction = (self.target - self.position).normalize()
         velocity = direction * self.speed
         return velocity
 
-    def update(self):
-        self.position += self.velocity
+    def update(self, dt):
+        """Перемещает пулю за шаг симуляции длиной dt секунд."""
+        self.position += self.velocity * dt
         self.rect.center = self.position
         if self.position.distance_to(self.target) < 10 or not self.game.is_position_inside(self.position):
             self.kill()
@@ -0,0 +1,58 @@
+"""
+Компактный базовый спрайт для массовых сущностей (враги, пули, башни).
+pygame.sprite.Sprite хранит группы спрайта в отдельном set в __dict__ экземпляра; здесь группы лежат в кортеже
+в слоте, а наследники объявляют свои поля в __slots__. У Sprite нет __slots__, поэтому __dict__ у экземпляров
+остаётся, но ничего не хранит, и на спрайт не приходится отдельное множество групп.
+"""
+import pygame
+
+
+class CompactSprite(pygame.sprite.Sprite):
+    """Sprite, совместимый с группами pygame, с группами спрайта в слоте groups_in."""
+    __slots__ = ('groups_in',)
+
+    def __init__(self, *groups):
+        # Sprite.__init__ не вызывается: он создаёт set групп в __dict__
+        self.groups_in = ()
+        if groups:
+            self.add(*groups)
+
+    def add_internal(self, group):
+        if group not in self.groups_in:
+            self.groups_in += (group,)
+
+    def remove_internal(self, group):
+        self.groups_in = tuple(g for g in self.groups_in if g is not group)
+
+    def __repr__(self):
+        # Sprite.__repr__ читает множество групп, которого здесь нет
+        return f"<{type(self).__name__} Sprite(in {len(self.groups_in)} groups)>"
+
+    def groups(self):
+        return list(self.groups_in)
+
+    def alive(self):
+        return bool(self.groups_in)
+
+    def kill(self):
+        for group in self.groups_in:
+            group.remove_internal(self)
+        self.groups_in = ()
+
+    def add(self, *groups):
+        for group in groups:
+            if hasattr(group, "_spritegroup"):
+                if group not in self.groups_in:
+                    group.add_internal(self)
+                    self.add_internal(group)
+            else:
+                self.add(*group)
+
+    def remove(self, *groups):
+        for group in groups:
+            if hasattr(group, "_spritegroup"):
+                if group in self.groups_in:
+                    group.remove_internal(self)
+                    self.remove_internal(group)
+            else:
+                self.remove(*group)
@@ -1,63 +1,143 @@
 """Модуль определяет класс врага, его движение по карте, здоровье и получение урона."""
-import pygame
 from pygame.math import Vector2
+from paths import CompiledPath
+from compact_sprite import CompactSprite
+from events import EnemyKilled, EnemyLeaked
 
 
-class EnemyBase(pygame.sprite.Sprite):
-    def __init__(self, path, speed=2, health=10, image_path=None, game = None, reward=10):
+class EnemyType:
+    """
+    Общие для всех врагов одного вида характеристики. Записи создаются один раз на набор параметров и
+    разделяются всеми экземплярами, враг хранит только ссылку на свою запись.
+    """
+    __slots__ = ('speed', 'health', 'reward', 'image_path')
+    registry = {}
+
+    def __init__(self, speed, health, reward, image_path):
+        self.speed = speed  # Пикселей в секунду симуляции
+        self.health = health  # Начальное здоровье
+        self.reward = reward
+        self.image_path = image_path
+
+    @classmethod
+    def get(cls, speed, health, reward, image_path):
+        """Возвращает общую запись вида врага с такими характеристиками, создавая её при первом обращении."""
+        key = (speed, health, reward, image_path)
+        kind = cls.registry.get(key)
+        if kind is None:
+            kind = cls.registry[key] = cls(speed, health, reward, image_path)
+        return kind
+
+
+class EnemyBase(CompactSprite):
+    # Все поля врага лежат в слотах, общие характеристики вида - в записи kind
+    __slots__ = ('game', 'pool', 'pooled', 'generation', 'position', 'image', 'rect', 'kind', 'path',
+                 'distance', 'health')
+
+    def __init__(self, path=None, speed=120, health=10, image_path=None, game = None, reward=10):
 
         super().__init__()
-        self.image = pygame.Surface((30, 40))
-        self.image = pygame.image.load(image_path).convert_alpha()
-        self.rect = self.image.get_rect()
         self.game = game
+        self.pool = None  # Пул, в который враг возвращается после kill()
+        self.pooled = False
+        self.generation = 0  # Номер переиспользования, отличает нового врага от прежнего в том же объекте
+        self.position = Vector2()
+        # Без пути создаётся пустой враг, состояние которого запишет restore()
+        if path is not None:
+            self.reset(path, speed, health, image_path, reward)
+
+    def reset(self, path, speed=120, health=10, image_path=None, reward=10):
+        """Переинициализирует врага на месте, в том числе при повторном использовании из пула."""
+        self.generation += 1
+        self.image = self.game.assets.image(image_path)
+        self.rect = self.image.get_rect()
+        # Путь компилируется уровнем один раз, враг хранит только пройденное по нему расстояние
+        self.path = path if isinstance(path, CompiledPath) else CompiledPath(path)
+        self.distance = 0.0
+        self.kind = EnemyType.get(speed, health, reward, image_path)
+        self.health = health
+        self.position.update(self.path.points[0])
+        self.rect.center = self.position
+        self.game.audio.play('enemy_hit')
+
+    def restore(self, path, kind, image, distance, health):
+        """
+        Записывает сохранённое состояние врага (см. snapshot.py) без звука и поиска ресурсов, как при появлении.
+        :param path: Скомпилированный путь.
+        :param kind: Запись EnemyType вида врага.
+        :param image: Изображение вида врага.
+        """
+        self.generation += 1
+        self.image = image
+        self.rect = image.get_rect()
         self.path = path
-        self.path_index = 0
-        self.speed = speed
+        self.kind = kind
+        self.distance = distance
         self.health = health
-        self.reward = reward
-        self.position = Vector2(path[0])
+        self.position.update(path.position_at(distance))
         self.rect.center = self.position
-        self.enemy_hit_sound = pygame.mixer.Sound('assets/sounds/enemy_hit.wav')
-        self.enemy_hit_sound.play()
 
+    @property
+    def speed(self):
+        """Скорость вида врага в пикселях в секунду."""
+        return self.kind.speed
 
+    @property
+    def reward(self):
+        """Награда за уничтожение врага этого вида."""
+        return self.kind.reward
+
+    def kill(self):
+        """Удаляет врага из всех групп и возвращает его в пул."""
+        super().kill()
+        if self.pool is not None:
+            self.pool.release(self)
 
     def take_damage(self, amount):
+        # Несколько пуль могут попасть в одного врага за шаг: после убивающей урон уже не засчитывается
+        if not self.alive():
+            return
         self.health -= amount
         if self.health <= 0:
             self.on_death()
 
     def on_death(self):
         if self.game:
-            #Увеличение количество денег игрока при уничтожении врагов
-            self.game.settings.starting_money += self.reward
-            print(f"Enemy killed! Player rewarded with ${self.reward}. Total money: ${self.game.settings.starting_money}")
+            # Награду начисляет подписчик события EnemyKilled
+            self.game.events.post(EnemyKilled(self, self.reward, (self.position.x, self.position.y)))
             self.kill()  # Удаляем врага из игры
 
-    def update(self):
-        if self.path_index < len(self.path) - 1:
-            start_point = Vector2(self.path[self.path_index])
-            end_point = Vector2(self.path[self.path_index + 1])
-            direction = (end_point - start_point).normalize()
+    def leak(self):
+        """Враг дошёл до конца пути: сообщает об утечке и удаляется из игры."""
+        self.game.events.post(EnemyLeaked(self))
+        self.kill()
 
-            self.position += direction * self.speed
-            self.rect.center = self.position
+    def remaining_distance(self):
+        """Возвращает расстояние, которое врагу осталось пройти до выхода."""
+        return self.path.remaining(self.distance)
 
-            if self.position.distance_to(end_point) < self.speed:
-                self.path_index += 1
+    def is_on_screen(self):
+        """Проверяет, находится ли враг в пределах экрана."""
+        return self.path.is_on_screen(self.distance)
 
-            if self.path_index >= len(self.path) - 1:
-                self.game.game_over()
-                self.kill()
+    def update(self, dt):
+        """Перемещает врага по пути за шаг симуляции длиной dt секунд."""
+        self.distance += self.kind.speed * dt
+        self.position.update(self.path.position_at(self.distance))
+        self.rect.center = self.position
+
+        if self.distance >= self.path.length:
+            self.leak()
 
 
 class FastEnemy(EnemyBase):
     """
     Класс для создания врагов более быстрых, чем в базовом классе, но с низким здоровьем
     """
+    __slots__ = ()
+
     def __init__(self, path, game):
-        super().__init__(path=path, speed=3, health=10,
+        super().__init__(path=path, speed=180, health=10,
                          image_path='assets/enemies/fast_enemy.png', game=game, reward=50)
 
 
@@ -65,8 +145,10 @@ class StrongEnemy(EnemyBase):
     """
     Класс для создания врагов более медленных, но с высоким здоровьем
     """
+    __slots__ = ()
+
     def __init__(self, path, game):
-        super().__init__(path=path, speed=1, health=100,
+        super().__init__(path=path, speed=60, health=100,
                          image_path='assets/enemies/strong_enemy.png', game=game, reward=100)
 
 
@@ -74,6 +156,8 @@ class BossEnemy(EnemyBase):
     """
     Класс для создания очень медленных врагов, но с очень высоким здоровьем
     """
+    __slots__ = ()
+
     def __init__(self, path, game):
-        super().__init__(path=path, speed=0.5, health=300,
+        super().__init__(path=path, speed=30, health=300,
                          image_path='assets/enemies/boss_enemy.png', game=game, reward=200)
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+Необязательное хранилище врагов и пуль в виде структуры массивов NumPy.
+Позиции, скорости, пройденные по путям расстояния и здоровье всех живых сущностей лежат в непрерывных массивах, и вся группа
+продвигается одним векторизованным шагом за тик. Спрайты становятся тонкими представлениями: их position и rect
+синхронизируются из массивов для поиска целей, столкновений и отрисовки.
+
+Включается настройкой Settings.entity_store, требует установленного numpy.
+"""
+from bullet import Bullet
+from enemy import EnemyBase
+from paths import CompiledPath
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необязательная зависимость
+    np = None
+
+
+def available():
+    """Проверяет, установлен ли numpy."""
+    return np is not None
+
+
+def _grow(array, capacity):
+    """Возвращает копию массива с новой ёмкостью по первой оси."""
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class EnemyStore:
+    """
+    Массивы состояния врагов. Живые враги занимают слоты [0, count), при удалении последний слот переносится
+    на место удалённого, чтобы массивы оставались непрерывными. Положение на пути задаётся пройденным расстоянием
+    по скомпилированному пути (paths.CompiledPath).
+    """
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.positions = np.zeros((capacity, 2))
+        self.speeds = np.zeros(capacity)
+        self.health = np.zeros(capacity)
+        self.path_ids = np.zeros(capacity, dtype=np.int32)
+        self.distances = np.zeros(capacity)
+        self.views = []  # Спрайт для каждого слота
+        self.paths = {}  # Скомпилированный путь -> номер пути
+        self.lengths = np.zeros(0)
+        # Отрезки всех путей подряд. К накопленной длине прибавляется path_id * path_stride, поэтому один
+        # searchsorted по общему массиву находит отрезок для врагов на любых путях
+        self.path_stride = 0.0
+        self.segment_keys = np.zeros(0)
+        self.segment_cumulative = np.zeros(0)
+        self.segment_starts = np.zeros((0, 2))
+        self.segment_directions = np.zeros((0, 2))
+
+    def _path_id(self, path):
+        """Возвращает номер пути, добавляя таблицы нового пути при первом обращении."""
+        path_id = self.paths.get(path)
+        if path_id is not None:
+            return path_id
+        path_id = self.paths[path] = len(self.paths)
+        paths = list(self.paths)
+        self.lengths = np.array([compiled.length for compiled in paths])
+        self.path_stride = float(self.lengths.max()) + 1.0
+        self.segment_cumulative = np.concatenate([compiled.cumulative[:-1] for compiled in paths])
+        self.segment_keys = np.concatenate([np.array(compiled.cumulative[:-1]) + i * self.path_stride
+                                            for i, compiled in enumerate(paths)])
+        self.segment_starts = np.concatenate([np.array(compiled.points[:-1], dtype=float) for compiled in paths])
+        self.segment_directions = np.concatenate([np.array(compiled.directions) for compiled in paths])
+        return path_id
+
+    def spawn(self, view, path, speed, health=0):
+        """Добавляет врага на скомпилированный путь path и возвращает номер его слота."""
+        self._reserve(self.count + 1)
+        slot = self.count
+        self.positions[slot] = path.points[0]
+        self.speeds[slot] = speed
+        self.health[slot] = health
+        self.path_ids[slot] = self._path_id(path)
+        self.distances[slot] = 0.0
+        self.views.append(view)
+        self.count += 1
+        return slot
+
+    def adopt(self, views):
+        """
+        Занимает слоты для врагов без слота (восстановленных из снимка, см. LevelBase.restore_enemies) одной записью
+        в массивы: путь, скорость, позиция, здоровье и пройденное расстояние берутся из самих спрайтов.
+        """
+        start = self.count
+        end = start + len(views)
+        self._reserve(end)
+        slots = slice(start, end)
+        self.positions[slots] = [(view.position.x, view.position.y) for view in views]
+        self.speeds[slots] = [view.kind.speed for view in views]
+        self.health[slots] = [view.final_health for view in views]
+        self.path_ids[slots] = [self._path_id(view.path) for view in views]
+        self.distances[slots] = [view.final_distance for view in views]
+        for slot, view in enumerate(views, start):
+            view.slot = slot
+        self.views.extend(views)
+        self.count = end
+
+    def _reserve(self, count):
+        """Увеличивает ёмкость массивов (не меньше чем вдвое), если в них не помещается count врагов."""
+        if count <= len(self.speeds):
+            return
+        capacity = max(count, 2 * len(self.speeds))
+        self.positions = _grow(self.positions, capacity)
+        self.speeds = _grow(self.speeds, capacity)
+        self.health = _grow(self.health, capacity)
+        self.path_ids = _grow(self.path_ids, capacity)
+        self.distances = _grow(self.distances, capacity)
+
+    def remove(self, slot):
+        """Удаляет врага, перенося последний слот на освободившееся место."""
+        last = self.count - 1
+        if slot != last:
+            for array in (self.positions, self.speeds, self.health, self.path_ids, self.distances):
+                array[slot] = array[last]
+            moved = self.views[last]
+            self.views[slot] = moved
+            moved.slot = slot
+        self.views.pop()
+        self.count = last
+
+    def step(self, dt):
+        """
+        Продвигает всех врагов по их путям за шаг dt секунд.
+        :return: Список спрайтов врагов, дошедших до конца пути.
+        """
+        n = self.count
+        if n == 0:
+            return []
+        path_ids = self.path_ids[:n]
+        distances = self.distances[:n]
+        distances += self.speeds[:n] * dt
+        np.minimum(distances, self.lengths[path_ids], out=distances)
+        segments = np.searchsorted(self.segment_keys, distances + path_ids * self.path_stride, side='right') - 1
+        offsets = distances - self.segment_cumulative[segments]
+        self.positions[:n] = self.segment_starts[segments] + self.segment_directions[segments] * offsets[:, None]
+        leaked = np.flatnonzero(distances >= self.lengths[path_ids])
+        return [self.views[slot] for slot in leaked]
+
+    def sync(self):
+        """Копирует позиции из массивов в спрайты (position и rect.center)."""
+        for view, (x, y) in zip(self.views, self.positions[:self.count].tolist()):
+            view.position.update(x, y)
+            view.rect.center = (x, y)
+
+
+class BulletStore:
+    """Массивы состояния пуль: позиция, скорость и точка назначения."""
+    def __init__(self, screen_size, capacity=256):
+        """
+        :param screen_size: (ширина, высота) экрана, за пределами которого пули удаляются.
+        """
+        self.screen_size = screen_size
+        self.count = 0
+        self.positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.targets = np.zeros((capacity, 2))
+        self.views = []
+
+    def spawn(self, view, position, velocity, target):
+        """Добавляет пулю и возвращает номер её слота."""
+        if self.count == len(self.positions):
+            capacity = 2 * len(self.positions)
+            self.positions = _grow(self.positions, capacity)
+            self.velocities = _grow(self.velocities, capacity)
+            self.targets = _grow(self.targets, capacity)
+        slot = self.count
+        self.positions[slot] = position
+        self.velocities[slot] = velocity
+        self.targets[slot] = target
+        self.views.append(view)
+        self.count += 1
+        return slot
+
+    def remove(self, slot):
+        """Удаляет пулю, перенося последний слот на освободившееся место."""
+        last = self.count - 1
+        if slot != last:
+            for array in (self.positions, self.velocities, self.targets):
+                array[slot] = array[last]
+            moved = self.views[last]
+            self.views[slot] = moved
+            moved.slot = slot
+        self.views.pop()
+        self.count = last
+
+    def step(self, dt):
+        """
+        Продвигает все пули за шаг dt секунд.
+        :return: Список спрайтов пуль, долетевших до цели или покинувших экран.
+        """
+        n = self.count
+        if n == 0:
+            return []
+        positions = self.positions[:n]
+        positions += self.velocities[:n] * dt
+        offset = positions - self.targets[:n]
+        width, height = self.screen_size
+        done = (np.hypot(offset[:, 0], offset[:, 1]) < 10) | \
+               (positions[:, 0] < 0) | (positions[:, 0] > width) | (positions[:, 1] < 0) | (positions[:, 1] > height)
+        return [self.views[slot] for slot in np.flatnonzero(done)]
+
+    def sync(self):
+        """Копирует позиции из массивов в спрайты."""
+        for view, (x, y) in zip(self.views, self.positions[:self.count].tolist()):
+            view.position.update(x, y)
+            view.rect.center = (x, y)
+
+
+class StoreEnemy(EnemyBase):
+    """Спрайт-представление врага, движение и здоровье которого хранятся в EnemyStore."""
+    __slots__ = ('store', 'slot', 'final_health', 'final_distance')
+
+    def __init__(self, store, path=None, speed=120, health=10, image_path=None, game=None, reward=10):
+        self.store = store
+        self.slot = None
+        self.final_health = health
+        self.final_distance = 0.0
+        super().__init__(path, speed, health, image_path, game, reward)
+
+    def reset(self, path, speed=120, health=10, image_path=None, reward=10):
+        """Занимает слот в хранилище и переинициализирует врага."""
+        if not isinstance(path, CompiledPath):
+            path = CompiledPath(path)
+        self.slot = self.store.spawn(self, path, speed)
+        super().reset(path, speed, health, image_path, reward)
+
+    @property
+    def health(self):
+        if self.slot is None:
+            return self.final_health
+        return float(self.store.health[self.slot])
+
+    @health.setter
+    def health(self, value):
+        if self.slot is None:
+            self.final_health = value
+        else:
+            self.store.health[self.slot] = value
+
+    @property
+    def distance(self):
+        if self.slot is None:
+            return self.final_distance
+        return float(self.store.distances[self.slot])
+
+    @distance.setter
+    def distance(self, value):
+        if self.slot is None:
+            self.final_distance = value
+        else:
+            self.store.distances[self.slot] = value
+
+    def update(self, dt):
+        """Движение выполняет EnemyStore.step для всей группы сразу."""
+        pass
+
+    def kill(self):
+        """Удаляет врага из групп и освобождает слот хранилища."""
+        if self.slot is not None:
+            self.final_health = self.health
+            self.final_distance = self.distance
+            self.store.remove(self.slot)
+            self.slot = None
+        super().kill()
+
+
+class StoreBullet(Bullet):
+    """Спрайт-представление пули, движение которой хранится в BulletStore."""
+    __slots__ = ('store', 'slot')
+
+    def __init__(self, store, start_pos, target_pos, damage, game):
+        self.store = store
+        self.slot = None
+        super().__init__(start_pos, target_pos, damage, game)
+
+    def reset(self, start_pos, target_pos, damage):
+        """Переинициализирует пулю и занимает слот в хранилище."""
+        super().reset(start_pos, target_pos, damage)
+        self.slot = self.store.spawn(self, self.position, self.velocity, self.target)
+
+    def update(self, dt):
+        """Движение выполняет BulletStore.step для всей группы сразу."""
+        pass
+
+    def kill(self):
+        """Удаляет пулю из групп и освобождает слот хранилища."""
+        if self.slot is not None:
+            self.store.remove(self.slot)
+            self.slot = None
+        super().kill()
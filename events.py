@@ -0,0 +1,103 @@
+"""
+Шина игровых событий. Объекты игры не меняют деньги, счётчики и звук напрямую, а публикуют события; подписчики
+(экономика, звук, статистика) получают их пачкой один раз за шаг симуляции.
+"""
+
+
+class EnemyKilled:
+    """Враг уничтожен башней."""
+    __slots__ = ('enemy', 'reward', 'position')
+
+    def __init__(self, enemy, reward, position):
+        """
+        :param enemy: Спрайт врага (после kill() может быть переиспользован пулом).
+        :param reward: Награда за уничтожение.
+        :param position: Позиция врага в момент гибели (x, y).
+        """
+        self.enemy = enemy
+        self.reward = reward
+        self.position = position
+
+
+class EnemyLeaked:
+    """Враг дошёл до конца пути."""
+    __slots__ = ('enemy',)
+
+    def __init__(self, enemy):
+        self.enemy = enemy
+
+
+class TowerPlaced:
+    """Башня построена."""
+    __slots__ = ('tower', 'tower_type', 'cost')
+
+    def __init__(self, tower, tower_type, cost):
+        self.tower = tower
+        self.tower_type = tower_type
+        self.cost = cost
+
+
+class TowerUpgraded:
+    """Башня улучшена до уровня level."""
+    __slots__ = ('tower', 'level', 'cost')
+
+    def __init__(self, tower, level, cost):
+        self.tower = tower
+        self.level = level
+        self.cost = cost
+
+
+class WaveStarted:
+    """Началась волна wave (с 0) уровня level."""
+    __slots__ = ('level', 'wave')
+
+    def __init__(self, level, wave):
+        self.level = level
+        self.wave = wave
+
+
+class EventBus:
+    """
+    Очередь событий с доставкой пачками. post() только добавляет событие в очередь, dispatch() раз за шаг
+    симуляции вызывает каждого подписчика один раз со списком всех событий его типа в порядке публикации.
+    """
+    def __init__(self):
+        self.queue = []
+        self.handlers = {}  # Тип события -> список подписчиков
+        self.listeners = []  # Подписчики на все события (статистика, отладка)
+        self.counts = {}  # Имя типа события -> количество доставленных событий
+
+    def subscribe(self, event_type, handler):
+        """Подписывает handler(events) на события типа event_type."""
+        self.handlers.setdefault(event_type, []).append(handler)
+
+    def subscribe_all(self, handler):
+        """Подписывает handler(events) на все события; получает всю пачку шага целиком."""
+        self.listeners.append(handler)
+
+    def post(self, event):
+        """Публикует событие, оно будет доставлено при следующем dispatch()."""
+        self.queue.append(event)
+
+    def dispatch(self):
+        """Доставляет накопленные события подписчикам. События, опубликованные подписчиками, попадают в ту же доставку."""
+        while self.queue:
+            events, self.queue = self.queue, []
+            batches = {}
+            for event in events:
+                batches.setdefault(type(event), []).append(event)
+            for event_type, batch in batches.items():
+                name = event_type.__name__
+                self.counts[name] = self.counts.get(name, 0) + len(batch)
+                for handler in self.handlers.get(event_type, ()):
+                    handler(batch)
+            for handler in self.listeners:
+                handler(events)
+
+    def clear(self):
+        """Отбрасывает недоставленные события."""
+        self.queue.clear()
+
+    def stats(self):
+        """Возвращает количество доставленных событий по типам."""
+        return dict(self.counts)
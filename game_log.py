@@ -0,0 +1,142 @@
+"""
+Неблокирующий структурированный журнал игры. Записи фиксированного вида (время симуляции, уровень, событие, поля)
+складываются в кольцевой буфер в памяти, а фоновый поток раз в flush_interval секунд сбрасывает их в сжатый
+файл JSON-lines. Главный цикл не делает ни одной операции ввода-вывода.
+
+Записи ниже установленного уровня отбрасываются первой же проверкой, до построения записи. В горячих местах
+поля стоит вычислять только под проверкой enabled():
+
+    if game.log.enabled(DEBUG):
+        game.log.debug('target', tower=id(tower), enemies=len(enemies))
+"""
+import collections
+import gzip
+import json
+import os
+import sys
+import threading
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning', ERROR: 'error'}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+OFF = ERROR + 10
+
+
+class GameLog:
+    """Журнал с кольцевым буфером и фоновым сбросом на диск."""
+    def __init__(self, path=None, level='info', capacity=4096, flush_interval=0.5, clock=None, console=False):
+        """
+        :param path: Файл журнала (.jsonl.gz), дописывается. None - записи только в буфере памяти (без потока).
+        :param level: Минимальный записываемый уровень: 'debug', 'info', 'warning', 'error' или 'off'.
+        :param capacity: Размер кольцевого буфера. При переполнении вытесняются самые старые записи.
+        :param flush_interval: Период сброса буфера фоновым потоком, секунды.
+        :param clock: Функция, возвращающая текущее время симуляции в мс (для поля t записи).
+        :param console: Дублировать записи в stderr из фонового потока.
+        """
+        self.min_level = LEVELS.get(level, OFF) if isinstance(level, str) else level
+        self.buffer = collections.deque(maxlen=capacity)
+        self.clock = clock
+        self.path = path
+        self.console = console
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0  # Записи, вытесненные из переполненного буфера до сброса
+        self.stop_event = threading.Event()
+        self.thread = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.thread = threading.Thread(target=self._run, name='game-log', daemon=True)
+            self.thread.start()
+
+    def enabled(self, level):
+        """Проверяет, будут ли записаны записи уровня level."""
+        return level >= self.min_level
+
+    def log(self, level, event, /, **fields):
+        """
+        Добавляет запись в буфер.
+        :param level: Уровень записи (DEBUG, INFO, WARNING, ERROR).
+        :param event: Короткое имя события в snake_case.
+        :param fields: Данные записи, должны сериализоваться в JSON. Имена level и event тоже допустимы.
+        """
+        if level < self.min_level:
+            return
+        buffer = self.buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped += 1
+        buffer.append((self.clock() if self.clock else None, level, event, fields))
+
+    def debug(self, event, /, **fields):
+        if DEBUG >= self.min_level:
+            self.log(DEBUG, event, **fields)
+
+    def info(self, event, /, **fields):
+        if INFO >= self.min_level:
+            self.log(INFO, event, **fields)
+
+    def warning(self, event, /, **fields):
+        if WARNING >= self.min_level:
+            self.log(WARNING, event, **fields)
+
+    def error(self, event, /, **fields):
+        if ERROR >= self.min_level:
+            self.log(ERROR, event, **fields)
+
+    def records(self):
+        """Возвращает ещё не сброшенные записи в виде словарей (для отладки и журнала в памяти)."""
+        return [self._record(entry) for entry in list(self.buffer)]
+
+    @staticmethod
+    def _record(entry):
+        """Преобразует запись буфера в словарь фиксированной схемы."""
+        sim_time, level, event, fields = entry
+        return {'t': sim_time, 'level': LEVEL_NAMES.get(level, level), 'event': event, 'data': fields}
+
+    def _run(self):
+        """Цикл фонового потока: сброс буфера раз в flush_interval до остановки."""
+        while not self.stop_event.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        """Забирает записи из буфера и дописывает их в файл."""
+        lines = []
+        buffer = self.buffer
+        while buffer:
+            try:
+                entry = buffer.popleft()
+            except IndexError:
+                break
+            lines.append(json.dumps(self._record(entry), ensure_ascii=False, default=str))
+        if not lines:
+            return
+        text = '\n'.join(lines) + '\n'
+        # Каждый сброс - отдельный gzip-член, файл остаётся читаемым gzip.open() целиком
+        with gzip.open(self.path, 'at', encoding='utf-8') as file:
+            file.write(text)
+        if self.console:
+            sys.stderr.write(text)
+        self.written += len(lines)
+
+    def close(self):
+        """Останавливает фоновый поток и сбрасывает оставшиеся записи."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        """Возвращает количество записанных, ожидающих и вытесненных записей."""
+        return {'written': self.written, 'buffered': len(self.buffer), 'dropped': self.dropped}
+
+
+def read_log(path):
+    """Читает сжатый журнал и возвращает список записей."""
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
@@ -1,12 +1,23 @@
+import math
 import pygame
+from events import TowerUpgraded
+from tower import BasicTower, SniperTower
 
+try:
+    import numpy as np
+except ImportError:  # numpy - необязательная зависимость, без него карта покрытия недоступна
+    np = None
 
-"""Отвечает за управление сеткой, на которой игрок может размещать башни, проверку на доступность места для 
+
+"""Отвечает за управление сеткой, на которой игрок может размещать башни, проверку на доступность места для
 размещения башни."""
 
 
 class Grid:
-    """Отвечает за сетку, где игрок может размещать башни."""
+    """
+    Отвечает за сетку, где игрок может размещать башни. Занятость хранится в двумерном массиве клеток, поэтому
+    проверка места и регистрация башни выполняются за O(1).
+    """
     def __init__(self, game):
         """Инициализирует сетку."""
         self.game = game
@@ -14,29 +25,105 @@ class Grid:
         self.screen = game.screen
         self.available_spots = self.settings.tower_positions
         self.towers = []
+        self.cell_width, self.cell_height = self.settings.grid_size
+        self.cols = math.ceil(self.settings.screen_width / self.cell_width)
+        self.rows = math.ceil(self.settings.screen_height / self.cell_height)
+        # buildable[row][col] - клетка из tower_positions, occupied[row][col] - башня в клетке или None
+        self.buildable = [[False] * self.cols for _ in range(self.rows)]
+        for spot in self.available_spots:
+            col, row = self.cell_of(spot)
+            self.buildable[row][col] = True
+        self.occupied = [[None] * self.cols for _ in range(self.rows)]
+        self.coverage = None  # Карта покрытия путей, создаётся при первой отрисовке подсказок
+        self.version = 0  # Меняется при любом изменении занятости или покрытия
+        game.events.subscribe(TowerUpgraded, self._on_towers_upgraded)
 
     def update(self):
         """Может использоваться для обновления сетки."""
         pass
 
-    def draw(self):
-        """Отображает сетку на экране."""
+    def cell_of(self, position):
+        """Возвращает (столбец, строка) клетки, содержащей точку position."""
+        return int(position[0] // self.cell_width), int(position[1] // self.cell_height)
+
+    def in_bounds(self, col, row):
+        return 0 <= col < self.cols and 0 <= row < self.rows
+
+    def draw_key(self):
+        """Ключ содержимого отрисовки сетки: статический слой пересобирается только при его изменении."""
+        return self.version, self.game.selected_tower_type
+
+    def draw(self, surface=None):
+        """
+        Отображает сетку на экране или на переданной поверхности (статический слой карты). Свободные клетки
+        закрашиваются по доле непокрытого башнями пути, который накроет башня выбранного типа, занятые
+        обводятся красным.
+        """
+        surface = surface or self.screen
+        hints = None
+        coverage = self.coverage_map()
+        if coverage is not None:
+            hints = coverage.hint(self.game.selected_tower_type)
         for spot in self.available_spots:
-            pygame.draw.circle(self.screen, (0, 255, 0), spot, 15, 2)
+            col, row = self.cell_of(spot)
+            if self.occupied[row][col] is not None:
+                pygame.draw.circle(surface, (255, 0, 0), spot, 15, 2)
+                continue
+            if hints is not None and hints[row, col] > 0:
+                shade = int(255 * hints[row, col])
+                pygame.draw.circle(surface, (255 - shade, 255, 0), spot, 13)
+            pygame.draw.circle(surface, (0, 255, 0), spot, 15, 2)
 
     def place_tower(self, tower=None):
         """Размещает башню на сетке."""
         grid_pos = self.get_grid_position(tower.position)
-        if grid_pos in self.available_spots and not any(tower.rect.collidepoint(grid_pos) for tower in self.towers):
-            self.towers.append(tower)
-            return True
-        return False
+        if not self.is_spot_available(grid_pos):
+            return False
+        col, row = self.cell_of(grid_pos)
+        self.occupied[row][col] = tower
+        self.towers.append(tower)
+        if self.coverage is not None:
+            self.coverage.add_tower(tower)
+        self.version += 1
+        return True
 
     def remove_tower(self, tower):
         """Удаляет башню с сетки."""
         if tower in self.towers:
             self.towers.remove(tower)
+            col, row = self.cell_of(tower.position)
+            self.occupied[row][col] = None
+            if self.coverage is not None:
+                self.coverage.remove_tower(tower)
+            self.version += 1
+
+    def _on_towers_upgraded(self, events):
+        """Учитывает изменение огневой мощи улучшенных башен в карте покрытия."""
+        if self.coverage is None:
+            return
+        for event in events:
+            if event.tower in self.towers:
+                self.coverage.update_tower(event.tower)
+                self.version += 1
+
+    def clear(self):
+        """Освобождает все клетки (при переходе на следующий уровень)."""
+        self.towers = []
+        self.occupied = [[None] * self.cols for _ in range(self.rows)]
+        if self.coverage is not None:
+            self.coverage.clear()
+        self.version += 1
 
+    def coverage_map(self):
+        """Возвращает карту покрытия путей, вычисляя её при первом обращении. None, если numpy не установлен."""
+        if self.coverage is None and np is not None:
+            settings = self.settings
+            paths = [settings.enemy_path1, settings.enemy_path2, settings.enemy_path3,
+                     settings.enemy_path4, settings.enemy_path5]
+            self.coverage = CoverageMap(self, paths)
+            for tower in self.towers:
+                self.coverage.add_tower(tower)
+        return self.coverage
 
     def get_grid_position(self, mouse_pos):
         """
@@ -55,4 +142,109 @@ class Grid:
 
     def is_spot_available(self, grid_pos):
         """Проверяет, доступно ли место для размещения башни."""
-        return grid_pos in self.available_spots and all(not tower.rect.collidepoint(grid_pos) for tower in self.towers)
\ No newline at end of file
+        col, row = self.cell_of(grid_pos)
+        return self.in_bounds(col, row) and self.buildable[row][col] and self.occupied[row][col] is None
+
+
+class CoverageMap:
+    """
+    Покрытие путей врагов башнями (NumPy). Пути разбиваются на точки с шагом в один пиксель. Для каждого вида
+    башни заранее считается, какие точки пути попадают в её радиус из каждой клетки, где можно строить.
+    Огневая мощь башен по точкам пути обновляется при установке, улучшении и удалении башни.
+    """
+    def __init__(self, grid, paths):
+        """
+        :param grid: Сетка уровня.
+        :param paths: Списки точек путей врагов.
+        """
+        self.grid = grid
+        width, height = grid.settings.screen_width, grid.settings.screen_height
+        samples = [self._sample(path) for path in paths]
+        points = np.concatenate(samples)
+        path_ids = np.concatenate([np.full(len(sample), i) for i, sample in enumerate(samples)])
+        visible = (points[:, 0] >= 0) & (points[:, 0] <= width) & (points[:, 1] >= 0) & (points[:, 1] <= height)
+        self.points = points[visible]
+        self.path_ids = path_ids[visible]  # Номер пути для каждой точки
+        # Центры клеток, где можно строить
+        self.cells = [(row, col) for row in range(grid.rows) for col in range(grid.cols) if grid.buildable[row][col]]
+        self.cell_index = {cell: i for i, cell in enumerate(self.cells)}
+        centers = np.array([((col + 0.5) * grid.cell_width, (row + 0.5) * grid.cell_height)
+                            for row, col in self.cells], dtype=float).reshape(-1, 2)
+        offsets = centers[:, None, :] - self.points[None, :, :]
+        distances_sq = (offsets ** 2).sum(axis=2)
+        # reach[тип][клетка, точка] - точка пути в радиусе башни этого типа, стоящей в клетке
+        self.reach = {}
+        # counts[тип][путь, строка, столбец] - количество пикселей пути в радиусе башни из клетки
+        self.counts = {}
+        for tower_class in (BasicTower, SniperTower):
+            kind = tower_class.kind
+            reach = distances_sq <= kind.tower_range ** 2
+            self.reach[kind.name] = reach
+            counts = np.zeros((len(paths), grid.rows, grid.cols), dtype=np.int32)
+            for path_id in range(len(paths)):
+                per_cell = np.count_nonzero(reach[:, self.path_ids == path_id], axis=1)
+                for i, (row, col) in enumerate(self.cells):
+                    counts[path_id, row, col] = per_cell[i]
+            self.counts[kind.name] = counts
+        self.firepower = np.zeros(len(self.points))  # Урон в секунду по каждой точке пути от всех башен
+        self.applied = {}  # Башня -> учтённая огневая мощь
+        self.hints = {}  # Тип -> кэш подсказки до следующего изменения покрытия
+
+    @staticmethod
+    def _sample(path):
+        """Разбивает ломаную на точки с шагом около одного пикселя."""
+        samples = []
+        for (x0, y0), (x1, y1) in zip(path, path[1:]):
+            steps = max(int(math.hypot(x1 - x0, y1 - y0)), 1)
+            t = np.arange(steps) / steps
+            samples.append(np.stack([x0 + (x1 - x0) * t, y0 + (y1 - y0) * t], axis=1))
+        samples.append(np.array([path[-1]], dtype=float))
+        return np.concatenate(samples)
+
+    def _apply(self, tower, firepower):
+        """Приводит вклад башни tower в покрытие к firepower, меняя только точки пути в её радиусе."""
+        reach = self.reach.get(tower.kind.name)
+        index = self.cell_index.get(self.grid.cell_of(tower.position)[::-1])
+        if reach is None or index is None:
+            return
+        delta = firepower - self.applied.get(tower, 0)
+        if firepower:
+            self.applied[tower] = firepower
+        else:
+            self.applied.pop(tower, None)
+        if delta:
+            self.firepower[reach[index]] += delta
+            self.hints = {}
+
+    def add_tower(self, tower):
+        self._apply(tower, tower.damage * 1000 / tower.rate_of_fire if tower.rate_of_fire else 0)
+
+    def update_tower(self, tower):
+        self.add_tower(tower)
+
+    def remove_tower(self, tower):
+        self._apply(tower, 0)
+
+    def clear(self):
+        self.firepower[:] = 0
+        self.applied = {}
+        self.hints = {}
+
+    def hint(self, tower_type):
+        """
+        Подсказка для размещения: доля непокрытых башнями точек пути, которые накроет башня типа tower_type
+        из каждой клетки, от максимума по всем клеткам.
+        :return: Массив (rows, cols) значений от 0 до 1 или None для типа без радиуса.
+        """
+        if tower_type not in self.reach:
+            return None
+        hint = self.hints.get(tower_type)
+        if hint is None:
+            uncovered = np.count_nonzero(self.reach[tower_type] & (self.firepower <= 1e-9), axis=1)
+            hint = np.zeros((self.grid.rows, self.grid.cols))
+            for i, (row, col) in enumerate(self.cells):
+                hint[row, col] = uncovered[i]
+            if hint.max() > 0:
+                hint /= hint.max()
+            self.hints[tower_type] = hint
+        return hint
@@ -0,0 +1,111 @@
+"""
+Запуск игры без окна, звука и шрифтов с максимальной скоростью симуляции.
+Башни расставляются по сценарию, по окончании возвращается сводка результата. Используется для быстрой проверки
+изменений баланса.
+
+Пример:
+    python headless.py --script placements.json --level 1 --max-time 600
+    python headless.py --script placements.json --alloc-monitor --alloc-budget 64
+
+С --alloc-budget запуск завершается с кодом 1, если p95 временной памяти шага симуляции превышает бюджет в КиБ
+(см. alloc_monitor.py).
+
+Формат сценария (JSON): список размещений или объект {"level": 1, "placements": [...]}, где каждое размещение -
+{"time": 0, "tower": "basic", "pos": [96, 224]} (время симуляции в миллисекундах, позиция в пикселях).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from main import TowerDefenseGame
+
+
+def load_script(path):
+    """Загружает сценарий размещения башен из JSON-файла."""
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if isinstance(data, list):
+        return {'placements': data}
+    return data
+
+
+def count_cleared_waves(game):
+    """Возвращает количество пройденных волн по всем уровням."""
+    cleared = sum(spec.wave_count for spec in game.level_specs[:game.current_level_index])
+    if game.level.all_waves_complete:
+        return cleared + len(game.level.waves)
+    return cleared + game.level.current_wave
+
+
+def run_headless(placements=(), level=1, max_sim_time=30 * 60 * 1000, alloc_monitor=False, alloc_budget=None,
+                 seed=None):
+    """
+    Запускает симуляцию без отрисовки.
+    :param placements: Список размещений {"time": мс, "tower": тип, "pos": [x, y]}.
+    :param level: Номер уровня, с которого начинается игра (с 1).
+    :param max_sim_time: Ограничение по времени симуляции в миллисекундах.
+    :param alloc_monitor: True - добавить в сводку отчёт монитора выделений памяти.
+    :param alloc_budget: Допустимая временная память шага симуляции в КиБ (p95).
+    :param seed: Зерно генератора случайных чисел игры (None - случайное).
+    :return: Словарь со сводкой результата.
+    """
+    game = TowerDefenseGame(headless=True, alloc_monitor=alloc_monitor, alloc_budget=alloc_budget, seed=seed)
+    if level != 1:
+        game.start_level(level - 1)
+
+    script = sorted(placements, key=lambda entry: entry.get('time', 0))
+    cursor = 0
+    start = time.perf_counter()
+    while not game.is_game_over and not game.is_game_won and game.sim_clock.time < max_sim_time:
+        while cursor < len(script) and script[cursor].get('time', 0) <= game.sim_clock.time:
+            entry = script[cursor]
+            game.level.attempt_place_tower(tuple(entry['pos']), entry['tower'])
+            cursor += 1
+        game._simulate_step()
+        game.profiler.frame_end()  # Без отрисовки кадр - это один шаг симуляции
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'seed': game.seed,
+        'result': 'won' if game.is_game_won else 'lost' if game.is_game_over else 'timeout',
+        'level': game.current_level_index + 1,
+        'waves_cleared': count_cleared_waves(game),
+        'money': game.settings.starting_money,
+        'leaks': game.leaks,
+        'events': game.events.stats(),
+        'sim_time_s': game.sim_clock.time / 1000,
+        'sim_steps': game.sim_clock.steps,
+        'wall_time_s': elapsed,
+        'steps_per_second': game.sim_clock.steps / elapsed if elapsed > 0 else 0,
+    }
+    if game.alloc_monitor is not None:
+        summary['allocations'] = game.alloc_monitor.report()
+        summary['over_budget'] = game.alloc_monitor.over_budget()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Tower Defense simulation")
+    parser.add_argument('--script', help="JSON-файл со сценарием размещения башен")
+    parser.add_argument('--level', type=int, help="номер начального уровня (по умолчанию 1)")
+    parser.add_argument('--max-time', type=float, default=1800, help="ограничение времени симуляции, с")
+    parser.add_argument('--seed', type=int, help="зерно генератора случайных чисел")
+    parser.add_argument('--alloc-monitor', action='store_true', help="добавить в сводку отчёт о выделениях памяти")
+    parser.add_argument('--alloc-budget', type=float, help="допустимая временная память шага симуляции, КиБ (p95)")
+    args = parser.parse_args()
+
+    script = load_script(args.script) if args.script else {}
+    level = args.level or script.get('level', 1)
+    summary = run_headless(script.get('placements', []), level, args.max_time * 1000,
+                           alloc_monitor=args.alloc_monitor or args.alloc_budget is not None,
+                           alloc_budget=args.alloc_budget, seed=args.seed)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary.get('over_budget') else 0
+
+
+if __name__ == '__main__':
+    # Рабочая директория нужна для относительных путей к ресурсам
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -1,57 +1,219 @@
 import pygame
+from paths import CompiledPath
 from enemy import EnemyBase, FastEnemy, StrongEnemy, BossEnemy
+from bullet import Bullet
 from tower import BasicTower, SniperTower, MoneyTower
-import random
+from targeting import TargetIndex
+from projectiles import ScheduledHits, intercept
+from pool import SpritePool
+from scheduler import TimerWheel
+from events import TowerPlaced, WaveStarted
+import entity_store
 
 """содержит логику уровня, управление волнами врагов, их спавн, а также расстановку башен и обработку коллизий."""
 
 
+class VisibleRenderUpdates(pygame.sprite.RenderUpdates):
+    """Группа врагов, которая рисует только видимых врагов (EnemyBase.is_on_screen)."""
+    def draw(self, surface, bgsurf=None, special_flags=0):
+        """Рисует видимых врагов и возвращает изменённые области, как RenderUpdates.draw."""
+        surface_blit = surface.blit
+        dirty = self.lostsprites
+        self.lostsprites = []
+        spritedict = self.spritedict
+        for sprite in self.sprites():
+            old_rect = spritedict[sprite]
+            if not sprite.is_on_screen():
+                # Область прошлого кадра стирается, clear() пропускает спрайты с пустой записью
+                if old_rect:
+                    dirty.append(old_rect)
+                spritedict[sprite] = 0
+                continue
+            new_rect = surface_blit(sprite.image, sprite.rect, None, special_flags)
+            if old_rect and new_rect.colliderect(old_rect):
+                dirty.append(new_rect.union(old_rect))
+            else:
+                dirty.append(new_rect)
+                if old_rect:
+                    dirty.append(old_rect)
+            spritedict[sprite] = new_rect
+        return dirty
+
+
 class LevelBase:
-    """Базовый класс для уровней игры.Управляет уровнем игры, волнами врагов и расстановкой башен."""
-    def __init__(self, game):
-        """Инициализирует уровень игры."""
+    """
+    Управляет уровнем игры, волнами врагов и расстановкой башен.
+    Уровень строится по описанию waves.LevelSpec, загруженному из файла уровня.
+    """
+    def __init__(self, game, spec):
+        """
+        Инициализирует уровень игры.
+        :param spec: Описание уровня (waves.LevelSpec).
+        """
         self.game = game
-        self.enemies = pygame.sprite.Group()
-        self.towers = pygame.sprite.Group()
-        self.bullets = pygame.sprite.Group()
-        # Определяется в наследниках
-        self.enemy_paths = []
+        self.spec = spec
+        # RenderUpdates возвращает изменённые области для отрисовки по грязным прямоугольникам
+        self.enemies = VisibleRenderUpdates()
+        self.towers = pygame.sprite.RenderUpdates()
+        self.bullets = pygame.sprite.RenderUpdates()
+        # Трассеры аналитических выстрелов: только отрисовка, без проверки столкновений
+        self.tracers = pygame.sprite.RenderUpdates()
+        self.scheduled_hits = ScheduledHits()
+        # Пути врагов компилируются один раз на уровень
+        self.compiled_paths = {}
+        # Индекс врагов для выбора целей башнями: клетки сетки и порядок по продвижению и здоровью
+        self.enemy_index = TargetIndex(self.game.settings.spatial_cell_size)
+        # Колесо таймеров: перезарядка башен и генерация денег срабатывают только в свой тик
+        self.timers = TimerWheel(self.game.sim_clock.step_ms)
+        self.ready_towers = {}  # Башни с законченной перезарядкой, которые ищут цель (dict сохраняет порядок)
+        # Необязательное NumPy-хранилище: враги и пули двигаются одним векторизованным шагом
+        self.enemy_store = None
+        self.bullet_store = None
+        if self.game.settings.entity_store and entity_store.available():
+            self.enemy_store = entity_store.EnemyStore()
+            self.bullet_store = entity_store.BulletStore((self.game.settings.screen_width,
+                                                          self.game.settings.screen_height))
+        # Пулы спрайтов: убитые враги и пули переиспользуются вместо создания новых объектов
+        pool_limit = self.game.settings.pool_limit
+        self.enemy_pool = SpritePool(self._new_enemy, pool_limit)
+        self.bullet_pool = SpritePool(self._new_bullet, pool_limit)
+        self.tracer_pool = SpritePool(lambda start_pos, target_pos, damage: Bullet(start_pos, target_pos, damage,
+                                                                                   self.game), pool_limit)
         self.random_path = [self.game.settings.enemy_path1, self.game.settings.enemy_path2, self.game.settings.enemy_path3,
                             self.game.settings.enemy_path4, self.game.settings.enemy_path5]
-        self.waves = [
-            [{'path': random.choice(self.random_path), 'speed': 1, 'health': 100,
-              'image_path': 'assets/enemies/basic_enemy.png'}] * 5,
-            [{'path': random.choice(self.random_path), 'speed': 1.5, 'health': 150,
-              'image_path': 'assets/enemies/fast_enemy.png'}] * 7,
-            [{'path': random.choice(self.random_path), 'speed': 0.75, 'health': 200,
-              'image_path': 'assets/enemies/strong_enemy.png'}] * 4,
-            [{'path': random.choice(self.random_path), 'speed': 2, 'health': 1000,
-              'image_path': 'assets/enemies/boss_enemy.png'}] * 10,
-        ]
+        self.enemy_paths = self.random_path
+        # Расписания появления врагов по волнам
+        self.waves = spec.compile(len(self.enemy_paths), self.game.rng)
 
         self.current_wave = 0
-        self.spawned_enemies = 0
-        self.spawn_delay = 1000
-        self.last_spawn_time = pygame.time.get_ticks()
+        self.spawn_cursor = 0  # Следующая запись расписания текущей волны
+        self.wave_start_time = self.game.sim_clock.time
         self.all_waves_complete = False
-        self.start_next_wave()
-        self.spawn_sound = pygame.mixer.Sound("assets/sounds/spawn.wav")
-        self.font = pygame.font.SysFont("Arial", 24)
-        self.start_next_wave()
+        self.started = False  # Первая волна запускается при первом обновлении уровня
+        self.font = game.font
 
     def start_next_wave(self):
         """Запускает следующую волну врагов."""
         if self.current_wave < len(self.waves):
-            self.spawned_enemies = 0
-            self.spawn_next_enemy()
+            self.spawn_cursor = 0
+            self.wave_start_time = self.game.sim_clock.time
+            self.game.events.post(WaveStarted(self, self.current_wave))
+            if self.current_wave == len(self.waves) - 1:
+                # Последняя волна: ресурсы следующего уровня загружаются в фоне
+                self.game.prewarm_next_level()
+            self.spawn_due_enemies()
+
+    def spawn_due_enemies(self):
+        """Создаёт врагов текущей волны, время появления которых наступило, сдвигая курсор по расписанию."""
+        timeline = self.waves[self.current_wave]
+        times = timeline.times
+        elapsed = self.game.sim_clock.time - self.wave_start_time
+        cursor = self.spawn_cursor
+        while cursor < len(times) and times[cursor] <= elapsed:
+            enemy_info = self.spec.enemy_types[timeline.types[cursor]]
+            self.enemies.add(self.create_enemy(self.enemy_paths[timeline.paths[cursor]], **enemy_info))
+            cursor += 1
+        self.spawn_cursor = cursor
+
+    def wave_spawned(self):
+        """Проверяет, все ли враги текущей волны уже появились."""
+        return self.spawn_cursor >= len(self.waves[self.current_wave])
+
+    def add_tower(self, tower):
+        """Добавляет башню на уровень и регистрирует её таймеры."""
+        self.towers.add(tower)
+        tower.start_timers(self)
+
+    def release(self):
+        """
+        Освобождает ресурсы пройденного уровня: спрайты, группы, пулы, таймеры и хранилища.
+        Общие поверхности остаются в кэше ресурсов.
+        """
+        for group in self.sprite_groups():
+            group.empty()
+        for pool in (self.enemy_pool, self.bullet_pool, self.tracer_pool):
+            pool.free.clear()
+        self.scheduled_hits.clear()
+        self.timers = TimerWheel(self.game.sim_clock.step_ms)
+        self.ready_towers = {}
+        self.enemy_index.rebuild(())
+        self.compiled_paths = {}
+        self.enemy_store = None
+        self.bullet_store = None
+
+    def compiled_path(self, points):
+        """Возвращает скомпилированный путь для списка точек, компилируя его при первом обращении."""
+        key = tuple(points)
+        path = self.compiled_paths.get(key)
+        if path is None:
+            settings = self.game.settings
+            path = self.compiled_paths[key] = CompiledPath(points, (settings.screen_width, settings.screen_height),
+                                                           settings.visibility_margin)
+        return path
 
-    def spawn_next_enemy(self):
-        """Генерирует следующего врага текущей волны."""
-        if self.spawned_enemies < len(self.waves[self.current_wave]):
-            enemy_info = self.waves[self.current_wave][self.spawned_enemies]
-            new_enemy = EnemyBase(**enemy_info, game=self.game)
-            self.enemies.add(new_enemy)
-            self.spawned_enemies += 1
+    def _new_enemy(self, path=None, **enemy_info):
+        """Создаёт новый объект врага: обычный спрайт или представление в хранилище сущностей."""
+        if self.enemy_store is not None:
+            return entity_store.StoreEnemy(self.enemy_store, path, game=self.game, **enemy_info)
+        return EnemyBase(path, game=self.game, **enemy_info)
+
+    def _new_bullet(self, start_pos, target_pos, damage):
+        """Создаёт новый объект пули: обычный спрайт или представление в хранилище сущностей."""
+        if self.bullet_store is not None:
+            return entity_store.StoreBullet(self.bullet_store, start_pos, target_pos, damage, self.game)
+        return Bullet(start_pos, target_pos, damage, self.game)
+
+    def create_enemy(self, path, **enemy_info):
+        """Берёт врага из пула."""
+        return self.enemy_pool.acquire(self.compiled_path(path), **enemy_info)
+
+    def restore_enemies(self, states):
+        """
+        Восстанавливает врагов из снимка состояния без побочных эффектов появления (звук, поиск вида и изображения
+        для каждого врага): сохранённые поля записываются прямо в спрайты из пула.
+        :param states: Кортежи (скомпилированный путь, запись EnemyType, пройденное расстояние, здоровье).
+        :return: Список врагов в порядке states, ещё не добавленных в группу.
+        """
+        pool = self.enemy_pool
+        images = {}
+        enemies = []
+        for path, kind, distance, health in states:
+            image = images.get(kind)
+            if image is None:
+                image = images[kind] = self.game.assets.image(kind.image_path)
+            enemy = pool.acquire_blank()
+            enemy.restore(path, kind, image, distance, health)
+            enemies.append(enemy)
+        if self.enemy_store is not None:
+            # Враги из пула без слота: поля записаны в final_health и final_distance и переносятся в массивы разом
+            self.enemy_store.adopt(enemies)
+        return enemies
+
+    def create_bullet(self, start_pos, target_pos, damage):
+        """Берёт пулю из пула."""
+        return self.bullet_pool.acquire(start_pos, target_pos, damage)
+
+    def pool_stats(self):
+        """Возвращает счётчики пулов врагов, пуль и трассеров."""
+        return {
+            'enemies': self.enemy_pool.stats(),
+            'bullets': self.bullet_pool.stats(),
+            'tracers': self.tracer_pool.stats(),
+        }
+
+    def fire(self, tower, target):
+        """Выстрел башни по цели в зависимости от Settings.projectile_mode."""
+        settings = self.game.settings
+        if settings.projectile_mode == 'physical':
+            self.bullets.add(self.create_bullet(tower.position, target.position, tower.damage))
+            return
+        hit = intercept(tower.position, target, settings.bullet_speed)
+        if hit is None:
+            return
+        delay, point = hit
+        self.scheduled_hits.schedule(self.game.sim_clock.time + delay * 1000, target, tower.damage)
+        if not self.game.headless:
+            self.tracers.add(self.tracer_pool.acquire(tower.position, point, tower.damage))
 
     def attempt_place_tower(self, mouse_pos, tower_type):
         """Пытается разместить башню выбранного типа в позиции курсора."""
@@ -59,102 +221,117 @@ class LevelBase:
         if tower_type in tower_classes and self.game.settings.starting_money >= self.game.settings.tower_costs[tower_type]:
             grid_pos = self.game.grid.get_grid_position(mouse_pos)
             if self.game.grid.is_spot_available(grid_pos):
-                self.game.settings.starting_money -= self.game.settings.tower_costs[tower_type]
+                cost = self.game.settings.tower_costs[tower_type]
+                self.game.settings.starting_money -= cost
                 new_tower = tower_classes[tower_type](grid_pos, self.game)
-                self.towers.add(new_tower)
-                print("Tower placed.")
+                self.game.grid.place_tower(new_tower)
+                self.add_tower(new_tower)
+                self.game.events.post(TowerPlaced(new_tower, tower_type, cost))
+                self.game.log.info('tower_placed', tower=tower_type, pos=list(grid_pos), cost=cost)
             else:
-                print("Invalid position for tower.")
+                self.game.log.warning('invalid_tower_position', tower=tower_type, pos=list(grid_pos))
         else:
-            print("Not enough money or unknown tower type.")
+            self.game.log.warning('tower_not_affordable', tower=tower_type, money=self.game.settings.starting_money)
 
     def update(self):
-        """Обновляет состояние уровня, врагов, башен и пуль."""
-        current_time = pygame.time.get_ticks()
-
-        """Генерирует врагов."""
-        if self.current_wave < len(self.waves) and self.spawned_enemies < len(self.waves[self.current_wave]):
-            if current_time - self.last_spawn_time > self.spawn_delay:
-                enemy_info = self.waves[self.current_wave][self.spawned_enemies].copy()
-                enemy_info['game'] = self.game
-                new_enemy = EnemyBase(**enemy_info)
-                self.enemies.add(new_enemy)
-                self.spawned_enemies += 1
-                self.last_spawn_time = current_time
-
-        """Обработка столкновений пуль и врагов."""
-        collisions = pygame.sprite.groupcollide(self.bullets, self.enemies, True, False)
-        for bullet in collisions:
-            for enemy in collisions[bullet]:
-                enemy.take_damage(bullet.damage)
+        """Обновляет состояние уровня, врагов, башен и пуль за один шаг симуляции."""
+        current_time = self.game.sim_clock.time
+        dt = self.game.sim_clock.dt
+        prof = self.game.profiler
+        if not self.started:
+            self.started = True
+            self.start_next_wave()
+
+        """Появление врагов по расписанию волны и наступившие таймеры: перезарядка башен, генерация денег."""
+        prof.begin('spawn')
+        if not self.wave_spawned():
+            self.spawn_due_enemies()
+        self.timers.advance(current_time)
+        prof.end()
+
+        """Обработка попаданий: отложенные аналитические попадания и столкновения физических пуль."""
+        prof.begin('hits')
+        self.scheduled_hits.apply_due(current_time)
+        if self.bullets:
+            collisions = pygame.sprite.groupcollide(self.bullets, self.enemies, True, False)
+            for bullet in collisions:
+                for enemy in collisions[bullet]:
+                    enemy.take_damage(bullet.damage)
+        prof.end()
 
         """Обновление врагов, башен и пуль."""
-        self.enemies.update()
-        for tower in self.towers:
-            tower.update(self.enemies, current_time, self.bullets)
-        self.bullets.update()
+        prof.begin('enemies')
+        if self.enemy_store is not None:
+            for enemy in self.enemy_store.step(dt):
+                enemy.leak()
+            self.enemy_store.sync()
+        else:
+            self.enemies.update(dt)
+        prof.end()
+        prof.begin('towers')
+        # Цель ищут только перезарядившиеся башни, остальные ждут своего таймера
+        if self.ready_towers:
+            # Враги за пределами экрана целью не выбираются: видимость - поиск по заранее отсечённым участкам пути
+            self.enemy_index.rebuild(enemy for enemy in self.enemies if enemy.is_on_screen())
+            for tower in list(self.ready_towers):
+                if tower.update(self.enemy_index, current_time, self.bullets):
+                    del self.ready_towers[tower]
+                    tower.start_timers(self)
+        prof.end()
+        prof.begin('bullets')
+        if self.bullet_store is not None:
+            for bullet in self.bullet_store.step(dt):
+                bullet.kill()
+            self.bullet_store.sync()
+        else:
+            self.bullets.update(dt)
+        self.tracers.update(dt)
+        prof.end()
 
-        """Проверка завершения волны."""
-        if len(self.enemies) == 0 and self.current_wave < len(self.waves) - 1:
-            self.current_wave += 1
-            self.start_next_wave()
-        elif len(self.enemies) == 0 and self.current_wave == len(self.waves) - 1:
-            self.all_waves_complete = True
+        """Проверка завершения волны: все враги волны появились и ни одного не осталось на поле."""
+        if len(self.enemies) == 0 and not self.all_waves_complete and self.wave_spawned():
+            if self.current_wave < len(self.waves) - 1:
+                self.current_wave += 1
+                self.start_next_wave()
+            else:
+                self.all_waves_complete = True
 
     def draw(self, screen):
         """Отрисовывает уровень, включая врагов, башни и пули."""
+        self.draw_paths(screen)
+        self.draw_sprites(screen)
+        self.draw_overlays(screen)
+
+    def draw_paths(self, surface):
+        """Отображает пути врагов. Пути не меняются во время уровня, поэтому рисуются в статический слой."""
         #pygame.draw.lines(screen, (0, 128, 0), False, random.choice(self.random_path), 5)
-        pygame.draw.lines(screen, (0, 128, 0), False, self.game.settings.enemy_path1, 5)
-        pygame.draw.lines(screen, (0, 128, 0), False, self.game.settings.enemy_path2, 5)
-        pygame.draw.lines(screen, (0, 128, 0), False, self.game.settings.enemy_path3, 5)
-        pygame.draw.lines(screen, (0, 128, 0), False, self.game.settings.enemy_path4, 5)
-        pygame.draw.lines(screen, (0, 128, 0), False, self.game.settings.enemy_path5, 5)
-
-        self.enemies.draw(screen)
-        self.towers.draw(screen)
-        self.bullets.draw(screen)
-        mouse_pos = pygame.mouse.get_pos()
-        for tower in self.towers:
-            tower.draw(screen)
-            if tower.is_hovered(mouse_pos):
-                tower_stats_text = self.font.render(f"Damage: {tower.damage}, Range: {tower.tower_range}", True,
-                                                    (255, 255, 255))
-                screen.blit(tower_stats_text, (tower.rect.x, tower.rect.y - 20))
+        pygame.draw.lines(surface, (0, 128, 0), False, self.game.settings.enemy_path1, 5)
+        pygame.draw.lines(surface, (0, 128, 0), False, self.game.settings.enemy_path2, 5)
+        pygame.draw.lines(surface, (0, 128, 0), False, self.game.settings.enemy_path3, 5)
+        pygame.draw.lines(surface, (0, 128, 0), False, self.game.settings.enemy_path4, 5)
+        pygame.draw.lines(surface, (0, 128, 0), False, self.game.settings.enemy_path5, 5)
 
+    def sprite_groups(self):
+        """Возвращает группы спрайтов в порядке отрисовки."""
+        return self.enemies, self.towers, self.bullets, self.tracers
 
-class Level1(LevelBase):
-    def __init__(self, game):
-        super().__init__(game)
-        self.enemy_paths = self.random_path
-        self.waves = [
-            [{'path': random.choice(self.enemy_paths), 'speed': 1, 'health': 100, 'image_path': 'assets/enemies/basic_enemy.png', 'reward': 10}] * 5,
-            [{'path': random.choice(self.enemy_paths), 'speed': 2, 'health': 50, 'image_path': 'assets/enemies/fast_enemy.png', 'reward': 15}] * 10,
-            [{'path': random.choice(self.enemy_paths), 'speed': 1, 'health': 200, 'image_path': 'assets/enemies/strong_enemy.png', 'reward': 30}] * 4,
-            [{'path': random.choice(self.enemy_paths), 'speed': 1, 'health': 300, 'image_path': 'assets/enemies/strong_enemy.png', 'reward': 40}] * 3,
-            [{'path': random.choice(self.enemy_paths), 'speed': 0.5, 'health': 500, 'image_path': 'assets/enemies/boss_enemy.png', 'reward': 100}] * 1,
-        ]
-
-
-class Level2(LevelBase):
-    def __init__(self, game):
-        super().__init__(game)
-        self.enemy_paths = self.random_path
-        self.waves = [
-            [{'path': random.choice(self.enemy_paths), 'speed': 3, 'health': 50, 'image_path': 'assets/enemies/fast_enemy.png', 'reward': 15}] * 8,
-            [{'path': random.choice(self.enemy_paths), 'speed': 1, 'health': 200, 'image_path': 'assets/enemies/strong_enemy.png', 'reward': 30}] * 6,
-            [{'path': random.choice(self.enemy_paths), 'speed': 1.5, 'health': 150, 'image_path': 'assets/enemies/strong_enemy.png', 'reward': 25}] * 5,
-            [{'path': random.choice(self.enemy_paths), 'speed': 0.8, 'health': 400, 'image_path': 'assets/enemies/boss_enemy.png', 'reward': 100}] * 2,
-        ]
+    def draw_sprites(self, screen):
+        """Отрисовывает врагов, башни и пули."""
+        for group in self.sprite_groups():
+            group.draw(screen)
 
+    def draw_overlays(self, screen):
+        """
+        Отображает подсказку для башни под курсором (башни уже нарисованы группой).
+        :return: Список областей экрана, занятых подсказками.
+        """
+        rects = []
+        mouse_pos = pygame.mouse.get_pos()
+        for tower in self.towers:
+            if tower.is_hovered(mouse_pos):
+                rects.extend(tower.draw_tooltip(screen))
+                tower_stats_text = self.game.text_cache.render(
+                    self.font, f"Damage: {tower.damage}, Range: {tower.tower_range}, Target: {tower.targeting}", (255, 255, 255))
+                rects.append(screen.blit(tower_stats_text, (tower.rect.x, tower.rect.y - 20)))
+        return rects
 
-class Level3(LevelBase):
-    def __init__(self, game):
-        super().__init__(game)
-        self.enemy_paths = self.random_path
-        self.waves = [
-            [{'path': random.choice(self.enemy_paths), 'speed': 1.3, 'health': 100, 'image_path': 'assets/enemies/basic_enemy.png', 'reward': 10}] * 5,
-            [{'path': random.choice(self.enemy_paths), 'speed': 3, 'health': 50, 'image_path': 'assets/enemies/fast_enemy.png', 'reward': 15}] * 6,
-            [{'path': random.choice(self.enemy_paths), 'speed': 1.5, 'health': 200, 'image_path': 'assets/enemies/strong_enemy.png', 'reward': 30}] * 4,
-            [{'path': random.choice(self.enemy_paths), 'speed': 0.5, 'health': 500, 'image_path': 'assets/enemies/boss_enemy.png', 'reward': 100}] * 1,
-            [{'path': random.choice(self.enemy_paths), 'speed': 2, 'health': 150, 'image_path': 'assets/enemies/fast_enemy.png', 'reward': 20}] * 5,
-        ]
\ No newline at end of file
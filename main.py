@@ -1,8 +1,22 @@
 import pygame
+import argparse
+import random
 import sys
 from settings import Settings
-from level import LevelBase, Level1, Level2, Level3
+from assets import AssetManager
+from audio import create_audio, NullAudio
+from text_cache import TextCache, HudLabel
+from renderer import Renderer
+from sim_clock import SimulationClock
+from level import LevelBase
+from waves import load_level_specs
 from grid import Grid
+from game_log import GameLog
+from profiler import Profiler
+from alloc_monitor import AllocationMonitor
+from replay import InputRecorder, TOWER_TYPES
+import snapshot
+from events import EventBus, EnemyKilled, EnemyLeaked, TowerUpgraded, WaveStarted
 
 """
 Главный модуль проекта, содержащий основной игровой цикл,  обработку событий, обновление состояний игры и отрисовку 
@@ -14,41 +28,90 @@ class TowerDefenseGame:
     """
     Класс игры, управляющий основным циклом игры, событиями, обновлениями состояний и отрисовкой.
     """
-    def __init__(self):
+    def __init__(self, headless=False, alloc_monitor=False, alloc_budget=None, seed=None, record_path=None,
+                 file_log=True):
         """
          Конструктор, инициализирует основные параметры игры, загружает ресурсы и создаёт объекты уровня и сетки.
+         :param headless: True - без окна, звука и шрифтов (для быстрой симуляции, см. headless.py).
+         :param alloc_monitor: True - считать выделения памяти по шагам, фазам и волнам (см. alloc_monitor.py).
+         :param alloc_budget: Допустимая временная память шага симуляции в КиБ (p95).
+         :param seed: Зерно генератора случайных чисел игры (None - случайное).
+         :param record_path: Файл для записи действий игрока (см. replay.py).
+         :param file_log: False - журнал только в памяти, даже с окном (для замеров, см. bench.py).
         """
-        pygame.init()
-        pygame.mixer.init()
+        self.headless = headless
+        # Все случайные решения игры (выбор путей врагов) берутся из этого генератора, поэтому сессия
+        # воспроизводится по зерну и записанным действиям игрока
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
         self.settings = Settings()
-        self.screen = pygame.display.set_mode((self.settings.screen_width, self.settings.screen_height))
+        if headless:
+            self.screen = None
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode((self.settings.screen_width, self.settings.screen_height))
 
-        """Создание, настройки игрового окна."""
-        pygame.display.set_caption("Tower Defense Game")
+            """Создание, настройки игрового окна."""
+            pygame.display.set_caption("Tower Defense Game")
         self.clock = pygame.time.Clock()
+        self.sim_clock = SimulationClock(self.settings.sim_rate, self.settings.max_sim_steps)
+        # В headless режиме журнал остаётся в памяти, файл и фоновый поток не создаются
+        log_path = self.settings.log_path if file_log and not headless else None
+        self.log = GameLog(log_path, self.settings.log_level,
+                           self.settings.log_buffer_size, self.settings.log_flush_interval,
+                           clock=lambda: self.sim_clock.time, console=self.settings.log_console)
+        # Профилировщик фаз кадра (F3 - оверлей, F4 - запись трассы), выключен по умолчанию
+        self.profiler = Profiler(self.settings.profile_history)
+        self.alloc_monitor = AllocationMonitor(self, alloc_budget) if alloc_monitor else None
+
+        """Загрузка изображений и звуков в общий кэш ресурсов."""
+        # Без видеорежима convert_alpha() недоступен, поэтому в headless режиме поверхности не преобразуются
+        self.assets = AssetManager(convert=not headless)
+        self.audio = create_audio(self.assets, self.settings, enabled=not headless, log=self.log)
+        self.assets.preload(self.settings, sounds=not isinstance(self.audio, NullAudio))
+        self.leaks = 0  # Количество врагов, дошедших до конца пути
+
+        # Шина событий: экономика, звук и счётчики обновляются подписчиками раз за шаг симуляции
+        self.events = EventBus()
+        self.events.subscribe(EnemyKilled, self._on_enemies_killed)
+        self.events.subscribe(EnemyLeaked, self._on_enemies_leaked)
+        self.events.subscribe(TowerUpgraded, lambda events: self.audio.play('upgrade'))
+        self.events.subscribe(WaveStarted, lambda events: self.audio.play('spawn'))
+        if self.alloc_monitor is not None:
+            self.alloc_monitor.start()
+        # Автосохранение включает только игровой цикл run_game(), а не замеры и воспроизведение
+        self.autosave_pending = False
+
+        """Создание объекта шрифта"""
+        self.font = None if headless else pygame.font.SysFont("Arial", 24)
 
-        """Загрузка изображения."""
-        self.background = pygame.image.load(self.settings.background_image).convert()
-        self.background = pygame.transform.scale(self.background,
-                                                 (self.settings.screen_width, self.settings.screen_height))
-        # Инициализация уровней2
-        self.levels = [Level1(self), Level2(self), Level3(self)]  # Список уровней
+        # Уровни описываются файлами в levels_dir, объект создаётся только для текущего уровня
+        self.level_specs = load_level_specs(self.settings.levels_dir)
         self.current_level_index = 0  # Индекс текущего уровня
-        self.level = self.levels[self.current_level_index]  # Текущий уровень
+        self.level = None  # Текущий уровень
         self.grid = Grid(self)
+        self.start_level(0)
         self.show_grid = False #по умолчанию
-        """Создание объекта шрифта"""
-        self.font = pygame.font.SysFont("Arial", 24)
-
-        """Загрузка звуков."""
-        self.shoot_sound = pygame.mixer.Sound(self.settings.shoot_sound)
-        self.upgrade_sound = pygame.mixer.Sound(self.settings.upgrade_sound)
-        self.upgrade_sound.play()
-        self.sell_sound = pygame.mixer.Sound(self.settings.sell_sound)
-        self.sell_sound.play()
-        self.enemy_hit_sound = pygame.mixer.Sound(self.settings.enemy_hit_sound)
-        pygame.mixer.music.load(self.settings.background_music)
-        pygame.mixer.music.play(-1)
+        self.recorder = InputRecorder(self, record_path) if record_path else None
+        self.replayer = None  # replay.InputReplayer, выполняющий записанные действия перед шагами симуляции
+
+        if not headless:
+            self.background = self.assets.image(self.settings.background_image, alpha=False)
+            self.background = pygame.transform.scale(self.background,
+                                                     (self.settings.screen_width, self.settings.screen_height))
+            self.text_cache = TextCache(self.settings.text_cache_size)
+            self.hud_labels = {
+                'money': HudLabel(self.text_cache, self.font, "Money: ${}"),
+                'tower': HudLabel(self.text_cache, self.font, "Selected Tower: {}"),
+                'waves': HudLabel(self.text_cache, self.font, "Waves Left: {}"),
+                'enemies': HudLabel(self.text_cache, self.font, "Enemies Left: {}"),
+            }
+            self.renderer = Renderer(self)
+
+        """Запуск звуков."""
+        self.audio.play('upgrade')
+        self.audio.play('sell')
+        self.audio.play_music(self.settings.background_music)
 
         self.selected_tower_type = 'basic'
         self.is_game_over = False
@@ -58,6 +121,48 @@ class TowerDefenseGame:
         """Обрабатывает условия окончания игры."""
         self.is_game_over = True
 
+    def _on_enemies_killed(self, events):
+        """Начисляет награду за уничтоженных за шаг врагов."""
+        reward = sum(event.reward for event in events)
+        self.settings.starting_money += reward
+        self.log.info('enemies_killed', count=len(events), reward=reward, money=self.settings.starting_money)
+
+    def _on_enemies_leaked(self, events):
+        """Учитывает врагов, дошедших до конца пути. Любая утечка заканчивает игру."""
+        self.leaks += len(events)
+        self.log.warning('enemies_leaked', count=len(events), leaks=self.leaks)
+        self.game_over()
+
+    def finish_recording(self):
+        """Дописывает окончание записи сессии, если она идёт: при выходе из игры, проигрыше или победе."""
+        if self.recorder is not None and not self.recorder.closed:
+            self.recorder.close()
+            self.log.info('session_recorded', path=self.recorder.path, seed=self.seed,
+                          inputs=len(self.recorder.recording.inputs), steps=self.sim_clock.steps)
+
+    def _on_waves_started_autosave(self, events):
+        self.autosave_pending = True
+
+    def save_snapshot(self, path):
+        """Сохраняет снимок состояния игры в файл path."""
+        size = snapshot.save(self, path)
+        self.log.info('snapshot_saved', path=path, bytes=size, step=self.sim_clock.steps)
+
+    def load_snapshot(self, path):
+        """Восстанавливает состояние игры из файла снимка path."""
+        if self.recorder is not None or self.replayer is not None:
+            # Запись сессии воспроизводится только с начала игры
+            self.log.warning('snapshot_load_ignored', reason='session recording or replay is active')
+            return
+        try:
+            snapshot.load(self, path)
+        except (OSError, ValueError) as error:
+            self.log.error('snapshot_load_failed', path=path, error=str(error))
+            return
+        if not self.headless:
+            self.renderer.invalidate()
+        self.log.info('snapshot_loaded', path=path, step=self.sim_clock.steps)
+
     def is_position_inside(self, pos):
         """Check if a given position is inside the game screen boundaries.(Проверяет, находится ли позиция в пределах
          игрового поля.)
@@ -68,67 +173,128 @@ class TowerDefenseGame:
         """Обрабатывает игровые события, такие как нажатие клавиш и клики мыши."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:       #нажатие на кнопку закрытия окна.
+                self.log.info('shutdown', assets=self.assets.stats(), audio=self.audio.stats(),
+                              text_cache=self.text_cache.stats(), pools=self.level.pool_stats(),
+                              events=self.events.stats(), log=self.log.stats())
+                if self.alloc_monitor is not None:
+                    self.log.info('alloc_report', **self.alloc_monitor.report())
+                self.finish_recording()
+                self.log.close()
                 pygame.quit()           #завершение работы
                 sys.exit()
+            elif self.replayer is not None:
+                continue  # При воспроизведении действия игрока берутся из записи
             elif event.type == pygame.KEYDOWN: #Нажатие клавиши на клавиатуре.
                 if event.key == pygame.K_1:
-                    self.selected_tower_type = 'basic'
-                    print("Selected basic tower.")
+                    self.perform('select', TOWER_TYPES.index('basic'))
                 elif event.key == pygame.K_2:                             #event.key - содержит код клавиши
-                    self.selected_tower_type = 'sniper'
-                    print("Selected sniper tower.")
+                    self.perform('select', TOWER_TYPES.index('sniper'))
                 elif event.key == pygame.K_3:                             #event.key - содержит код клавиши
-                    self.selected_tower_type = 'money'
-                    print("Selected money tower.")
+                    self.perform('select', TOWER_TYPES.index('money'))
                     # Обработка нажатия пробела и переключение состояния отображения сетки
                 elif event.key == pygame.K_SPACE:
-                    self.show_grid = not self.show_grid
+                    self.perform('grid')
+                # T - смена политики выбора цели у башни под курсором
+                elif event.key == pygame.K_t:
+                    self.perform('targeting', *pygame.mouse.get_pos())
+                # F5 - быстрое сохранение, F9 - загрузка быстрого сохранения
+                elif event.key == pygame.K_F5:
+                    self.save_snapshot(self.settings.quicksave_path)
+                elif event.key == pygame.K_F9:
+                    self.load_snapshot(self.settings.quicksave_path)
+                # F3 - оверлей профилировщика, F4 - запись следующих кадров в файл Chrome trace
+                elif event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                    self.renderer.invalidate()
+                elif event.key == pygame.K_F4:
+                    self.profiler.start_capture(self.settings.profile_capture_frames,
+                                                self.settings.profile_trace_path)
+                    self.log.info('profile_capture', frames=self.settings.profile_capture_frames,
+                                  path=self.settings.profile_trace_path)
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                # Левая кнопка мыши — размещение башни
+                # Левая кнопка мыши — размещение башни, правая — улучшение башни
                 if event.button == 1:
-                    if self.selected_tower_type:
-                        self.level.attempt_place_tower(mouse_pos, self.selected_tower_type)
-                    else:
-                        print("No tower type selected.")
-
-                # Правая кнопка мыши — улучшение башни
+                    self.perform('place', *pygame.mouse.get_pos())
                 elif event.button == 3:
-                    for tower in self.level.towers:
-                        if tower.rect.collidepoint(mouse_pos):
-                            tower.upgrade()
-                            break
+                    self.perform('upgrade', *pygame.mouse.get_pos())
+
+    def perform(self, action, x=0, y=0):
+        """
+        Выполняет действие игрока и, если идёт запись сессии, записывает его (см. replay.py).
+        :param action: 'select' (x - номер типа башни в replay.TOWER_TYPES), 'place', 'upgrade', 'grid', 'targeting'.
+        :param x: Координата x курсора.
+        :param y: Координата y курсора.
+        """
+        if self.recorder is not None:
+            self.recorder.record(action, x, y)
+        mouse_pos = (x, y)
+        if action == 'select':
+            self.selected_tower_type = TOWER_TYPES[x]
+            self.log.info('tower_selected', tower=self.selected_tower_type)
+        elif action == 'grid':
+            self.show_grid = not self.show_grid
+        elif action == 'place':
+            if self.selected_tower_type:
+                self.level.attempt_place_tower(mouse_pos, self.selected_tower_type)
+            else:
+                self.log.warning('no_tower_selected')
+        elif action == 'upgrade':
+            for tower in self.level.towers:
+                if tower.rect.collidepoint(mouse_pos):
+                    tower.upgrade()
+                    break
+        elif action == 'targeting':
+            for tower in self.level.towers:
+                if tower.is_hovered(mouse_pos):
+                    tower.cycle_targeting()
+                    self.log.info('targeting_changed', tower=tower.kind.name, targeting=tower.targeting)
+                    break
 
     def _update_game(self):
         """Обновляет состояние игры, вызывая обновления уровня и сетки."""
         if not self.is_game_over and not self.is_game_won:
             self.level.update()
             self.grid.update()
-            self.upgrade_sound = pygame.mixer.Sound(self.settings.upgrade_sound)
 
-            # Проверка уничтожения врагов и добавление награды
-            for enemy in list(self.level.enemies):  # Преобразуем группу врагов в список для безопасного удаления
-                if enemy.health <= 0:  # Если здоровье врага <= 0
-                    self.settings.starting_money += enemy.reward  # Добавляем деньги за уничтожение
-                    self.level.enemies.remove(enemy)  # Удаляем врага из группы
-                    print(f"Enemy defeated! Reward: {enemy.reward}. Total Money: {self.settings.starting_money}")
+            # Награды, утечки и звуки обрабатываются подписчиками шины одной пачкой за шаг
+            self.profiler.begin('events')
+            self.events.dispatch()
+            self.profiler.end()
 
             # Проверка на завершение уровня
             if self.level.all_waves_complete and len(self.level.enemies) == 0:
                 self._next_level()
 
+    def start_level(self, index):
+        """
+        Создаёт уровень с номером index (с 0) и освобождает предыдущий.
+        :param index: Индекс описания уровня в level_specs.
+        """
+        spec = self.level_specs[index]
+        self.assets.wait_prewarm()
+        self.assets.prewarm(spec.asset_paths())
+        if self.level is not None:
+            self.level.release()
+        self.current_level_index = index
+        self.level = LevelBase(self, spec)
+        self.grid.clear()  # Башни прошлого уровня остаются на нём
+
+    def prewarm_next_level(self):
+        """Начинает фоновую загрузку ресурсов следующего уровня."""
+        if self.current_level_index < len(self.level_specs) - 1:
+            self.assets.prewarm(self.level_specs[self.current_level_index + 1].asset_paths(), background=True)
+
     def _next_level(self):
         """
         Переход к следующему уровню или завершение игры при прохождении всех уровней.
         """
-        if self.current_level_index < len(self.levels) - 1:
-            self.current_level_index += 1
-            self.level = self.levels[self.current_level_index]
-            print(f"Starting Level {self.current_level_index + 1}")
+        if self.current_level_index < len(self.level_specs) - 1:
+            self.start_level(self.current_level_index + 1)
+            self.log.info('level_started', level=self.current_level_index + 1)
         else:
             self.is_game_won = True
-            print("You have completed all levels! You win!")
+            self.log.info('game_won', money=self.settings.starting_money)
 
     def _draw_win_screen(self):
         """Отображает экран победы."""
@@ -155,47 +321,94 @@ class TowerDefenseGame:
         elif self.is_game_won:
             self._draw_win_screen()
         else:
-            self.screen.blit(self.background, (0, 0))
-            self.level.draw(self.screen)
-            if self.show_grid: # При нажатии на пробел отображается сетка: show_grid = True
-                self.grid.draw()
-
-            # Отображение информации о деньгах, башнях, волнах и врагах
-            money_text = self.font.render(f"Money: ${self.settings.starting_money}", True, (255, 255, 255))
-            tower_text = self.font.render(
-                f"Selected Tower: {self.selected_tower_type if self.selected_tower_type else 'None'}", True,
-                (255, 255, 255))
-            waves_text = self.font.render(f"Waves Left: {len(self.level.waves) - self.level.current_wave}", True,
-                                          (255, 255, 255))
-            enemies_text = self.font.render(f"Enemies Left: {len(self.level.enemies)}", True, (255, 255, 255))
-
-            self.screen.blit(money_text, (10, 10))
-            self.screen.blit(tower_text, (10, 40))
-            self.screen.blit(waves_text, (10, 70))
-            self.screen.blit(enemies_text, (10, 100))
-
-            # Отображение информации об улучшении башен
-            mouse_pos = pygame.mouse.get_pos()
-            for tower in self.level.towers:
-                if tower.is_hovered(mouse_pos):
-                    tower.draw(self.screen)
+            # Фон, пути и сетка (при show_grid = True) берутся из статического слоя рендерера
+            self.renderer.draw()
+            return
 
         """Обновление экрана."""
         pygame.display.flip()
 
+    def draw_overlays(self):
+        """
+        Отображает HUD и подсказки башен поверх спрайтов.
+        :return: Список областей экрана, занятых надписями.
+        """
+        # Отображение информации о деньгах, башнях, волнах и врагах (перерисовка только при изменении значения)
+        money_text = self.hud_labels['money'].render(self.settings.starting_money)
+        tower_text = self.hud_labels['tower'].render(
+            self.selected_tower_type if self.selected_tower_type else 'None')
+        waves_text = self.hud_labels['waves'].render(len(self.level.waves) - self.level.current_wave)
+        enemies_text = self.hud_labels['enemies'].render(len(self.level.enemies))
+
+        rects = [
+            self.screen.blit(money_text, (10, 10)),
+            self.screen.blit(tower_text, (10, 40)),
+            self.screen.blit(waves_text, (10, 70)),
+            self.screen.blit(enemies_text, (10, 100)),
+        ] + self.level.draw_overlays(self.screen)
+        if self.profiler.visible:
+            level = self.level
+            rects += self.profiler.draw(self.screen, self.text_cache, self.font, {
+                'enemies': len(level.enemies), 'towers': len(level.towers),
+                'bullets': len(level.bullets), 'tracers': len(level.tracers),
+            })
+        return rects
+
+    def _simulate_step(self):
+        """Выполняет один шаг симуляции фиксированной длины."""
+        if self.replayer is not None:
+            self.replayer.apply_due()
+        if self.alloc_monitor is not None:
+            self.alloc_monitor.begin_tick()
+        self._update_game()
+        self.sim_clock.tick()
+        if self.alloc_monitor is not None:
+            self.alloc_monitor.end_tick()
+        # Запись заканчивается после шага, на котором игра закончилась: воспроизведение повторит его целиком
+        if (self.is_game_over or self.is_game_won) and self.recorder is not None:
+            self.finish_recording()
+
     def run_game(self):
-        """Запускает основной игровой цикл."""
+        """
+        Запускает основной игровой цикл. Симуляция идёт фиксированными шагами sim_rate раз в секунду,
+        отрисовка - с той частотой, которую выдерживает машина.
+        """
+        profiler = self.profiler
+        if self.settings.autosave:
+            self.events.subscribe(WaveStarted, self._on_waves_started_autosave)
         while True:
+            frame_ms = self.clock.tick(self.settings.max_fps)
+            profiler.begin('input')
             self._check_events()
-            self._update_game()
-
-            if len(self.level.enemies) == 0 and not self.level.all_waves_complete:
-                self.level.start_next_wave()
-
+            profiler.end()
+            profiler.begin('simulation')
+            for _ in range(self.sim_clock.advance(frame_ms)):
+                self._simulate_step()
+            profiler.end()
+            # Снимок после шагов кадра, вне замера симуляции: волна началась на одном из этих шагов
+            if self.autosave_pending:
+                self.autosave_pending = False
+                self.save_snapshot(self.settings.autosave_path)
+            profiler.begin('audio')
+            self.audio.update()
+            profiler.end()
+            profiler.begin('draw')
             self._draw()
-            self.clock.tick(60)
+            profiler.end()
+            profiler.frame_end()
 
 
 if __name__ == '__main__':
-    td_game = TowerDefenseGame()
+    parser = argparse.ArgumentParser(description="Tower Defense")
+    parser.add_argument('--alloc-monitor', action='store_true',
+                        help="считать выделения памяти по шагам, фазам и волнам (отчёт пишется в журнал при выходе)")
+    parser.add_argument('--alloc-budget', type=float, help="допустимая временная память шага симуляции, КиБ (p95)")
+    parser.add_argument('--record', help="записать сессию в файл для воспроизведения (replay.py)")
+    parser.add_argument('--seed', type=int, help="зерно генератора случайных чисел")
+    parser.add_argument('--load', help="продолжить игру из снимка состояния (например, logs/autosave.tds)")
+    args = parser.parse_args()
+    td_game = TowerDefenseGame(alloc_monitor=args.alloc_monitor or args.alloc_budget is not None,
+                               alloc_budget=args.alloc_budget, seed=args.seed, record_path=args.record)
+    if args.load:
+        td_game.load_snapshot(args.load)
     td_game.run_game()
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Скомпилированные пути врагов. Список точек пути один раз превращается в накопленные длины, единичные направления
+отрезков и интервалы, видимые на экране. Враг хранит только пройденное расстояние, а позиция, остаток пути и
+видимость вычисляются поиском по этим таблицам.
+"""
+import bisect
+import math
+
+
+class CompiledPath:
+    """Путь с параметризацией по длине дуги."""
+    def __init__(self, points, bounds=None, margin=0):
+        """
+        :param points: Точки пути [(x, y), ...].
+        :param bounds: (ширина, высота) экрана для вычисления видимых участков; None - путь виден целиком.
+        :param margin: Запас вокруг экрана в пикселях: спрайт, центр которого за краем ближе margin, ещё виден.
+        """
+        self.points = [tuple(point) for point in points]
+        self.cumulative = [0.0]  # Расстояние от начала пути до каждой точки
+        self.directions = []  # Единичный вектор каждого отрезка
+        for (x0, y0), (x1, y1) in zip(self.points, self.points[1:]):
+            length = math.hypot(x1 - x0, y1 - y0)
+            self.directions.append(((x1 - x0) / length, (y1 - y0) / length) if length else (0.0, 0.0))
+            self.cumulative.append(self.cumulative[-1] + length)
+        self.length = self.cumulative[-1]
+        self.visible = self._clip(bounds, margin) if bounds else [(0.0, self.length)]
+        self.visible_starts = [start for start, _ in self.visible]
+
+    def _clip(self, bounds, margin=0):
+        """Возвращает интервалы расстояний [начало, конец], на которых путь находится в пределах экрана."""
+        width, height = bounds
+        left = top = -margin
+        right, bottom = width + margin, height + margin
+        intervals = []
+        for i, ((x0, y0), (dx, dy)) in enumerate(zip(self.points, self.directions)):
+            length = self.cumulative[i + 1] - self.cumulative[i]
+            # Отсечение отрезка прямоугольником (алгоритм Лианга-Барски) в параметре t от 0 до length
+            t0, t1 = 0.0, length
+            for p, q in ((-dx, x0 - left), (dx, right - x0), (-dy, y0 - top), (dy, bottom - y0)):
+                if p == 0:
+                    if q < 0:
+                        t0, t1 = 1.0, 0.0
+                        break
+                    continue
+                t = q / p
+                if p < 0:
+                    t0 = max(t0, t)
+                else:
+                    t1 = min(t1, t)
+            if t0 > t1:
+                continue
+            start, end = self.cumulative[i] + t0, self.cumulative[i] + t1
+            if intervals and start <= intervals[-1][1]:
+                intervals[-1] = (intervals[-1][0], max(intervals[-1][1], end))
+            else:
+                intervals.append((start, end))
+        return intervals
+
+    def segment_at(self, distance):
+        """Возвращает номер отрезка, на котором находится точка на расстоянии distance (O(log n))."""
+        index = bisect.bisect_right(self.cumulative, distance) - 1
+        return min(max(index, 0), len(self.directions) - 1)
+
+    def position_at(self, distance):
+        """Возвращает координаты точки пути на расстоянии distance от начала."""
+        distance = min(max(distance, 0.0), self.length)
+        index = self.segment_at(distance)
+        x, y = self.points[index]
+        dx, dy = self.directions[index]
+        offset = distance - self.cumulative[index]
+        return x + dx * offset, y + dy * offset
+
+    def remaining(self, distance):
+        """Возвращает расстояние до выхода (O(1))."""
+        return max(self.length - distance, 0.0)
+
+    def is_on_screen(self, distance):
+        """Проверяет, находится ли точка на расстоянии distance в пределах экрана."""
+        index = bisect.bisect_right(self.visible_starts, distance) - 1
+        return index >= 0 and distance <= self.visible[index][1]
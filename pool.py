@@ -0,0 +1,67 @@
+"""Пулы объектов для спрайтов врагов и пуль: убитые спрайты не отдаются сборщику мусора, а используются повторно."""
+
+
+class SpritePool:
+    """
+    Список свободных спрайтов одного вида. acquire() берёт спрайт из пула и переинициализирует его методом reset(),
+    а если пул пуст - создаёт новый через factory. Спрайт возвращается в пул из своего kill().
+    """
+    def __init__(self, factory, limit=512):
+        """
+        :param factory: Функция создания нового спрайта, принимает те же аргументы, что и reset() спрайта.
+        :param limit: Максимальное количество свободных спрайтов в пуле, лишние отдаются сборщику мусора.
+        """
+        self.factory = factory
+        self.limit = limit
+        self.free = []
+        self.live = 0
+        self.allocations = 0
+        self.reused = 0
+
+    def acquire(self, *args, **kwargs):
+        """Возвращает готовый к использованию спрайт."""
+        if self.free:
+            sprite = self.free.pop()
+            sprite.pooled = False
+            sprite.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            sprite = self.factory(*args, **kwargs)
+            sprite.pool = self
+            self.allocations += 1
+        self.live += 1
+        return sprite
+
+    def acquire_blank(self):
+        """
+        Возвращает спрайт без вызова reset(): свободный из пула или новый, созданный factory() без аргументов.
+        Состояние спрайта заполняет вызывающий код (восстановление снимка, см. LevelBase.restore_enemies).
+        """
+        if self.free:
+            sprite = self.free.pop()
+            sprite.pooled = False
+            self.reused += 1
+        else:
+            sprite = self.factory()
+            sprite.pool = self
+            self.allocations += 1
+        self.live += 1
+        return sprite
+
+    def release(self, sprite):
+        """Возвращает спрайт в пул. Повторный вызов для того же спрайта ничего не делает."""
+        if sprite.pooled:
+            return
+        sprite.pooled = True
+        self.live -= 1
+        if len(self.free) < self.limit:
+            self.free.append(sprite)
+
+    def stats(self):
+        """Возвращает количество живых и свободных спрайтов, созданных и переиспользованных объектов."""
+        return {
+            'live': self.live,
+            'pooled': len(self.free),
+            'allocations': self.allocations,
+            'allocations_avoided': self.reused,
+        }
@@ -0,0 +1,221 @@
+"""
+Профилировщик кадра: именованные области замера вокруг фаз игрового цикла, скользящая история времени фаз,
+оверлей с таблицей фаз и графиком времени кадра, запись окна кадров в файл Chrome trace (открывается в
+chrome://tracing, Perfetto и speedscope).
+
+Если задан meter (например, sys.getallocatedblocks, см. alloc_monitor.py), для каждой фазы также считается прирост
+его значения - количество блоков памяти, оставшихся занятыми после фазы.
+
+Пока профилировщик выключен, begin()/end()/frame_end() сразу возвращаются после одной проверки флага.
+"""
+import collections
+import json
+import os
+import time
+from array import array
+
+import pygame
+
+
+class Profiler:
+    """Замер времени вложенных фаз кадра."""
+    def __init__(self, history=240, enabled=False):
+        """
+        :param history: Количество последних кадров в скользящей истории.
+        :param enabled: Включены ли замер и оверлей с самого начала.
+        """
+        self.enabled = enabled  # Идёт ли замер
+        self.visible = enabled  # Показан ли оверлей (F3)
+        self.held = False  # Замер нужен не только оверлею (см. hold()) и не выключается вместе с ним
+        self.history = history
+        self.stack = []  # Открытые области: (имя, счётчики фазы, время начала в нс, показание meter)
+        # Имя фазы -> array('q', [время за текущий кадр в нс, прирост meter за текущий кадр]). Счётчики
+        # обновляются на месте, поэтому замер не оставляет новых объектов между кадрами.
+        self.frame_totals = {}
+        self.meter = None  # Функция без аргументов, прирост её значения считается по фазам
+        self.meter_bias = 0  # Прирост meter от самой пары begin()/end()
+        self.phases = {}  # Имя фазы -> deque времени фазы по кадрам, мс
+        self.allocs = {}  # Имя фазы -> deque прироста meter по кадрам
+        self.depths = {}  # Имя фазы -> глубина вложенности (для отступов в оверлее)
+        self.frame_times = collections.deque(maxlen=history)  # Время кадра, мс
+        self.last_frame = None
+        self.capture_left = 0  # Сколько кадров ещё записывать в трассу
+        self.capture_path = None
+        self.trace = []
+
+    def toggle(self):
+        """Показывает или скрывает оверлей. Замер включается и выключается вместе с ним, если его не держит hold()."""
+        self.visible = not self.visible
+        self._set_enabled(self.visible or self.held)
+
+    def hold(self):
+        """Включает замер, не показывая оверлей; после этого F3 только показывает и скрывает оверлей."""
+        self.held = True
+        self._set_enabled(True)
+
+    def _set_enabled(self, enabled):
+        """
+        Включает или выключает замер. При включении история начинается заново. Выключение во время записи трассы
+        заканчивает запись: уже записанные кадры сохраняются в файл.
+        """
+        if enabled == self.enabled:
+            return
+        if self.enabled and self.capture_left:
+            self.capture_left = 0
+            self._write_trace()
+        self.enabled = enabled
+        self.stack.clear()
+        self.frame_totals.clear()
+        self.phases.clear()
+        self.allocs.clear()
+        self.depths.clear()
+        self.frame_times.clear()
+        self.last_frame = None
+
+    def set_meter(self, meter):
+        """
+        Задаёт функцию, прирост значения которой считается по фазам, и вычитаемую поправку на прирост от самого
+        замера (кортеж области и число-показание живы во время второго вызова meter).
+        """
+        self.meter = meter
+        self.meter_bias = 0
+        enabled, self.enabled = self.enabled, True
+        bias = 0
+        for _ in range(3):
+            self.begin('calibration')
+            self.end()
+            bias = self.frame_totals['calibration'][1]
+            self.frame_totals['calibration'][1] = 0
+        self.meter_bias = bias
+        for table in (self.frame_totals, self.phases, self.allocs, self.depths):
+            table.pop('calibration', None)
+        self.enabled = enabled
+
+    def begin(self, name):
+        """Открывает область замера name."""
+        if self.enabled:
+            totals = self.frame_totals.get(name)
+            if totals is None:
+                # Фаза попадает в таблицу в порядке открытия, а не закрытия: внешняя раньше вложенных
+                totals = self.frame_totals[name] = array('q', [0, 0])
+                self.phases[name] = collections.deque(maxlen=self.history)
+                self.allocs[name] = collections.deque(maxlen=self.history)
+                self.depths[name] = len(self.stack)
+            self.stack.append((name, totals, time.perf_counter_ns(), self.meter() if self.meter else 0))
+
+    def end(self):
+        """Закрывает последнюю открытую область и добавляет её время к фазе текущего кадра."""
+        if not self.enabled or not self.stack:
+            return
+        blocks = self.meter() if self.meter else 0
+        name, totals, start, reading = self.stack[-1]
+        if self.meter:
+            totals[1] += blocks - reading - self.meter_bias
+        self.stack.pop()
+        now = time.perf_counter_ns()
+        totals[0] += now - start
+        if self.capture_left:
+            self.trace.append({'name': name, 'ph': 'X', 'ts': start / 1000, 'dur': (now - start) / 1000,
+                               'pid': 1, 'tid': 1})
+
+    def frame_end(self):
+        """Завершает кадр: переносит время фаз в историю и при записи трассы считает записанные кадры."""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.last_frame is not None:
+            self.frame_times.append((now - self.last_frame) / 1e6)
+        self.last_frame = now
+        # Фаза без замеров в кадре получает 0
+        for name, totals in self.frame_totals.items():
+            self.phases[name].append(totals[0] / 1e6)
+            if self.meter:
+                self.allocs[name].append(totals[1])
+            totals[0] = totals[1] = 0
+        if self.capture_left:
+            self.capture_left -= 1
+            if not self.capture_left:
+                self._write_trace()
+
+    def start_capture(self, frames, path):
+        """
+        Записывает следующие frames кадров в файл path формата Chrome trace. Включает замер и оверлей, если замер
+        выключен.
+        """
+        if not self.enabled:
+            self.toggle()
+        self.trace = []
+        self.capture_left = frames
+        self.capture_path = path
+
+    def _write_trace(self):
+        directory = os.path.dirname(self.capture_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.capture_path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': self.trace, 'displayTimeUnit': 'ms'}, file)
+        self.trace = []
+
+    def stats(self, name):
+        """Возвращает среднее, p95 и максимум времени фазы name за историю, мс."""
+        samples = sorted(self.phases.get(name, ()))
+        if not samples:
+            return {'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+        return {
+            'mean': sum(samples) / len(samples),
+            'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            'max': samples[-1],
+        }
+
+    def alloc_stats(self, name):
+        """Возвращает средний и максимальный прирост meter за кадр в фазе name."""
+        allocs = self.allocs.get(name, ())
+        if not allocs:
+            return {'mean': 0.0, 'max': 0}
+        return {'mean': sum(allocs) / len(allocs), 'max': max(allocs)}
+
+    def histogram(self, name, bucket_ms=1.0, buckets=16):
+        """
+        Возвращает гистограмму времени фазы name: количество кадров в корзинах по bucket_ms,
+        последняя корзина собирает всё, что дольше.
+        """
+        counts = [0] * buckets
+        for value in self.phases.get(name, ()):
+            counts[min(int(value / bucket_ms), buckets - 1)] += 1
+        return counts
+
+    def draw(self, screen, text_cache, font, counts, position=(10, 140)):
+        """
+        Отображает таблицу фаз (среднее и p95 времени, при заданном meter - средний прирост блоков), количество
+        сущностей и график времени кадра.
+        :param counts: Словарь имя -> количество сущностей.
+        :return: Список областей экрана, занятых оверлеем.
+        """
+        x, y = position
+        rects = []
+        color = (255, 255, 0)
+        for name in self.phases:
+            stats = self.stats(name)
+            line = f"{name}: {stats['mean']:.1f} / {stats['p95']:.1f} ms"
+            if self.meter:
+                line += f", {self.alloc_stats(name)['mean']:+.0f} blocks"
+            text = text_cache.render(font, line, color)
+            rects.append(screen.blit(text, (x + 16 * self.depths.get(name, 0), y)))
+            y += text.get_height()
+        text = text_cache.render(font, ", ".join(f"{name}: {count}" for name, count in counts.items()), color)
+        rects.append(screen.blit(text, (x, y)))
+        y += text.get_height() + 4
+
+        # График времени кадра: столбец на кадр, линия - бюджет 60 кадров в секунду
+        width, height = self.history, 60
+        graph = pygame.Rect(x, y, width, height)
+        pygame.draw.rect(screen, (0, 0, 0), graph)
+        scale = height / 50  # 50 мс на всю высоту
+        for i, frame_ms in enumerate(self.frame_times):
+            bar = min(height, int(frame_ms * scale))
+            bar_color = (0, 255, 0) if frame_ms <= 1000 / 60 else (255, 0, 0)
+            pygame.draw.line(screen, bar_color, (x + i, y + height - 1), (x + i, y + height - bar))
+        budget_y = y + height - int(1000 / 60 * scale)
+        pygame.draw.line(screen, (255, 255, 255), (x, budget_y), (x + width - 1, budget_y))
+        rects.append(graph)
+        return rects
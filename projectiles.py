@@ -0,0 +1,85 @@
+"""
+Аналитический расчёт попаданий. Вместо полёта пули и проверки столкновений каждый кадр время попадания
+вычисляется в момент выстрела: враг движется по скомпилированному пути с постоянной скоростью, поэтому точку
+встречи с пулей можно найти решением квадратного уравнения на каждом отрезке пути. Урон применяется
+отложенным событием в момент попадания.
+"""
+import heapq
+import math
+
+
+def intercept(origin, enemy, bullet_speed):
+    """
+    Находит момент и точку встречи пули, выпущенной из origin, с врагом, движущимся по своему пути.
+    :param origin: Позиция башни (Vector2).
+    :param enemy: Враг с атрибутами path (CompiledPath), distance и speed (пикселей в секунду).
+    :param bullet_speed: Скорость пули в пикселях в секунду.
+    :return: (время до попадания в секундах, (x, y)) или None, если враг покинет путь раньше.
+    """
+    path = enemy.path
+    distance = enemy.distance
+    speed = enemy.speed
+    ox, oy = origin.x, origin.y
+    for index in range(path.segment_at(distance), len(path.directions)):
+        start, end = path.cumulative[index], path.cumulative[index + 1]
+        if speed > 0:
+            t_min = max(start - distance, 0.0) / speed
+            t_max = (end - distance) / speed
+        else:
+            t_min, t_max = 0.0, math.inf
+        dx, dy = path.directions[index]
+        px, py = path.points[index]
+        # Позиция врага на отрезке: Q + U * t
+        qx, qy = px + dx * (distance - start) - ox, py + dy * (distance - start) - oy
+        ux, uy = dx * speed, dy * speed
+        a = ux * ux + uy * uy - bullet_speed * bullet_speed
+        b = 2 * (qx * ux + qy * uy)
+        c = qx * qx + qy * qy
+        for t in _roots(a, b, c):
+            if t_min <= t <= t_max:
+                return t, (qx + ox + ux * t, qy + oy + uy * t)
+        if speed <= 0:
+            return None
+    return None
+
+
+def _roots(a, b, c):
+    """Возвращает неотрицательные корни уравнения a*t^2 + b*t + c = 0 по возрастанию."""
+    if abs(a) < 1e-9:
+        roots = [-c / b] if b else []
+    else:
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            return []
+        sqrt_d = math.sqrt(discriminant)
+        roots = sorted(((-b - sqrt_d) / (2 * a), (-b + sqrt_d) / (2 * a)))
+    return [t for t in roots if t >= 0]
+
+
+class ScheduledHits:
+    """Очередь отложенных попаданий, упорядоченная по времени симуляции."""
+    def __init__(self):
+        self.queue = []
+        self.next_id = 0  # Порядок выстрелов для попаданий в одно и то же время
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, hit_time, enemy, damage):
+        """Запланировать урон damage врагу enemy на время hit_time (мс симуляции)."""
+        heapq.heappush(self.queue, (hit_time, self.next_id, enemy, enemy.generation, damage))
+        self.next_id += 1
+
+    def apply_due(self, current_time):
+        """
+        Применяет все попадания, время которых наступило. Убитые или ушедшие враги урон не получают,
+        в том числе если их объект уже взят из пула для нового врага (другое поколение).
+        """
+        queue = self.queue
+        while queue and queue[0][0] <= current_time:
+            _, _, enemy, generation, damage = heapq.heappop(queue)
+            if enemy.alive() and enemy.generation == generation:
+                enemy.take_damage(damage)
+
+    def clear(self):
+        self.queue.clear()
@@ -0,0 +1,63 @@
+"""Отрисовка игрового поля: статический слой карты запекается один раз, спрайты обновляются по грязным областям."""
+import pygame
+
+
+class Renderer:
+    """
+    Рисует уровень поверх заранее подготовленного слоя (фон + пути врагов + сетка).
+    В режиме 'dirty' на экран выводятся только изменившиеся области через pygame.display.update(rects),
+    в режиме 'full' - весь кадр через pygame.display.flip().
+    """
+    def __init__(self, game):
+        """Инициализирует рендерер для игры game."""
+        self.game = game
+        self.screen = game.screen
+        self.dirty_mode = game.settings.render_mode == 'dirty'
+        self.layer = None
+        self.layer_key = None
+        self.overlay_rects = []  # Области HUD и подсказок прошлого кадра
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Требует перерисовать весь экран в следующем кадре."""
+        self.full_redraw = True
+
+    def static_layer(self):
+        """
+        Возвращает статический слой, пересобирая его только при смене уровня, видимости сетки или, при видимой
+        сетке, занятости клеток и выбранного типа башни (подсказки покрытия).
+        """
+        key = (self.game.level, self.game.show_grid, self.game.grid.draw_key() if self.game.show_grid else None)
+        if key != self.layer_key:
+            self.layer = self.game.background.copy()
+            self.game.level.draw_paths(self.layer)
+            if self.game.show_grid:
+                self.game.grid.draw(self.layer)
+            self.layer_key = key
+            self.full_redraw = True
+        return self.layer
+
+    def draw(self):
+        """Рисует кадр и выводит его на дисплей."""
+        layer = self.static_layer()
+        level = self.game.level
+        if not self.dirty_mode or self.full_redraw:
+            self.screen.blit(layer, (0, 0))
+            level.draw_sprites(self.screen)
+            self.overlay_rects = self.game.draw_overlays()
+            pygame.display.flip()
+            self.full_redraw = False
+            return
+
+        dirty = []
+        # Стираем HUD и подсказки прошлого кадра, затем спрайты на их старых местах
+        for rect in self.overlay_rects:
+            self.screen.blit(layer, rect, rect)
+            dirty.append(rect)
+        for group in level.sprite_groups():
+            group.clear(self.screen, layer)
+        for group in level.sprite_groups():
+            dirty.extend(group.draw(self.screen))
+        self.overlay_rects = self.game.draw_overlays()
+        dirty.extend(self.overlay_rects)
+        pygame.display.update(dirty)
@@ -0,0 +1,259 @@
+"""
+Запись и воспроизведение игровой сессии. Симуляция идёт фиксированными шагами, а единственный источник
+случайности - генератор игры (TowerDefenseGame.rng). Поэтому для точного повторения сессии достаточно зерна
+генератора и действий игрока с номерами шагов симуляции, перед которыми они выполнены.
+
+Запись:
+    python main.py --record session.tdr [--seed 42]
+Воспроизведение (без окна и быстрее реального времени, или в окне с множителем скорости):
+    python replay.py session.tdr
+    python replay.py session.tdr --window --speed 4
+
+Формат файла (little-endian):
+    заголовок  - магическое b'TDRP', версия (H), зерно (I), индекс начального уровня (B);
+    записи     - шаг симуляции (I), действие (B), x (h), y (h), по 9 байт на действие;
+    окончание  - запись действия 'end' с номером последнего шага и 20 байт SHA-1 итогового состояния.
+Заголовок пишется в начале сессии, каждое действие дописывается в файл сразу, а окончание - при выходе из игры или
+её завершении. Запись, оборванную сбоем или снятием процесса, можно воспроизвести до последнего действия, но без
+сверки итогового состояния.
+
+Действия (x, y - координаты курсора): 'select' (x - номер типа башни в TOWER_TYPES), 'place', 'upgrade',
+'grid', 'targeting'.
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+
+MAGIC = b'TDRP'
+VERSION = 1
+HEADER = struct.Struct('<4sHIB')
+RECORD = struct.Struct('<IBhh')
+ACTIONS = ('select', 'place', 'upgrade', 'grid', 'targeting', 'end')
+ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+TOWER_TYPES = ('basic', 'sniper', 'money')
+
+
+class Recording:
+    """Зерно генератора, начальный уровень, действия игрока и итог записанной сессии."""
+    def __init__(self, seed, level=0, inputs=None, final_step=None, digest=None):
+        """
+        :param seed: Зерно генератора случайных чисел игры.
+        :param level: Индекс начального уровня (с 0).
+        :param inputs: Список действий (шаг, действие, x, y).
+        :param final_step: Номер шага, на котором запись закончилась.
+        :param digest: SHA-1 итогового состояния игры (state_digest).
+        """
+        self.seed = seed
+        self.level = level
+        self.inputs = inputs if inputs is not None else []
+        self.final_step = final_step
+        self.digest = digest
+
+    @property
+    def complete(self):
+        """False у записи, оборванной до окончания."""
+        return self.digest is not None
+
+    def header(self):
+        return HEADER.pack(MAGIC, VERSION, self.seed, self.level)
+
+    @staticmethod
+    def pack_input(step, action, x, y):
+        return RECORD.pack(step, ACTION_CODES[action], x, y)
+
+    def trailer(self):
+        return RECORD.pack(self.final_step, ACTION_CODES['end'], 0, 0) + self.digest
+
+    def save(self, path):
+        """Сохраняет запись в файл path."""
+        with _create(path) as file:
+            file.write(self.header())
+            for entry in self.inputs:
+                file.write(self.pack_input(*entry))
+            file.write(self.trailer())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Загружает запись из файла path. У оборванной записи (без окончания) последним шагом считается шаг
+        последнего действия, а итоговое состояние неизвестно (digest None).
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, seed, level = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        if version != VERSION:
+            raise ValueError(f"Unsupported recording version {version} in {path}")
+        recording = cls(seed, level)
+        offset = HEADER.size
+        # Неполная последняя запись - обрыв во время её записи
+        while offset + RECORD.size <= len(data):
+            step, code, x, y = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if code >= len(ACTIONS):
+                raise ValueError(f"Unknown action {code} in {path}")
+            if ACTIONS[code] == 'end':
+                if len(data) >= offset + 20:
+                    recording.final_step = step
+                    recording.digest = data[offset:offset + 20]
+                break
+            recording.inputs.append((step, ACTIONS[code], x, y))
+        if recording.final_step is None:
+            recording.final_step = recording.inputs[-1][0] if recording.inputs else 0
+        return recording
+
+
+def _create(path):
+    """Открывает файл path для записи, создавая его каталог."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return open(path, 'wb')
+
+
+def state_digest(game):
+    """Возвращает SHA-1 состояния игры: деньги, уровень, волна, шаг, башни и враги."""
+    level = game.level
+    parts = [game.settings.starting_money, game.leaks, game.current_level_index, level.current_wave,
+             game.sim_clock.steps, game.is_game_over, game.is_game_won]
+    parts += sorted((tower.kind.name, tuple(tower.position), tower.level, tower.targeting) for tower in level.towers)
+    parts += sorted((enemy.kind.image_path, round(enemy.distance, 6), enemy.health) for enemy in level.enemies)
+    return hashlib.sha1(repr(parts).encode()).digest()
+
+
+class InputRecorder:
+    """Записывает действия игрока game с номерами шагов симуляции в файл по мере их выполнения."""
+    def __init__(self, game, path):
+        """
+        :param game: Объект игры.
+        :param path: Файл записи. Заголовок пишется сразу, окончание - при close().
+        """
+        self.game = game
+        self.path = path
+        self.recording = Recording(game.seed, game.current_level_index)
+        self.file = _create(path)
+        self.file.write(self.recording.header())
+        self.file.flush()
+
+    @property
+    def closed(self):
+        return self.file.closed
+
+    def record(self, action, x=0, y=0):
+        if self.file.closed:
+            return  # Сессия уже закончилась
+        # Действие выполняется перед шагом, который будет выполнен следующим
+        entry = (self.game.sim_clock.steps, action, int(x), int(y))
+        self.recording.inputs.append(entry)
+        # Действия редкие: сброс в файл после каждого сохраняет запись при аварийном завершении процесса
+        self.file.write(self.recording.pack_input(*entry))
+        self.file.flush()
+
+    def close(self):
+        """Дописывает окончание записи: номер последнего шага и итоговое состояние."""
+        if self.file.closed:
+            return
+        self.recording.final_step = self.game.sim_clock.steps
+        self.recording.digest = state_digest(self.game)
+        self.file.write(self.recording.trailer())
+        self.file.close()
+
+
+class InputReplayer:
+    """Выполняет действия записи перед шагами симуляции, на которых они были записаны."""
+    def __init__(self, game, recording):
+        """
+        :param game: Объект игры, созданный с зерном записи.
+        :param recording: Запись сессии.
+        """
+        self.game = game
+        self.recording = recording
+        self.cursor = 0
+
+    def apply_due(self):
+        """Выполняет действия, записанные перед текущим шагом симуляции."""
+        inputs = self.recording.inputs
+        step = self.game.sim_clock.steps
+        while self.cursor < len(inputs) and inputs[self.cursor][0] <= step:
+            _, action, x, y = inputs[self.cursor]
+            self.game.perform(action, x, y)
+            self.cursor += 1
+
+    @property
+    def finished(self):
+        return self.game.sim_clock.steps >= self.recording.final_step
+
+
+def start_replay(recording, headless=True, file_log=True):
+    """Создаёт игру с зерном и начальным уровнем записи и подключает к ней воспроизведение."""
+    from main import TowerDefenseGame
+    game = TowerDefenseGame(headless=headless, seed=recording.seed, file_log=file_log)
+    if recording.level != game.current_level_index:
+        game.start_level(recording.level)
+    game.replayer = InputReplayer(game, recording)
+    return game
+
+
+def replay(recording, headless=True, speed=1.0):
+    """
+    Воспроизводит запись до её последнего шага.
+    :param headless: True - без окна и с максимальной скоростью, иначе в окне в speed раз быстрее реального времени.
+    :return: Словарь со сводкой: итоговое состояние и совпадение с записанным (None у оборванной записи).
+    """
+    import pygame
+    game = start_replay(recording, headless)
+    start = time.perf_counter()
+    while not game.replayer.finished:
+        if headless:
+            game._simulate_step()
+            continue
+        frame_ms = game.clock.tick(game.settings.max_fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return None
+        for _ in range(game.sim_clock.advance(frame_ms * speed)):
+            if game.replayer.finished:
+                break
+            game._simulate_step()
+        game._draw()
+    game.replayer.apply_due()  # Действия, записанные после последнего шага
+    elapsed = time.perf_counter() - start
+    digest = state_digest(game)
+    game.log.close()
+    return {
+        'steps': game.sim_clock.steps,
+        'money': game.settings.starting_money,
+        'level': game.current_level_index + 1,
+        'wave': game.level.current_wave,
+        'leaks': game.leaks,
+        'digest': digest.hex(),
+        'matches': digest == recording.digest if recording.complete else None,
+        'wall_time_s': elapsed,
+        'speedup': game.sim_clock.time / 1000 / elapsed if elapsed > 0 else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Tower Defense session")
+    parser.add_argument('recording', help="файл записи сессии")
+    parser.add_argument('--window', action='store_true', help="воспроизводить в окне, а не без отрисовки")
+    parser.add_argument('--speed', type=float, default=1.0, help="множитель скорости воспроизведения в окне")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.recording)
+    summary = replay(recording, headless=not args.window, speed=args.speed)
+    if summary is None:
+        return 0
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    return 1 if summary['matches'] is False else 0
+
+
+if __name__ == '__main__':
+    # Рабочая директория нужна для относительных путей к ресурсам
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Иерархическое колесо таймеров на времени симуляции. Башни, спавн врагов и денежные башни регистрируют время
+следующего срабатывания, и на каждом шаге обрабатываются только наступившие записи, а не все объекты уровня.
+"""
+import math
+
+
+class Timer:
+    """Запись колеса таймеров. Отменённая запись остаётся в слоте, но не срабатывает."""
+    __slots__ = ('tick', 'callback', 'cancelled')
+
+    def __init__(self, tick, callback):
+        self.tick = tick
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Иерархическое колесо: уровень 0 хранит записи ближайших slots тиков, каждый следующий уровень - в slots раз
+    более грубые интервалы. Когда младшие разряды текущего тика обнуляются, слот старшего уровня раскладывается
+    по младшим. Записи дальше всех уровней ждут в списке переполнения.
+    """
+    def __init__(self, resolution_ms, slot_bits=6, levels=4):
+        """
+        :param resolution_ms: Длина одного тика в миллисекундах (шаг симуляции).
+        :param slot_bits: log2 количества слотов на уровне.
+        :param levels: Количество уровней колеса.
+        """
+        self.resolution = resolution_ms
+        self.bits = slot_bits
+        self.mask = (1 << slot_bits) - 1
+        self.levels = levels
+        self.wheels = [[[] for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self.overflow = []
+        self.current = 0  # Последний обработанный тик
+        self.pending = 0  # Количество записей в колесе (включая отменённые)
+        self.fired = 0
+
+    def __len__(self):
+        return self.pending
+
+    def to_tick(self, time_ms):
+        """Переводит время симуляции в номер тика (первый тик не раньше time_ms)."""
+        return math.ceil(time_ms / self.resolution - 1e-9)
+
+    def schedule(self, time_ms, callback):
+        """
+        Регистрирует вызов callback() в момент времени симуляции time_ms.
+        Время в прошлом срабатывает на следующем тике.
+        :return: Timer, который можно отменить.
+        """
+        timer = Timer(max(self.to_tick(time_ms), self.current + 1), callback)
+        self._insert(timer)
+        self.pending += 1
+        return timer
+
+    def _insert(self, timer):
+        """Кладёт запись на уровень, где её тик отличается от текущего только младшими разрядами."""
+        level = max((timer.tick ^ self.current).bit_length() - 1, 0) // self.bits
+        if level >= self.levels:
+            self.overflow.append(timer)
+        else:
+            self.wheels[level][(timer.tick >> (level * self.bits)) & self.mask].append(timer)
+
+    def advance(self, time_ms):
+        """Обрабатывает все тики до времени time_ms включительно и вызывает наступившие таймеры."""
+        target = self.to_tick(time_ms)
+        while self.current < target:
+            if self.pending == 0:
+                # Пустое колесо можно перемотать сразу
+                self.current = target
+                return
+            self.current += 1
+            tick = self.current
+            self._cascade(tick)
+            slot = self.wheels[0][tick & self.mask]
+            if slot:
+                self.wheels[0][tick & self.mask] = []
+                for timer in slot:
+                    self.pending -= 1
+                    if not timer.cancelled:
+                        self.fired += 1
+                        timer.callback()
+
+    def entries(self):
+        """
+        Возвращает все неотменённые записи вместе с их местом: (уровень, слот, Timer) в порядке срабатывания
+        внутри слота. Записи переполнения возвращаются с уровнем levels и слотом 0.
+        """
+        for level, wheel in enumerate(self.wheels):
+            for index, slot in enumerate(wheel):
+                for timer in slot:
+                    if not timer.cancelled:
+                        yield level, index, timer
+        for timer in self.overflow:
+            if not timer.cancelled:
+                yield self.levels, 0, timer
+
+    def place(self, level, index, timer):
+        """Кладёт запись на заданное место колеса (восстановление колеса, сохранённого через entries())."""
+        if level >= self.levels:
+            self.overflow.append(timer)
+        else:
+            self.wheels[level][index].append(timer)
+        self.pending += 1
+
+    def _cascade(self, tick):
+        """Раскладывает записи старших уровней, период которых начинается на тике tick."""
+        top = 0
+        while top < self.levels and tick & ((1 << ((top + 1) * self.bits)) - 1) == 0:
+            top += 1
+        if top == self.levels and self.overflow:
+            overflow, self.overflow = self.overflow, []
+            for timer in overflow:
+                self._insert(timer)
+        for level in range(min(top, self.levels - 1), 0, -1):
+            index = (tick >> (level * self.bits)) & self.mask
+            slot = self.wheels[level][index]
+            if slot:
+                self.wheels[level][index] = []
+                for timer in slot:
+                    self._insert(timer)
@@ -13,6 +13,36 @@ class Settings:
         self.cols = 15
         self.grid_size = (64, 64)
 
+        # 'analytic' - время попадания рассчитывается при выстреле, пули только визуальные трассеры;
+        # 'physical' - пули летят и проверяются на столкновения с врагами каждый кадр
+        self.projectile_mode = 'analytic'
+        self.bullet_speed = 300  # Пикселей в секунду симуляции
+        self.pool_limit = 512  # Максимум свободных спрайтов в пуле врагов и пуль
+        self.entity_store = False  # Хранить врагов и пули в массивах NumPy (нужен numpy)
+        self.spatial_cell_size = self.grid_size[0]  # Размер клетки индекса врагов для поиска целей
+        # Запас вокруг экрана, в пределах которого враг виден (половина самого большого спрайта): только видимых
+        # врагов рисуют и выбирают целью башни
+        self.visibility_margin = 50
+
+        self.levels_dir = 'levels'  # Каталог JSON-описаний уровней (waves.py), уровни идут в порядке имён файлов
+
+        # Журнал игры (game_log.py): сжатый JSON-lines, пишется фоновым потоком
+        self.log_path = 'logs/game.jsonl.gz'
+        self.log_level = 'info'  # 'debug', 'info', 'warning', 'error' или 'off'
+        self.log_buffer_size = 4096  # Записей в кольцевом буфере между сбросами
+        self.log_flush_interval = 0.5  # Секунд между сбросами на диск
+        self.log_console = False  # Дублировать записи в stderr
+
+        # Профилировщик кадра (profiler.py): F3 - оверлей, F4 - запись трассы
+        self.profile_history = 240  # Кадров в скользящей истории оверлея
+        self.profile_capture_frames = 120  # Кадров в одной записи трассы
+        self.profile_trace_path = 'logs/profile_trace.json'  # Файл трассы формата Chrome trace
+
+        # Снимки состояния (snapshot.py): F5 - быстрое сохранение, F9 - загрузка
+        self.quicksave_path = 'logs/quicksave.tds'
+        self.autosave_path = 'logs/autosave.tds'  # Снимок на начале каждой волны для восстановления после сбоя
+        self.autosave = True  # Только в игровом цикле main.py (run_game), не в замерах и воспроизведении
+
         self.tower_costs = {
             'basic': 100,
             'sniper': 150,
@@ -45,10 +75,19 @@ class Settings:
 
         ]
 
+        self.sim_rate = 60  # Шагов симуляции в секунду, все скорости задаются в пикселях в секунду
+        self.max_sim_steps = 5  # Максимум шагов симуляции за кадр
+        # Ограничение частоты отрисовки, 0 - без ограничения. Без интерполяции кадры чаще шагов симуляции
+        # повторяют один и тот же кадр и занимают ядро целиком, поэтому по умолчанию частота равна sim_rate
+        self.max_fps = 60
+        self.render_mode = 'dirty'  # 'dirty' - вывод только изменённых областей, 'full' - flip() всего экрана
+        self.text_cache_size = 256  # Количество хранимых поверхностей текста
+        self.rotation_steps = 64  # Количество заранее повёрнутых кадров спрайта башни
+
         self.tower_sprites = {
             'basic': 'assets/towers/basic_tower.png',
             'sniper': 'assets/towers/sniper_tower.png',
-            'money': 'asserts/towers/money_tower.png',
+            'money': 'assets/towers/money_tower.png',
         }
         self.enemy_sprites = {
             'base': 'assets/enemies/basic_enemy.png',
@@ -65,6 +104,29 @@ class Settings:
         self.enemy_hit_sound = 'assets/sounds/enemy_hit.wav'
         self.background_music = 'assets/sounds/background_music.mp3'
         self.spawn_sound = 'assets/sounds/spawn.wav'
+
+        # Звуковой сервис: идентификаторы звуков, категории, приоритеты и лимиты (голосов, окно в мс)
+        self.sound_ids = {
+            'shoot': self.shoot_sound,
+            'upgrade': self.upgrade_sound,
+            'sell': self.sell_sound,
+            'enemy_hit': self.enemy_hit_sound,
+            'spawn': self.spawn_sound,
+        }
+        self.sound_categories = {
+            'shoot': 'combat',
+            'enemy_hit': 'combat',
+            'spawn': 'wave',
+            'upgrade': 'ui',
+            'sell': 'ui',
+        }
+        self.sound_category_priorities = {'combat': 1, 'wave': 2, 'ui': 3}
+        self.sound_rate_limits = {
+            'shoot': (3, 50),
+            'enemy_hit': (2, 50),
+        }
+        self.default_sound_rate_limit = (1, 50)
+        self.audio_channels = 8
         self.starting_money = 3000
         self.lives = 20
 
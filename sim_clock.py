@@ -0,0 +1,41 @@
+"""Часы симуляции с фиксированным шагом, не зависящие от частоты отрисовки кадров."""
+
+
+class SimulationClock:
+    """
+    Накопитель времени для фиксированного шага симуляции.
+    Реальное время кадра добавляется в накопитель, из которого забирается целое число шагов длиной step_ms.
+    Все таймеры игры (перезарядка башен, спавн врагов, генерация денег) используют время симуляции self.time.
+    """
+    def __init__(self, sim_rate=60, max_steps=5):
+        """
+        :param sim_rate: Количество шагов симуляции в секунду.
+        :param max_steps: Максимум шагов за один кадр, защищает от "спирали смерти" при долгих кадрах.
+        """
+        self.step_ms = 1000 / sim_rate
+        self.dt = self.step_ms / 1000  # Длина шага в секундах, на неё умножаются все скорости
+        self.max_steps = max_steps
+        self.time = 0  # Время симуляции в миллисекундах
+        self.steps = 0
+        self.accumulator = 0
+        self.dropped_ms = 0
+
+    def advance(self, frame_ms):
+        """
+        Добавляет реальное время кадра и возвращает количество шагов симуляции, которые нужно выполнить.
+        Если отставание больше max_steps шагов, лишнее время отбрасывается и игра замедляется вместо зависания.
+        """
+        self.accumulator += frame_ms
+        steps = int(self.accumulator // self.step_ms)
+        if steps > self.max_steps:
+            self.dropped_ms += (steps - self.max_steps) * self.step_ms
+            steps = self.max_steps
+            self.accumulator %= self.step_ms
+        else:
+            self.accumulator -= steps * self.step_ms
+        return steps
+
+    def tick(self):
+        """Продвигает время симуляции на один шаг."""
+        self.steps += 1
+        self.time = self.steps * self.step_ms
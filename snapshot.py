@@ -0,0 +1,467 @@
+"""
+Снимок состояния игры в компактном двоичном формате: быстрое сохранение (F5) и загрузка (F9), восстановление
+после сбоя по автосохранению на начале волны и запуск замеров сразу с тяжёлого состояния поздней волны.
+
+Снимок делается между шагами симуляции. Сохраняются деньги, уровень и волна, расписания волн и курсор появления
+врагов, состояние генератора случайных чисел, враги (вид, путь, пройденное расстояние, здоровье), башни
+(вид, позиция, уровень, перезарядка, политика цели), раскладка колеса таймеров, отложенные попадания и летящие
+пули. Визуальные трассеры и содержимое пулов не сохраняются: они не влияют на симуляцию.
+
+Формат (little-endian): заголовок - магическое b'TDSN' и версия (H), затем секции фиксированного порядка.
+Скалярные поля упакованы struct, поля сущностей лежат столбцами - array с длиной (I) перед данными.
+Загрузка снимка другой версии, обрезанного или повреждённого снимка завершается ValueError до изменения игры.
+
+Примеры:
+    python main.py --load logs/autosave.tds
+    python bench.py --snapshot late_wave.tds --scenario snapshot
+"""
+import gc
+import heapq
+import math
+import os
+import random
+import struct
+import sys
+from array import array
+
+from enemy import EnemyType
+from tower import BasicTower, SniperTower, MoneyTower
+from targeting import POLICY_NAMES
+from scheduler import Timer
+from waves import SpawnTimeline
+
+MAGIC = b'TDSN'
+VERSION = 1
+HEADER = struct.Struct('<4sH')
+# Деньги, утечки, уровень, проигрыш, победа, выбранная башня, сетка, шаг, накопитель, отброшенное время, зерно
+GAME = struct.Struct('<dIBBBbBQddI')
+# Версия генератора, есть ли gauss_next, gauss_next
+RNG = struct.Struct('<iBd')
+# Волна, курсор появления, начало волны, все волны пройдены, уровень запущен
+LEVEL = struct.Struct('<HIdBB')
+# Скорость, здоровье и награда вида врага, за ними - путь к изображению
+KIND = struct.Struct('<ddd')
+# Текущий тик колеса и количество сработавших таймеров
+WHEEL = struct.Struct('<qQ')
+COUNT = struct.Struct('<I')
+TOWER_CLASSES = (BasicTower, SniperTower, MoneyTower)
+TOWER_NAMES = tuple(tower_class.kind.name for tower_class in TOWER_CLASSES)
+
+
+def _number(value):
+    """Возвращает целое, если значение целое: числа хранятся как double, а деньги и здоровье в игре - int."""
+    return int(value) if value.is_integer() else value
+
+
+class _Writer:
+    """Последовательная запись секций снимка."""
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, layout, *values):
+        self.parts.append(layout.pack(*values))
+
+    def array(self, typecode, values):
+        """Записывает столбец: длину и данные array в little-endian."""
+        column = values if isinstance(values, array) else array(typecode, values)
+        if sys.byteorder == 'big':
+            column.byteswap()
+        self.parts.append(COUNT.pack(len(column)))
+        self.parts.append(column.tobytes())
+
+    def text(self, value):
+        data = value.encode('utf-8')
+        self.parts.append(struct.pack('<H', len(data)))
+        self.parts.append(data)
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class _Reader:
+    """Последовательное чтение секций снимка."""
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def array(self, typecode):
+        count, = self.unpack(COUNT)
+        column = array(typecode)
+        end = self.offset + count * column.itemsize
+        if end > len(self.data):
+            raise ValueError("Snapshot is truncated")
+        column.frombytes(self.data[self.offset:end])
+        self.offset = end
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return column
+
+    def text(self):
+        length, = self.unpack(struct.Struct('<H'))
+        if self.offset + length > len(self.data):
+            raise ValueError("Snapshot is truncated")
+        value = bytes(self.data[self.offset:self.offset + length]).decode('utf-8')
+        self.offset += length
+        return value
+
+
+def _slot_order(sprites):
+    """Порядок создания спрайтов-представлений хранилища сущностей (по номеру слота) или None для обычных спрайтов."""
+    if sprites and getattr(sprites[0], 'slot', None) is not None:
+        return sorted(range(len(sprites)), key=lambda i: sprites[i].slot)
+    return None
+
+
+def dumps(game):
+    """
+    Сериализует состояние игры game.
+    :return: bytes снимка.
+    """
+    level = game.level
+    clock = game.sim_clock
+    out = _Writer()
+    out.pack(HEADER, MAGIC, VERSION)
+    selected = TOWER_NAMES.index(game.selected_tower_type) if game.selected_tower_type in TOWER_NAMES else -1
+    out.pack(GAME, game.settings.starting_money, game.leaks, game.current_level_index, game.is_game_over,
+             game.is_game_won, selected, game.show_grid, clock.steps, clock.accumulator, clock.dropped_ms,
+             game.seed)
+    version, state, gauss = game.rng.getstate()
+    out.pack(RNG, version, gauss is not None, gauss or 0.0)
+    out.array('I', state)
+
+    out.pack(LEVEL, level.current_wave, level.spawn_cursor, level.wave_start_time, level.all_waves_complete,
+             level.started)
+    out.pack(COUNT, len(level.waves))
+    for timeline in level.waves:
+        out.array('d', timeline.times)
+        out.array('H', timeline.types)
+        out.array('B', timeline.paths)
+
+    # Враги: виды - отдельной таблицей, пути - номерами в level.enemy_paths
+    enemies = level.enemies.sprites()
+    path_ids = {id(level.compiled_path(points)): i for i, points in enumerate(level.enemy_paths)}
+    kinds = {}
+    for enemy in enemies:
+        kinds.setdefault(enemy.kind, len(kinds))
+    out.pack(COUNT, len(kinds))
+    for kind in kinds:
+        out.pack(KIND, kind.speed, kind.health, kind.reward)
+        out.text(kind.image_path)
+    try:
+        out.array('B', [path_ids[id(enemy.path)] for enemy in enemies])
+    except KeyError:
+        raise ValueError("Enemy path is not one of the level paths") from None
+    out.array('H', [kinds[enemy.kind] for enemy in enemies])
+    out.array('d', [enemy.distance for enemy in enemies])
+    out.array('d', [enemy.health for enemy in enemies])
+    out.array('I', _slot_order(enemies) or ())
+
+    towers = level.towers.sprites()
+    grid_towers = set(game.grid.towers)
+    tower_ids = {tower: i for i, tower in enumerate(towers)}
+    out.array('B', [TOWER_NAMES.index(tower.kind.name) for tower in towers])
+    out.array('d', [tower.position.x for tower in towers])
+    out.array('d', [tower.position.y for tower in towers])
+    out.array('H', [tower.level for tower in towers])
+    out.array('d', [tower.damage for tower in towers])
+    out.array('d', [tower.rate_of_fire for tower in towers])
+    out.array('d', [tower.last_shot_time for tower in towers])
+    out.array('B', [POLICY_NAMES.index(tower.targeting) for tower in towers])
+    out.array('H', [tower.rotation_index for tower in towers])
+    out.array('d', [getattr(tower, 'last_generation_time', 0.0) for tower in towers])
+    out.array('B', [tower in grid_towers for tower in towers])
+    out.array('I', [tower_ids[tower] for tower in level.ready_towers])
+
+    # Колесо таймеров сохраняется раскладкой по слотам, чтобы таймеры одного тика сработали в прежнем порядке
+    timers = level.timers
+    owners = {id(tower.timer): i for i, tower in enumerate(towers) if tower.timer is not None}
+    entries = list(timers.entries())
+    if any(id(timer) not in owners for _, _, timer in entries):
+        raise ValueError("Timer wheel holds a timer that does not belong to a tower")
+    out.pack(WHEEL, timers.current, timers.fired)
+    out.array('B', [wheel_level for wheel_level, _, _ in entries])
+    out.array('H', [index for _, index, _ in entries])
+    out.array('q', [timer.tick for _, _, timer in entries])
+    out.array('I', [owners[id(timer)] for _, _, timer in entries])
+
+    # Попадания по убитым врагам или врагам другого поколения не сработают, поэтому не сохраняются
+    enemy_ids = {enemy: i for i, enemy in enumerate(enemies)}
+    # Очередь - куча, и после отбора попаданий порядок списка перестаёт быть кучей: сохраняется по времени и порядку
+    # выстрелов, а при загрузке куча перестраивается
+    hits = sorted((hit for hit in level.scheduled_hits.queue if hit[2] in enemy_ids and hit[2].generation == hit[3]),
+                  key=lambda hit: hit[:2])
+    out.pack(struct.Struct('<Q'), level.scheduled_hits.next_id)
+    out.array('d', [hit[0] for hit in hits])
+    out.array('Q', [hit[1] for hit in hits])
+    out.array('I', [enemy_ids[hit[2]] for hit in hits])
+    out.array('d', [hit[4] for hit in hits])
+
+    bullets = level.bullets.sprites()
+    out.array('d', [value for bullet in bullets for value in (bullet.position.x, bullet.position.y,
+                                                              bullet.target.x, bullet.target.y,
+                                                              bullet.velocity.x, bullet.velocity.y)])
+    out.array('d', [bullet.damage for bullet in bullets])
+    out.array('I', _slot_order(bullets) or ())
+    return out.getvalue()
+
+
+def loads(game, data):
+    """
+    Восстанавливает состояние игры game из снимка data. Текущий уровень освобождается и создаётся заново.
+    Снимок сначала целиком разбирается и проверяется: повреждённый, обрезанный или несовместимый с уровнями игры
+    снимок завершается ValueError, и игра остаётся нетронутой.
+    """
+    state = _parse(game, data)
+    # Тысячи новых спрайтов иначе запускают несколько полных проходов сборщика мусора
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        _restore(game, state)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _check(condition, message):
+    if not condition:
+        raise ValueError(f"Corrupt snapshot: {message}")
+
+
+def _finite(values):
+    return all(map(math.isfinite, values))
+
+
+def _is_permutation(order, count):
+    """Порядок слотов сохраняется пустым для обычных спрайтов или перестановкой номеров сущностей."""
+    return not order or (len(order) == count and sorted(order) == list(range(count)))
+
+
+def _parse(game, data):
+    """Разбирает снимок data в словарь столбцов и проверяет ссылки между секциями. Игру не изменяет."""
+    try:
+        return _read(game, _Reader(data))
+    except (struct.error, IndexError, UnicodeDecodeError, OverflowError, TypeError) as error:
+        raise ValueError(f"Corrupt snapshot: {error}") from None
+
+
+def _read(game, src):
+    magic, version = src.unpack(HEADER)
+    if magic != MAGIC:
+        raise ValueError("Not a game snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    state = {}
+    (state['money'], state['leaks'], state['level_index'], state['game_over'], state['game_won'], state['selected'],
+     state['show_grid'], state['steps'], state['accumulator'], state['dropped_ms'], state['seed']) = src.unpack(GAME)
+    _check(state['level_index'] < len(game.level_specs), f"no level {state['level_index'] + 1}")
+    _check(-1 <= state['selected'] < len(TOWER_NAMES), "unknown selected tower")
+    _check(_finite((state['money'], state['accumulator'], state['dropped_ms'])), "invalid game values")
+    time = state['steps'] * game.sim_clock.step_ms
+    spec = game.level_specs[state['level_index']]
+    # Пути врагов берутся из настроек и одинаковы на всех уровнях
+    path_count = len(game.level.enemy_paths)
+
+    rng_version, has_gauss, gauss = src.unpack(RNG)
+    state['rng'] = (rng_version, tuple(src.array('I')), gauss if has_gauss else None)
+    try:
+        random.Random().setstate(state['rng'])
+    except (ValueError, TypeError, OverflowError):
+        _check(False, "invalid random generator state")
+
+    (state['current_wave'], state['spawn_cursor'], state['wave_start_time'], state['all_waves_complete'],
+     state['started']) = src.unpack(LEVEL)
+    _check(math.isfinite(state['wave_start_time']) and state['wave_start_time'] <= time, "invalid wave start time")
+    wave_count, = src.unpack(COUNT)
+    state['waves'] = waves = []
+    for _ in range(wave_count):
+        timeline = SpawnTimeline(src.array('d'), src.array('H'), src.array('B'))
+        _check(len(timeline.types) == len(timeline.paths) == len(timeline), "wave columns differ in length")
+        _check(_finite(timeline.times), "invalid spawn time")
+        _check(max(timeline.types, default=0) < len(spec.enemy_types), "unknown enemy type in a wave")
+        _check(max(timeline.paths, default=0) < path_count, "unknown path in a wave")
+        waves.append(timeline)
+    _check(state['current_wave'] < wave_count, "current wave is out of range")
+    _check(state['spawn_cursor'] <= len(waves[state['current_wave']]), "spawn cursor is out of range")
+
+    kind_count, = src.unpack(COUNT)
+    state['kinds'] = kinds = []
+    for _ in range(kind_count):
+        speed, health, reward = src.unpack(KIND)
+        _check(_finite((speed, health, reward)), "invalid enemy kind")
+        image_path = src.text()
+        _check(os.path.isfile(image_path), f"missing enemy image {image_path}")
+        kinds.append({'speed': _number(speed), 'health': _number(health), 'reward': _number(reward),
+                      'image_path': image_path})
+    enemies = state['enemies'] = {'paths': src.array('B'), 'kinds': src.array('H'), 'distances': src.array('d'),
+                                  'health': src.array('d'), 'order': src.array('I')}
+    enemy_count = len(enemies['paths'])
+    _check(len(enemies['kinds']) == len(enemies['distances']) == len(enemies['health']) == enemy_count,
+           "enemy columns differ in length")
+    _check(max(enemies['paths'], default=0) < path_count, "unknown enemy path")
+    _check(_finite(enemies['distances']) and _finite(enemies['health']), "invalid enemy values")
+    _check(max(enemies['kinds'], default=0) < kind_count, "unknown enemy kind")
+    _check(_is_permutation(enemies['order'], enemy_count), "invalid enemy slot order")
+
+    towers = state['towers'] = {
+        'types': src.array('B'), 'xs': src.array('d'), 'ys': src.array('d'), 'levels': src.array('H'),
+        'damages': src.array('d'), 'rates': src.array('d'), 'last_shots': src.array('d'),
+        'policies': src.array('B'), 'rotations': src.array('H'), 'generations': src.array('d'),
+        'on_grid': src.array('B'),
+    }
+    tower_count = len(towers['types'])
+    _check(all(len(column) == tower_count for column in towers.values()), "tower columns differ in length")
+    _check(max(towers['types'], default=0) < len(TOWER_CLASSES), "unknown tower type")
+    width, height = game.settings.screen_width, game.settings.screen_height
+    _check(all(0 <= x <= width for x in towers['xs']) and all(0 <= y <= height for y in towers['ys']),
+           "tower outside the screen")
+    _check(all(_finite(towers[name]) for name in ('damages', 'rates', 'last_shots', 'generations')),
+           "invalid tower values")
+    _check(max(towers['policies'], default=0) < len(POLICY_NAMES), "unknown targeting policy")
+    _check(max(towers['rotations'], default=0) < game.settings.rotation_steps, "unknown tower rotation")
+    state['ready'] = src.array('I')
+    _check(max(state['ready'], default=0) < tower_count or not state['ready'], "unknown ready tower")
+
+    wheel = game.level.timers
+    state['wheel'] = src.unpack(WHEEL)
+    # Колесо обрабатывает тики по одному, поэтому его тик не может отставать от времени симуляции или опережать его
+    _check(0 <= state['wheel'][0] <= wheel.to_tick(time), "timer wheel is out of step with the clock")
+    timers = state['timers'] = {'levels': src.array('B'), 'slots': src.array('H'), 'ticks': src.array('q'),
+                                'owners': src.array('I')}
+    _check(len(set(map(len, timers.values()))) == 1, "timer columns differ in length")
+    _check(max(timers['levels'], default=0) <= wheel.levels, "unknown timer wheel level")
+    _check(max(timers['slots'], default=0) <= wheel.mask, "unknown timer wheel slot")
+    _check(len(set(timers['owners'])) == len(timers['owners']), "a tower owns several timers")
+    _check(all(tick > state['wheel'][0] for tick in timers['ticks']), "timer in the past")
+    _check(not timers['owners'] or max(timers['owners']) < tower_count, "timer of an unknown tower")
+
+    state['next_hit_id'], = src.unpack(struct.Struct('<Q'))
+    hits = state['hits'] = {'times': src.array('d'), 'ids': src.array('Q'), 'enemies': src.array('I'),
+                            'damages': src.array('d')}
+    _check(len(set(map(len, hits.values()))) == 1, "hit columns differ in length")
+    _check(not hits['enemies'] or max(hits['enemies']) < enemy_count, "hit on an unknown enemy")
+    _check(_finite(hits['times']) and _finite(hits['damages']), "invalid hit values")
+
+    bullets = state['bullets'] = {'vectors': src.array('d'), 'damages': src.array('d'), 'order': src.array('I')}
+    bullet_count = len(bullets['damages'])
+    _check(len(bullets['vectors']) == 6 * bullet_count, "bullet columns differ in length")
+    _check(all(abs(value) < 1e6 for value in bullets['vectors']) and _finite(bullets['damages']),
+           "invalid bullet values")
+    _check(_is_permutation(bullets['order'], bullet_count), "invalid bullet slot order")
+    _check(src.offset == len(src.data), "unexpected data after the last section")
+    return state
+
+
+def _restore(game, state):
+    clock = game.sim_clock
+    clock.steps = state['steps']
+    clock.time = state['steps'] * clock.step_ms
+    clock.accumulator = state['accumulator']
+    clock.dropped_ms = state['dropped_ms']
+    game.start_level(state['level_index'])
+    level = game.level
+    game.settings.starting_money = _number(state['money'])
+    game.leaks = state['leaks']
+    game.is_game_over = bool(state['game_over'])
+    game.is_game_won = bool(state['game_won'])
+    game.selected_tower_type = TOWER_NAMES[state['selected']] if state['selected'] >= 0 else None
+    game.show_grid = bool(state['show_grid'])
+    game.seed = state['seed']
+    game.rng.setstate(state['rng'])
+
+    level.current_wave = state['current_wave']
+    level.spawn_cursor = state['spawn_cursor']
+    level.wave_start_time = state['wave_start_time']
+    level.all_waves_complete = bool(state['all_waves_complete'])
+    level.started = bool(state['started'])
+    level.waves = state['waves']
+
+    kinds = [EnemyType.get(**kind) for kind in state['kinds']]
+    paths = [level.compiled_path(points) for points in level.enemy_paths]
+    columns = state['enemies']
+    path_ids, kind_ids, distances, healths = (columns['paths'], columns['kinds'], columns['distances'],
+                                              columns['health'])
+    # Представления хранилища сущностей создаются в порядке слотов, в группу враги добавляются в исходном порядке
+    order = columns['order'] or range(len(path_ids))
+    enemies = [None] * len(path_ids)
+    restored = level.restore_enemies((paths[path_ids[i]], kinds[kind_ids[i]], distances[i], _number(healths[i]))
+                                     for i in order)
+    for i, enemy in zip(order, restored):
+        enemies[i] = enemy
+    level.enemies.add(*enemies)
+
+    columns = state['towers']
+    towers = []
+    for i, type_id in enumerate(columns['types']):
+        tower = TOWER_CLASSES[type_id]((columns['xs'][i], columns['ys'][i]), game)
+        tower.level = columns['levels'][i]
+        tower.damage = _number(columns['damages'][i])
+        tower.rate_of_fire = _number(columns['rates'][i])
+        tower.last_shot_time = columns['last_shots'][i]
+        tower.targeting = POLICY_NAMES[columns['policies'][i]]
+        rotation = columns['rotations'][i]
+        if tower.atlas is not None and rotation:
+            tower.rotation_index = rotation
+            tower.rotation_angle = tower.atlas.angle(rotation)
+            tower.image = tower.atlas.frames[rotation]
+            tower.rect = tower.image.get_rect(center=tower.position)
+        if isinstance(tower, MoneyTower):
+            tower.last_generation_time = columns['generations'][i]
+        if columns['on_grid'][i]:
+            game.grid.place_tower(tower)
+        towers.append(tower)
+    level.towers.add(*towers)
+    level.ready_towers = {towers[i]: None for i in state['ready']}
+
+    timers = level.timers
+    timers.current, timers.fired = state['wheel']
+    columns = state['timers']
+    for wheel_level, index, tick, owner in zip(columns['levels'], columns['slots'], columns['ticks'],
+                                               columns['owners']):
+        tower = towers[owner]
+        tower.timer = Timer(tick, tower.timer_callback(level))
+        timers.place(wheel_level, index, tower.timer)
+
+    hits = level.scheduled_hits
+    hits.next_id = state['next_hit_id']
+    columns = state['hits']
+    hits.queue = [(time, hit_id, enemies[enemy], enemies[enemy].generation, _number(damage))
+                  for time, hit_id, enemy, damage in zip(columns['times'], columns['ids'], columns['enemies'],
+                                                         columns['damages'])]
+    heapq.heapify(hits.queue)
+
+    columns = state['bullets']
+    vectors, damages = columns['vectors'], columns['damages']
+    bullets = [None] * len(damages)
+    for i in columns['order'] or range(len(damages)):
+        x, y, target_x, target_y, velocity_x, velocity_y = vectors[6 * i:6 * i + 6]
+        bullet = level.create_bullet((x, y), (target_x, target_y), _number(damages[i]))
+        bullet.velocity.update(velocity_x, velocity_y)
+        if level.bullet_store is not None:
+            level.bullet_store.velocities[bullet.slot] = (velocity_x, velocity_y)
+        bullets[i] = bullet
+    level.bullets.add(*bullets)
+
+
+def save(game, path):
+    """Сохраняет снимок игры game в файл path."""
+    data = dumps(game)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Запись через временный файл: сбой во время сохранения не портит прежний снимок
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
+    return len(data)
+
+
+def load(game, path):
+    """Восстанавливает состояние игры game из файла снимка path."""
+    with open(path, 'rb') as file:
+        loads(game, file.read())
@@ -0,0 +1,74 @@
+"""Равномерная пространственная сетка (spatial hash) для быстрого поиска врагов в радиусе башни."""
+import math
+
+
+class SpatialHash:
+    """
+    Индекс спрайтов по клеткам фиксированного размера, выровненным по сетке башен.
+    Перестраивается один раз за шаг симуляции, после перемещения врагов.
+    """
+    def __init__(self, cell_size=64):
+        """
+        :param cell_size: Размер клетки в пикселях.
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        self.radius_sq = {}  # Радиус -> порог для квадрата расстояния, см. squared_radius()
+
+    def rebuild(self, sprites):
+        """Заново раскладывает спрайты (с атрибутом position) по клеткам, запоминая их порядок в группе."""
+        size = self.cell_size
+        cells = {}
+        for order, sprite in enumerate(sprites):
+            key = (int(sprite.position.x // size), int(sprite.position.y // size))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [(order, sprite)]
+            else:
+                bucket.append((order, sprite))
+        self.cells = cells
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.cells.values())
+
+    def squared_radius(self, radius):
+        """
+        Возвращает наибольший квадрат расстояния d, для которого sqrt(d) <= radius. radius * radius после
+        округления может оказаться меньше, и враг ровно на границе радиуса не попал бы в выборку, хотя проверка
+        distance_to(...) <= radius его принимает.
+        """
+        radius_sq = self.radius_sq.get(radius)
+        if radius_sq is None:
+            radius_sq = radius * radius
+            while math.sqrt(math.nextafter(radius_sq, math.inf)) <= radius:
+                radius_sq = math.nextafter(radius_sq, math.inf)
+            self.radius_sq[radius] = radius_sq
+        return radius_sq
+
+    def query(self, position, radius):
+        """
+        Возвращает спрайты на расстоянии не больше radius от position.
+        Расстояния сравниваются в квадрате, без извлечения корня.
+        :return: Список пар (спрайт, квадрат расстояния) в порядке спрайтов в исходной группе, чтобы выбор цели
+                 при равных значениях совпадал с линейным перебором группы.
+        """
+        size = self.cell_size
+        x0, x1 = int((position.x - radius) // size), int((position.x + radius) // size)
+        y0, y1 = int((position.y - radius) // size), int((position.y + radius) // size)
+        radius_sq = self.squared_radius(radius)
+        cells = self.cells
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(cells):
+            # Занятых клеток меньше, чем клеток в квадрате запроса - дешевле пройти по занятым
+            buckets = [bucket for (cx, cy), bucket in cells.items() if x0 <= cx <= x1 and y0 <= cy <= y1]
+        else:
+            buckets = [cells[key] for key in ((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+                       if key in cells]
+
+        found = []
+        for bucket in buckets:
+            for order, sprite in bucket:
+                distance_sq = position.distance_squared_to(sprite.position)
+                if distance_sq <= radius_sq:
+                    found.append((order, sprite, distance_sq))
+        found.sort(key=lambda item: item[0])
+        return [(sprite, distance_sq) for _, sprite, distance_sq in found]
@@ -0,0 +1,78 @@
+"""
+Политики выбора цели башнями и индекс врагов, по которому они работают.
+Индекс перестраивается один раз за шаг: пространственная сетка ограничивает кандидатов врагами в радиусе башни,
+а порядок врагов по продвижению к выходу и по здоровью вычисляется сортировкой один раз для всех башен.
+Выбор цели - минимум по готовому рангу среди кандидатов, без перебора всех врагов уровня.
+"""
+import math
+
+from spatial import SpatialHash
+
+# Политика -> (порядок индекса, по которому выбирается цель)
+POLICIES = {
+    'first': 'progress',  # Ближе всех к выходу
+    'last': 'progress_reversed',  # Дальше всех от выхода
+    'strongest': 'health_reversed',  # Больше всего здоровья
+    'weakest': 'health',  # Меньше всего здоровья
+    'nearest': None,  # Ближе всех к башне
+}
+POLICY_NAMES = list(POLICIES)
+
+
+class TargetIndex:
+    """Индекс врагов на текущем шаге: пространственная сетка и ранги врагов в упорядоченных списках."""
+    def __init__(self, cell_size=64):
+        """
+        :param cell_size: Размер клетки пространственной сетки в пикселях.
+        """
+        self.spatial = SpatialHash(cell_size)
+        self.enemies = []
+        self.ranks = {}  # Порядок -> {враг: место в порядке}, строится при первом запросе на шаге
+
+    def rebuild(self, enemies):
+        """Перестраивает индекс после перемещения врагов."""
+        self.enemies = list(enemies)
+        self.spatial.rebuild(self.enemies)
+        self.ranks = {}
+
+    def __len__(self):
+        return len(self.enemies)
+
+    def query(self, position, radius):
+        """Возвращает пары (враг, квадрат расстояния) в радиусе, см. SpatialHash.query."""
+        return self.spatial.query(position, radius)
+
+    def rank(self, order):
+        """
+        Возвращает словарь {враг: место} для порядка order. Сортировка устойчивая, поэтому при равных значениях
+        раньше идёт враг, добавленный в группу раньше.
+        """
+        ranks = self.ranks.get(order)
+        if ranks is None:
+            enemies = self.enemies
+            if order == 'progress':
+                ordered = sorted(enemies, key=lambda enemy: enemy.remaining_distance())
+            elif order == 'progress_reversed':
+                ordered = sorted(enemies, key=lambda enemy: -enemy.remaining_distance())
+            elif order == 'health':
+                ordered = sorted(enemies, key=lambda enemy: enemy.health)
+            else:
+                ordered = sorted(enemies, key=lambda enemy: -enemy.health)
+            ranks = self.ranks[order] = {enemy: place for place, enemy in enumerate(ordered)}
+        return ranks
+
+    def select(self, position, radius, policy='nearest'):
+        """
+        Выбирает цель в радиусе radius от position по политике policy.
+        :return: Враг или None, если в радиусе никого нет.
+        """
+        candidates = self.spatial.query(position, radius)
+        if not candidates:
+            return None
+        order = POLICIES[policy]
+        if order is None:
+            # Сравниваются расстояния, а не их квадраты: разные квадраты могут дать одно расстояние, и тогда,
+            # как при переборе по distance_to, выбирается враг, раньше добавленный в группу
+            return min(candidates, key=lambda item: math.sqrt(item[1]))[0]
+        ranks = self.rank(order)
+        return min(candidates, key=lambda item: ranks[item[0]])[0]
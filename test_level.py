@@ -0,0 +1,52 @@
+"""
+Проверка уровня: попадания нескольких пуль в одного врага за шаг.
+
+Запуск:
+    python -m pytest test_level.py
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest
+
+from events import EnemyKilled
+from main import TowerDefenseGame
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(autouse=True)
+def repo_directory(monkeypatch):
+    # Ресурсы игры загружаются по путям относительно корня репозитория
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.mark.parametrize('entity_store', [False, True])
+def test_several_bullets_kill_an_enemy_once(entity_store):
+    game = TowerDefenseGame(headless=True)
+    game.settings.projectile_mode = 'physical'
+    game.settings.entity_store = entity_store
+    game.start_level(0)
+    level = game.level
+    # Уровень без волн: на поле только враг теста
+    level.started = True
+    level.current_wave = len(level.waves) - 1
+    level.spawn_cursor = len(level.waves[-1])
+    enemy = level.create_enemy(game.settings.enemy_path1, speed=0, health=10, reward=10,
+                               image_path=game.settings.enemy_sprites['base'])
+    enemy.distance = 300
+    enemy.update(0)
+    level.enemies.add(enemy)
+    position = (enemy.position.x, enemy.position.y)
+    # Три пули в одной точке с врагом: все попадания приходятся на один шаг, убивает первая
+    level.bullets.add(*[level.create_bullet((position[0] - 1, position[1]), position, 10) for _ in range(3)])
+    killed = []
+    game.events.subscribe(EnemyKilled, killed.extend)
+    money = game.settings.starting_money
+
+    game._simulate_step()
+    assert len(killed) == 1
+    assert game.settings.starting_money == money + 10
+    assert not level.enemies
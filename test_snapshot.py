@@ -0,0 +1,108 @@
+"""
+Проверка снимков состояния (snapshot.py): отложенные попадания после убитой цели, повреждённые и обрезанные снимки,
+совпадение восстановленной игры с исходной.
+
+Запуск:
+    python -m pytest test_snapshot.py
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest
+
+import replay
+import snapshot
+from main import TowerDefenseGame
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(autouse=True)
+def repo_directory(monkeypatch):
+    # Ресурсы игры загружаются по путям относительно корня репозитория
+    monkeypatch.chdir(ROOT)
+
+
+def new_game(seed=1):
+    game = TowerDefenseGame(headless=True, seed=seed)
+    game.settings.starting_money = 10 ** 6
+    return game
+
+
+def spawn(game, distance):
+    level = game.level
+    enemy = level.create_enemy(game.settings.enemy_path1, speed=30, health=100,
+                               image_path=game.settings.enemy_sprites['base'])
+    enemy.distance = distance
+    enemy.update(0)
+    level.enemies.add(enemy)
+    return enemy
+
+
+def played_game(steps=600):
+    game = new_game(3)
+    for position in game.settings.tower_positions[:8]:
+        game.level.attempt_place_tower(position, 'basic')
+    for _ in range(steps):
+        game._simulate_step()
+    return game
+
+
+def test_pending_hits_survive_a_killed_target():
+    game = new_game()
+    now = game.sim_clock.time
+    dead, first, second = spawn(game, 10), spawn(game, 20), spawn(game, 30)
+    hits = game.level.scheduled_hits
+    hits.schedule(now + 1, dead, 5)
+    hits.schedule(now + 500, first, 7)
+    hits.schedule(now + 20, second, 7)
+    # Убитая цель была корнем кучи: без перестройки попадание по second оказалось бы за попаданием по first
+    dead.kill()
+
+    restored = new_game()
+    snapshot.loads(restored, snapshot.dumps(game))
+    for current in (game, restored):
+        current.level.scheduled_hits.apply_due(now + 30)
+    assert second.health == 93
+    assert sorted(enemy.health for enemy in restored.level.enemies) == [93, 100]
+    assert len(restored.level.scheduled_hits) == 1
+
+
+def test_restored_game_continues_identically():
+    game = played_game()
+    restored = new_game(7)
+    snapshot.loads(restored, snapshot.dumps(game))
+    assert replay.state_digest(restored) == replay.state_digest(game)
+    for _ in range(1500):
+        game._simulate_step()
+        restored._simulate_step()
+    assert replay.state_digest(restored) == replay.state_digest(game)
+
+
+def test_truncated_snapshot_leaves_game_untouched():
+    data = snapshot.dumps(played_game())
+    game = new_game(9)
+    for _ in range(200):
+        game._simulate_step()
+    level, digest = game.level, replay.state_digest(game)
+    for cut in range(0, len(data), 7):
+        with pytest.raises(ValueError):
+            snapshot.loads(game, data[:cut])
+    with pytest.raises(ValueError):
+        snapshot.loads(game, data + b'\0')
+    assert game.level is level
+    assert replay.state_digest(game) == digest
+
+
+def test_wave_timelines_come_from_the_snapshot():
+    game = played_game()
+    data = snapshot.dumps(game)
+    restored = new_game(7)
+    # Файл уровня мог измениться: число волн в снимке не зависит от текущего описания уровня
+    spec = restored.level_specs[game.current_level_index]
+    spec.wave_entries = spec.wave_entries[:1]
+    snapshot.loads(restored, data)
+    assert [list(timeline.times) for timeline in restored.level.waves] == \
+           [list(timeline.times) for timeline in game.level.waves]
@@ -0,0 +1,130 @@
+"""
+Проверка пространственной сетки и индекса целей против линейного перебора группы врагов, как в исходном поиске цели
+башнями: враг в радиусе, если distance_to <= радиуса, а при равных значениях выбирается враг, раньше добавленный
+в группу.
+
+Запуск:
+    python -m pytest test_spatial.py
+"""
+import math
+import random
+
+import pygame
+
+from spatial import SpatialHash
+from targeting import POLICY_NAMES, TargetIndex
+
+RANGES = (150, 300, 47.5)
+
+
+class FakeEnemy:
+    """Враг с полями, которые используют индекс и политики выбора цели."""
+    def __init__(self, position, health, remaining):
+        self.position = pygame.math.Vector2(position)
+        self.health = health
+        self.remaining = remaining
+
+    def remaining_distance(self):
+        return self.remaining
+
+
+def brute_force_query(enemies, position, radius):
+    return [enemy for enemy in enemies if position.distance_to(enemy.position) <= radius]
+
+
+def brute_force_select(enemies, position, radius, policy):
+    """Линейный перебор: минимум ключа политики, при равенстве - первый враг группы."""
+    keys = {
+        'first': lambda enemy: enemy.remaining_distance(),
+        'last': lambda enemy: -enemy.remaining_distance(),
+        'strongest': lambda enemy: -enemy.health,
+        'weakest': lambda enemy: enemy.health,
+        'nearest': lambda enemy: position.distance_to(enemy.position),
+    }
+    best = None
+    for enemy in brute_force_query(enemies, position, radius):
+        if best is None or keys[policy](enemy) < keys[policy](best):
+            best = enemy
+    return best
+
+
+def random_layout(rng, tower, radius, count=200):
+    """
+    Враги вокруг башни: случайные точки, точки ровно на границе радиуса (в том числе с целыми координатами),
+    совпадающие позиции и повторяющиеся здоровье и продвижение для проверки порядка при равенстве.
+    """
+    enemies = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            position = (tower.x + rng.uniform(-2, 2) * radius, tower.y + rng.uniform(-2, 2) * radius)
+        elif kind < 0.7:
+            angle = rng.uniform(0, 2 * math.pi)
+            position = (tower.x + radius * math.cos(angle), tower.y + radius * math.sin(angle))
+        elif kind < 0.8:
+            position = (tower.x + rng.choice((-radius, radius)), tower.y)
+        elif kind < 0.9 and enemies:
+            position = rng.choice(enemies).position
+        else:
+            position = (tower.x + rng.uniform(-1, 1) * radius, tower.y + rng.uniform(-1, 1) * radius)
+        enemies.append(FakeEnemy(position, rng.choice((10, 50, 100)), rng.choice((100.0, 250.0, 400.0))))
+    return enemies
+
+
+def test_query_matches_linear_scan():
+    rng = random.Random(8)
+    for _ in range(200):
+        tower = pygame.math.Vector2(rng.uniform(0, 1200), rng.uniform(0, 800))
+        radius = rng.choice(RANGES)
+        enemies = random_layout(rng, tower, radius)
+        spatial = SpatialHash(rng.choice((32, 64, 100)))
+        spatial.rebuild(enemies)
+        found = [enemy for enemy, _ in spatial.query(tower, radius)]
+        assert found == brute_force_query(enemies, tower, radius)
+
+
+def test_query_includes_enemies_exactly_at_range():
+    tower = pygame.math.Vector2(400, 300)
+    # 90-120-150: целые координаты ровно на расстоянии 150
+    enemies = [FakeEnemy((490, 420), 10, 1.0), FakeEnemy((550, 300), 10, 1.0), FakeEnemy((550.001, 300), 10, 1.0)]
+    spatial = SpatialHash(64)
+    spatial.rebuild(enemies)
+    assert [enemy for enemy, _ in spatial.query(tower, 150)] == enemies[:2]
+
+
+def test_select_matches_linear_scan():
+    rng = random.Random(17)
+    index = TargetIndex(64)
+    for _ in range(200):
+        tower = pygame.math.Vector2(rng.uniform(0, 1200), rng.uniform(0, 800))
+        radius = rng.choice(RANGES)
+        enemies = random_layout(rng, tower, radius)
+        index.rebuild(enemies)
+        for policy in POLICY_NAMES:
+            assert index.select(tower, radius, policy) is brute_force_select(enemies, tower, radius, policy)
+
+
+def test_select_ties_pick_first_enemy_in_group():
+    tower = pygame.math.Vector2(0, 0)
+    # Одинаковое расстояние, здоровье и продвижение у всех врагов
+    enemies = [FakeEnemy(position, 50, 200.0) for position in ((30, 40), (-50, 0), (0, 50), (40, -30))]
+    index = TargetIndex(64)
+    index.rebuild(enemies)
+    for policy in POLICY_NAMES:
+        assert index.select(tower, 50, policy) is enemies[0]
+    index.rebuild(enemies[::-1])
+    for policy in POLICY_NAMES:
+        assert index.select(tower, 50, policy) is enemies[-1]
+
+
+def test_nearest_ties_compare_distances_not_squares():
+    rng = random.Random(3)
+    index = TargetIndex(64)
+    tower = pygame.math.Vector2(0, 0)
+    for _ in range(2000):
+        # Соседние по значению квадраты расстояния, корни которых совпадают после округления
+        angle = rng.uniform(0, 2 * math.pi)
+        first = FakeEnemy((100.1 * math.cos(angle), 100.1 * math.sin(angle)), 10, 1.0)
+        second = FakeEnemy((100.1 * math.cos(angle + 1), 100.1 * math.sin(angle + 1)), 10, 1.0)
+        index.rebuild([first, second])
+        assert index.select(tower, 150, 'nearest') is brute_force_select([first, second], tower, 150, 'nearest')
@@ -0,0 +1,55 @@
+"""
+Проверка башен: выстрел на том же тике, на котором срабатывает таймер перезарядки.
+
+Запуск:
+    python -m pytest test_tower.py
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest
+
+from main import TowerDefenseGame
+from tower import BasicTower, SniperTower
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(autouse=True)
+def repo_directory(monkeypatch):
+    # Ресурсы игры загружаются по путям относительно корня репозитория
+    monkeypatch.chdir(ROOT)
+
+
+def quiet_level(game):
+    """Уровень без волн: на поле только враги и башни теста."""
+    level = game.level
+    level.started = True
+    level.current_wave = len(level.waves) - 1
+    level.spawn_cursor = len(level.waves[-1])
+    return level
+
+
+@pytest.mark.parametrize('tower_class', [BasicTower, SniperTower])
+def test_tower_fires_every_cooldown_interval(tower_class):
+    game = TowerDefenseGame(headless=True)
+    level = quiet_level(game)
+    enemy = level.create_enemy(game.settings.enemy_path1, speed=0, health=10 ** 9,
+                               image_path=game.settings.enemy_sprites['base'])
+    enemy.distance = 300
+    enemy.update(0)
+    level.enemies.add(enemy)
+    tower = tower_class((enemy.position.x + 50, enemy.position.y), game)
+    level.add_tower(tower)
+
+    shots = []
+    for _ in range(game.settings.sim_rate * 20):
+        last_shot = tower.last_shot_time
+        game._simulate_step()
+        if tower.last_shot_time != last_shot:
+            shots.append(game.sim_clock.steps)
+    interval = round(tower.rate_of_fire / game.sim_clock.step_ms)
+    assert len(shots) > 5
+    assert {later - earlier for earlier, later in zip(shots, shots[1:])} == {interval}
@@ -0,0 +1,61 @@
+"""Кэш отрисованного текста: одинаковые строки не рендерятся шрифтом заново каждый кадр."""
+from collections import OrderedDict
+
+
+class TextCache:
+    """LRU-кэш поверхностей текста с ключом (шрифт, строка, цвет)."""
+    def __init__(self, max_size=256):
+        """
+        :param max_size: Максимальное количество хранимых поверхностей, при переполнении удаляется самая старая.
+        """
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color):
+        """Возвращает поверхность с текстом, рендеря её только при промахе кэша."""
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def stats(self):
+        """Возвращает размер кэша и счётчики попаданий, промахов и вытеснений."""
+        return {
+            'size': len(self.surfaces),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class HudLabel:
+    """Поле HUD, которое запрашивает новую поверхность только при изменении отображаемого значения."""
+    def __init__(self, cache, font, template, color=(255, 255, 255)):
+        """
+        :param template: Шаблон строки с одним полем {}, например "Money: ${}".
+        """
+        self.cache = cache
+        self.font = font
+        self.template = template
+        self.color = color
+        self.value = None
+        self.surface = None
+
+    def render(self, value):
+        """Возвращает поверхность для значения value."""
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.cache.render(self.font, self.template.format(value), self.color)
+        return self.surface
@@ -8,31 +8,76 @@
 - Скорострельность: время между выстрелами.
 """
 import pygame
-from bullet import Bullet
 import math
-from settings import Settings
+from events import TowerUpgraded
+from compact_sprite import CompactSprite
+from targeting import POLICIES, POLICY_NAMES
 
 
-class Tower(pygame.sprite.Sprite):
+class TowerType:
+    """Базовые характеристики вида башни, общие для всех башен этого вида."""
+    __slots__ = ('name', 'tower_range', 'damage', 'rate_of_fire', 'targeting')
+
+    def __init__(self, name, tower_range=0, damage=0, rate_of_fire=0, targeting='nearest'):
+        """
+        :param name: Ключ вида башни в Settings.tower_sprites и Settings.tower_costs.
+        :param tower_range: Радиус действия башни.
+        :param damage: Урон первого уровня.
+        :param rate_of_fire: Интервал между выстрелами первого уровня в миллисекундах.
+        :param targeting: Политика выбора цели по умолчанию (см. targeting.POLICIES).
+        """
+        self.name = name
+        self.tower_range = tower_range
+        self.damage = damage
+        self.rate_of_fire = rate_of_fire
+        self.targeting = targeting
+
+
+class Tower(CompactSprite):
     """Базовый класс для всех башен, его методы включают инициализацию, отрисовку, обновление, стрельбу, поворот
 к цели и поиск цели."""
+    # Поля экземпляра в слотах, настройки берутся из общего game.settings
+    __slots__ = ('position', 'game', 'image', 'rect', 'damage', 'rate_of_fire', 'last_shot_time', 'level',
+                 'original_image', 'rotation_angle', 'atlas', 'rotation_index', 'targeting', 'timer')
+    kind = TowerType('base')
+
     def __init__(self, position, game):
         super().__init__()
-        self.settings = Settings()
         self.position = pygame.math.Vector2(position)
         self.game = game
 
-        # Характеристики башни
+        # Характеристики башни: урон и скорострельность растут с улучшениями, остальное берётся из вида башни
         self.image = None
         self.rect = None
-        self.tower_range = 0  # Радиус действия башни
-        self.damage = 0   # Урон
-        self.rate_of_fire = 0    # Скорострельность в миллисекундах (интервал между выстрелами)
-        self.last_shot_time = pygame.time.get_ticks()  # Время последнего выстрела
+        self.damage = self.kind.damage   # Урон
+        self.rate_of_fire = self.kind.rate_of_fire    # Скорострельность в миллисекундах (интервал между выстрелами)
+        self.last_shot_time = game.sim_clock.time  # Время последнего выстрела (время симуляции)
+        self.targeting = self.kind.targeting  # Политика выбора цели, можно менять во время игры
         self.level = 1  # Уровень башни
 
         self.original_image = self.image
         self.rotation_angle = 0
+        self.atlas = None  # Атлас поворотов, общий для всех башен одного типа
+        self.rotation_index = 0
+        self.timer = None  # Последняя запись башни в колесе таймеров уровня
+
+    @property
+    def tower_range(self):
+        """Радиус действия башни."""
+        return self.kind.tower_range
+
+    def set_targeting(self, policy):
+        """
+        Меняет политику выбора цели.
+        :param policy: 'first', 'last', 'strongest', 'weakest' или 'nearest'.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown targeting policy: {policy}")
+        self.targeting = policy
+
+    def cycle_targeting(self):
+        """Переключает башню на следующую политику выбора цели."""
+        self.set_targeting(POLICY_NAMES[(POLICY_NAMES.index(self.targeting) + 1) % len(POLICY_NAMES)])
 
     def upgrade_cost(self):
         return 100 * self.level
@@ -44,19 +89,23 @@ class Tower(pygame.sprite.Sprite):
         # Проверяем, достаточно ли денег для улучшения
         if self.game.settings.starting_money >= self.upgrade_cost():
             # Списываем деньги
-            self.game.settings.starting_money -= self.upgrade_cost()
+            cost = self.upgrade_cost()
+            self.game.settings.starting_money -= cost
 
             # Увеличиваем уровень башни
             self.level += 1
+            self.game.events.post(TowerUpgraded(self, self.level, cost))
 
             # Увеличиваем характеристики башни
             self.damage = int(self.damage * 1.2)  # Увеличиваем урон на 20%
             self.rate_of_fire = int(self.rate_of_fire * 0.8)  # Увеличиваем скорострельность (уменьшение интервала)
+            self.reschedule(self.game.level)
 
-            print(f"Башня улучшена до уровня {self.level}. Новый урон: {self.damage}, "
-                  f"новая скорострельность: {self.rate_of_fire} мс.")
+            self.game.log.info('tower_upgraded', level=self.level, damage=self.damage,
+                               rate_of_fire=self.rate_of_fire)
         else:
-            print("Недостаточно денег для улучшения башни.")
+            self.game.log.warning('upgrade_not_affordable', cost=self.upgrade_cost(),
+                                  money=self.game.settings.starting_money)
 
     def is_hovered(self, mouse_pos):
         """
@@ -70,111 +119,153 @@ class Tower(pygame.sprite.Sprite):
         screen.blit(self.image, self.rect.topleft)  #Отображение информации о башне на экране.
         mouse_pos = pygame.mouse.get_pos()
         if self.is_hovered(mouse_pos):
-            level_text = self.game.font.render(f"Level: {self.level}", True, (255, 255, 255))
-            upgrade_cost_text = self.game.font.render(f"Upgrade: ${self.upgrade_cost()  }", True, (255, 255, 255))
+            self.draw_tooltip(screen)
+
+    def draw_tooltip(self, screen):
+        """
+        Отображает уровень башни и стоимость улучшения над башней.
+        :return: Области экрана, занятые текстом.
+        """
+        text_cache = self.game.text_cache
+        level_text = text_cache.render(self.game.font, f"Level: {self.level}", (255, 255, 255))
+        upgrade_cost_text = text_cache.render(self.game.font, f"Upgrade: ${self.upgrade_cost()}", (255, 255, 255))
 
-            level_text_pos = (self.rect.centerx, self.rect.top - 20)
-            upgrade_cost_text_pos = (self.rect.centerx, self.rect.top - 40)
+        level_text_pos = (self.rect.centerx, self.rect.top - 20)
+        upgrade_cost_text_pos = (self.rect.centerx, self.rect.top - 40)
 
-            screen.blit(level_text, level_text_pos)
-            screen.blit(upgrade_cost_text, upgrade_cost_text_pos)
+        return [screen.blit(level_text, level_text_pos), screen.blit(upgrade_cost_text, upgrade_cost_text_pos)]
 
-    def update(self, enemies, current_time, bullets_group):
+    def start_timers(self, level):
+        """Регистрирует в колесе таймеров уровня момент окончания перезарядки башни."""
+        self.timer = level.timers.schedule(self.last_shot_time + self.rate_of_fire, self.timer_callback(level))
+
+    def reschedule(self, level):
+        """Переносит ожидающий таймер башни на время по текущему интервалу (после улучшения)."""
+        # Башня из ready_towers уже перезарядилась, её таймер сработал
+        if self.timer is not None and self not in level.ready_towers:
+            self.timer.cancel()
+            self.start_timers(level)
+
+    def timer_callback(self, level):
+        """Возвращает функцию, вызываемую таймером башни: башня перезарядилась и ищет цель."""
+        return lambda: level.ready_towers.setdefault(self, None)
 
+    def is_reloaded(self, current_time):
+        """
+        Проверяет, закончилась ли перезарядка к моменту current_time. Время сравнивается в тиках колеса таймеров:
+        разность времён симуляции (steps * step_ms) может оказаться чуть меньше интервала на том тике, где
+        срабатывает таймер перезарядки, и башня выстрелила бы на тик позже.
+        """
+        timers = self.game.level.timers
+        return timers.to_tick(self.last_shot_time + self.rate_of_fire) <= timers.to_tick(current_time)
+
+    def update(self, enemies, current_time, bullets_group):
+        """
+        Ищет цель и стреляет, если перезарядка закончилась.
+        :return: True, если башня выстрелила.
+        """
         # Ищем ближайшую цель
         target = self.find_target(enemies)
         if target:
             self.rotate_towards(target.position)
         # Проверяем, может ли башня стрелять
-            if current_time - self.last_shot_time >= self.rate_of_fire:
+            if self.is_reloaded(current_time):
                 self.last_shot_time = current_time
                 self.shoot(target, bullets_group)
-                bullet = Bullet(self.position, target.position, self.damage, self.game)
-                bullets_group.add(bullet)
+                return True
+        return False
 
     def shoot(self, target, bullets_group):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_shot_time >= self.rate_of_fire:
+        current_time = self.game.sim_clock.time
+        if self.is_reloaded(current_time):
             self.last_shot_time = current_time
             target.take_damage(self.damage)
 
     def rotate_towards(self, target_position):
         dx = target_position.x - self.position.x
         dy = target_position.y - self.position.y
-        # Вычисляем угол в радианах
-        self.rotation_angle = (180 / math.pi) * -math.atan2(dy, dx)
-        # Преобразуем радианы в градусы
-        self.image = pygame.transform.rotate(self.original_image, self.rotation_angle)
+        # Вычисляем угол в радианах и преобразуем в градусы
+        index = self.atlas.index((180 / math.pi) * -math.atan2(dy, dx))
+        # Квантованный угол не изменился - кадр и rect остаются прежними
+        if index == self.rotation_index:
+            return
+        self.rotation_index = index
+        self.rotation_angle = self.atlas.angle(index)
+        self.image = self.atlas.frames[index]
         self.rect = self.image.get_rect(center=self.position)
 
     def find_target(self, enemies):
-        nearest_enemy = None
-        min_distance = float('inf')
-        for enemy in enemies:
-            distance = self.position.distance_to(enemy.position)
-            if distance < min_distance and distance <= self.tower_range:
-                nearest_enemy = enemy
-                min_distance = distance
-        return nearest_enemy
+        """
+        Ищет цель в радиусе действия башни по её политике выбора цели.
+        :param enemies: Индекс врагов (targeting.TargetIndex), перестроенный на текущем шаге.
+        """
+        return enemies.select(self.position, self.tower_range, self.targeting)
 
 
 class BasicTower(Tower):
     """ Реализации башен, расширяющие базовый класс."""
+    __slots__ = ()
+    kind = TowerType('basic', tower_range=150, damage=20, rate_of_fire=1000)
+
     def __init__(self, position, game):
         super().__init__(position, game)
-        self.image = pygame.image.load('assets/towers/basic_tower.png').convert_alpha()
+        self.atlas = game.assets.rotation_atlas(game.settings.tower_sprites['basic'], game.settings.rotation_steps)
+        self.image = self.atlas.frames[0]
         self.original_image = self.image
         self.rect = self.image.get_rect(center=self.position)
-        self.tower_range = 150 #диапазон
-        self.damage = 20 #повреждения
-        self.rate_of_fire = 1000 #скорострельность
 
     def shoot(self, target, bullets_group):
-        new_bullet = Bullet(self.position, target.position, self.damage, self.game)
-        bullets_group.add(new_bullet)
+        self.game.level.fire(self, target)
 
 
 class SniperTower(Tower):
-    """ Снайперская башня имеет собственный алгоритм выбора цели."""
+    """ Снайперская башня по умолчанию выбирает врага с наибольшим здоровьем."""
+    __slots__ = ()
+    kind = TowerType('sniper', tower_range=300, damage=40, rate_of_fire=2000, targeting='strongest')
+
     def __init__(self, position, game):
         super().__init__(position, game)
-        self.image = pygame.image.load('assets/towers/sniper_tower.png').convert_alpha()
-        self.image = pygame.transform.rotate(self.image, 90)
+        self.atlas = game.assets.rotation_atlas(game.settings.tower_sprites['sniper'], game.settings.rotation_steps,
+                                                base_angle=90)
+        self.image = self.atlas.frames[0]
         self.original_image = self.image
         self.rect = self.image.get_rect(center=self.position)
-        self.tower_range = 300
-        self.damage = 40
-        self.rate_of_fire = 2000
-
-    def find_target(self, enemies):
-        healthiest_enemy = None
-        max_health = 0
-        for enemy in enemies:
-            if self.position.distance_to(enemy.position) <= self.tower_range and enemy.health > max_health:
-                healthiest_enemy = enemy
-                max_health = enemy.health
-        return healthiest_enemy
 
     def shoot(self, target, bullets_group):
-        new_bullet = Bullet(self.position, target.position, self.damage, self.game)
-        bullets_group.add(new_bullet)
+        self.game.level.fire(self, target)
 
 
 class MoneyTower(Tower):
     """Класс денежной башни, генерирующей деньги для игрока с заданной скоростью."""
+    __slots__ = ('last_generation_time',)
+    kind = TowerType('money')
+    money_generation_rate = 10  # Количество генерируемых денег
+    generation_interval = 1000  # Интервал генерации в миллисекундах
+
     def __init__(self, position, game):
         super().__init__(position, game)
-        self.image = pygame.image.load('assets/towers/money_tower.png').convert_alpha()
+        self.image = game.assets.image(game.settings.tower_sprites['money'])
         self.original_image = self.image
         self.rect = self.image.get_rect(center=self.position)
-        self.money_generation_rate = 10  # Количество генерируемых денег
-        self.generation_interval = 1000  # Интервал генерации в миллисекундах
-        self.last_generation_time = pygame.time.get_ticks()
+        self.last_generation_time = game.sim_clock.time
+
+    def start_timers(self, level):
+        """Регистрирует в колесе таймеров уровня следующую генерацию денег."""
+        self.timer = level.timers.schedule(self.last_generation_time + self.generation_interval,
+                                           self.timer_callback(level))
+
+    def timer_callback(self, level):
+        return lambda: self.on_generation_timer(level)
+
+    def on_generation_timer(self, level):
+        """Генерирует деньги по таймеру и планирует следующую генерацию."""
+        self.generate_money()
+        self.last_generation_time = self.game.sim_clock.time
+        self.start_timers(level)
 
     def update(self, enemies, current_time, bullets_group):
-        if current_time - self.last_generation_time > self.generation_interval:
-            self.generate_money()
-            self.last_generation_time = current_time
+        # Деньги начисляет таймер (on_generation_timer), денежная башня цель не ищет и не стреляет
+        return False
 
     def generate_money(self):
         """
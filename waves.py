@@ -0,0 +1,167 @@
+"""
+Описания уровней и волн в JSON-файлах и их компиляция в расписание появления врагов.
+
+Файл уровня (каталог Settings.levels_dir, уровни идут в порядке имён файлов):
+
+    {
+      "name": "Level 1",
+      "spawn_delay": 1000,
+      "enemy_types": {
+        "basic": {"speed": 60, "health": 100, "reward": 10, "image": "assets/enemies/basic_enemy.png"}
+      },
+      "waves": [
+        [{"type": "basic", "count": 5}],
+        [{"type": "basic", "count": 200, "burst": 4, "interval": 250, "path": 2},
+         {"type": "basic", "count": 1, "delay": 3000}]
+      ]
+    }
+
+Волна - список записей, каждая запись - группа одинаковых врагов:
+    type      - вид врага из enemy_types;
+    count     - количество врагов (по умолчанию 1);
+    interval  - мс между появлениями в записи (по умолчанию spawn_delay уровня);
+    burst     - сколько врагов появляется одновременно (по умолчанию 1);
+    delay     - пауза в мс перед записью после окончания предыдущей (по умолчанию 0);
+    at        - время начала записи в мс от начала волны, вместо очереди за предыдущей (параллельные группы);
+    path      - номер пути (0..4) или "random" (по умолчанию): путь выбирается один раз на запись при загрузке.
+
+При загрузке уровня каждая волна компилируется в расписание - массивы времени появления, вида врага и номера пути,
+упорядоченные по времени. Уровень на каждом шаге только сдвигает курсор по расписанию.
+"""
+import json
+import os
+import random
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необязательная зависимость, без него расписание сортируется средствами Python
+    np = None
+
+
+class SpawnTimeline:
+    """Расписание появления врагов одной волны: параллельные массивы, упорядоченные по времени."""
+    def __init__(self, times, types, paths):
+        """
+        :param times: array('d') - время появления в мс от начала волны.
+        :param types: array('H') - номер вида врага в LevelSpec.enemy_types.
+        :param paths: array('B') - номер пути врага.
+        """
+        self.times = times
+        self.types = types
+        self.paths = paths
+
+    def __len__(self):
+        return len(self.times)
+
+    def duration(self):
+        """Возвращает время появления последнего врага волны."""
+        return self.times[-1] if self.times else 0
+
+
+def _entry_times(start, count, burst, interval):
+    """Возвращает array('d') времён появления врагов записи: группы по burst врагов через interval мс."""
+    if np is not None:
+        return array('d', (np.arange(count) // burst * interval + start).tobytes())
+    return array('d', (start + (i // burst) * interval for i in range(count)))
+
+
+def compile_wave(entries, type_ids, path_count, spawn_delay, rng=random):
+    """
+    Компилирует записи волны в расписание.
+    :param entries: Список записей волны (словари формата файла уровня).
+    :param type_ids: Словарь имя вида врага -> номер.
+    :param path_count: Количество путей врагов.
+    :param spawn_delay: Интервал между врагами по умолчанию, мс.
+    :param rng: Генератор случайных чисел для "path": "random".
+    :return: SpawnTimeline.
+    """
+    times = array('d')
+    types = array('H')
+    paths = array('B')
+    cursor = 0.0  # Время, с которого начинается следующая запись без "at"
+    ordered = True
+    for entry in entries:
+        count = int(entry.get('count', 1))
+        if count <= 0:
+            continue
+        interval = float(entry.get('interval', spawn_delay))
+        burst = max(int(entry.get('burst', 1)), 1)
+        if 'at' in entry:
+            start = float(entry['at'])
+        else:
+            start = cursor + float(entry.get('delay', 0))
+        path = entry.get('path', 'random')
+        path_id = rng.randrange(path_count) if path == 'random' else int(path)
+        if not 0 <= path_id < path_count:
+            raise ValueError(f"Unknown path {path} in wave entry {entry}")
+        try:
+            type_id = type_ids[entry['type']]
+        except KeyError:
+            raise ValueError(f"Unknown enemy type in wave entry {entry}") from None
+
+        if times and start < times[-1]:
+            ordered = False
+        times.extend(_entry_times(start, count, burst, interval))
+        types.extend(array('H', [type_id]) * count)
+        paths.extend(array('B', [path_id]) * count)
+        # Следующая запись по очереди начинается через interval после последней группы этой записи
+        cursor = max(cursor, start + (count + burst - 1) // burst * interval)
+
+    if not ordered:
+        # Устойчивая сортировка: враги с одинаковым временем идут в порядке записей
+        if np is not None:
+            order = np.argsort(np.frombuffer(times, dtype=np.float64), kind='stable')
+            times = array('d', np.frombuffer(times, dtype=np.float64)[order].tobytes())
+            types = array('H', np.frombuffer(types, dtype=np.uint16)[order].tobytes())
+            paths = array('B', np.frombuffer(paths, dtype=np.uint8)[order].tobytes())
+        else:
+            order = sorted(range(len(times)), key=times.__getitem__)
+            times = array('d', (times[i] for i in order))
+            types = array('H', (types[i] for i in order))
+            paths = array('B', (paths[i] for i in order))
+    return SpawnTimeline(times, types, paths)
+
+
+class LevelSpec:
+    """
+    Лёгкое описание уровня из JSON-файла. Объект уровня (level.LevelBase) создаётся только при переходе на уровень,
+    тогда же волны компилируются в расписания.
+    """
+    def __init__(self, path):
+        """
+        :param path: Путь к JSON-файлу уровня.
+        """
+        self.path = path
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        self.name = data.get('name', os.path.splitext(os.path.basename(path))[0])
+        self.spawn_delay = data.get('spawn_delay', 1000)
+        self.type_names = list(data['enemy_types'])
+        self.type_ids = {name: i for i, name in enumerate(self.type_names)}
+        # Характеристики видов врагов в виде аргументов LevelBase.create_enemy
+        self.enemy_types = [
+            {'speed': info['speed'], 'health': info['health'], 'image_path': info['image'],
+             'reward': info.get('reward', 10)}
+            for info in data['enemy_types'].values()
+        ]
+        self.wave_entries = [wave['entries'] if isinstance(wave, dict) else wave for wave in data['waves']]
+
+    @property
+    def wave_count(self):
+        return len(self.wave_entries)
+
+    def asset_paths(self):
+        """Возвращает изображения врагов, нужные уровню (для предзагрузки до его начала)."""
+        return sorted({info['image_path'] for info in self.enemy_types})
+
+    def compile(self, path_count, rng=random):
+        """Компилирует все волны уровня в расписания."""
+        return [compile_wave(entries, self.type_ids, path_count, self.spawn_delay, rng)
+                for entries in self.wave_entries]
+
+
+def load_level_specs(directory):
+    """Загружает описания всех уровней из каталога directory в порядке имён файлов."""
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    return [LevelSpec(os.path.join(directory, name)) for name in names]